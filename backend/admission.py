@@ -0,0 +1,248 @@
+# backend/admission.py
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+from backend.audio_fingerprint import FINGERPRINT_ENABLED, FINGERPRINT_SECONDS, AudioInfo
+from backend.job_store import BYTES_PER_AUDIO_SECOND
+
+log = logging.getLogger("salessense.backend")
+
+WORKER_COUNT = max(1, int(os.getenv("SALESSENSE_WORKERS", "1")))
+MB = 1024 * 1024
+# Working memory that analyses on this host may reserve at once, split evenly
+# across workers; 0 turns the budget off
+MEMORY_BUDGET_MB = float(os.getenv("SALESSENSE_MEMORY_BUDGET_MB", "2048"))
+# Single-request uploads (/analyze_call, /transcribe/) above this get 413 and
+# should go through the chunked /uploads API
+MAX_DIRECT_UPLOAD_BYTES = int(float(os.getenv("SALESSENSE_MAX_DIRECT_UPLOAD_MB", "100")) * MB)
+MAX_AUDIO_SECONDS = float(os.getenv("SALESSENSE_MAX_AUDIO_SECONDS", str(4 * 3600)))
+RETRY_AFTER_SECONDS = 30
+
+# Working memory of one analysis, from worker RSS measured with the stand-ins:
+# a fixed part (request parsing, transcript, prompts, results) and the
+# fingerprint's decoded PCM and spectra, which stop growing at FINGERPRINT_SECONDS
+BASE_REQUEST_BYTES = 24 * MB
+FINGERPRINT_BYTES_PER_SECOND = 560 * 1024
+RSS_SAMPLE_SECONDS = 0.05
+# Finished requests kept for /admission/status
+RECENT_REQUESTS = 50
+
+PROBE_AVAILABLE = bool(shutil.which("ffprobe") or shutil.which("ffmpeg"))
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class AdmissionError(Exception):
+    """An upload that can't run here: too large or long (413), not audio (415), or no memory now (503)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.headers = {"Retry-After": str(retry_after)} if retry_after else None
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this worker in bytes (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def check_audio(info: Optional[AudioInfo], size: int):
+    """Reject uploads that are not audio or are longer than MAX_AUDIO_SECONDS."""
+    if info is None or info.codec is None:
+        if PROBE_AVAILABLE:
+            raise AdmissionError(415, "The upload is not a readable audio file")
+        return
+    if info.duration and info.duration > MAX_AUDIO_SECONDS:
+        raise AdmissionError(413, f"Recording is {info.duration / 60:.0f} min long;"
+                                  f" the limit is {MAX_AUDIO_SECONDS / 60:.0f} min")
+
+
+def estimate_request_bytes(info: Optional[AudioInfo], size: int) -> int:
+    """Peak working memory of one analysis of this recording."""
+    duration = info.duration if info and info.duration else size / BYTES_PER_AUDIO_SECOND
+    estimate = BASE_REQUEST_BYTES
+    if FINGERPRINT_ENABLED:
+        estimate += int(min(duration, FINGERPRINT_SECONDS) * FINGERPRINT_BYTES_PER_SECOND)
+    return estimate
+
+
+class Reservation:
+    """Memory held for one request; release it (or leave the with block) when the request ends."""
+
+    def __init__(self, budget: "MemoryBudget", key: str, nbytes: int):
+        self.budget = budget
+        self.key = key
+        self.nbytes = nbytes
+        self.started = time.monotonic()
+        self.rss_start = current_rss()
+        self.rss_peak = self.rss_start
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.budget._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.release()
+
+    def as_dict(self) -> Dict[str, Any]:
+        mb = lambda n: round(n / MB, 1) if n is not None else None
+        return {
+            "key": self.key, "estimate_mb": mb(self.nbytes), "seconds": round(time.monotonic() - self.started, 2),
+            "rss_start_mb": mb(self.rss_start), "rss_peak_mb": mb(self.rss_peak),
+            # Growth of the worker while this request ran; concurrent requests add to it
+            "rss_growth_mb": mb(self.rss_peak - self.rss_start) if self.rss_start is not None else None,
+        }
+
+
+class MemoryBudget:
+    """Per-worker memory budget for in-flight analyses, with RSS sampled while any run.
+
+    A request reserves its estimated working memory before the heavy steps and
+    is turned away with 503 when that would exceed the budget. One request is
+    always admitted when none are running, so a large call still gets through.
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = None):
+        self.budget = int(MEMORY_BUDGET_MB * MB / WORKER_COUNT) if budget_bytes is None else budget_bytes
+        self._lock = threading.Lock()
+        self._active: Dict[str, Reservation] = {}
+        self.reserved = 0
+        self.recent = deque(maxlen=RECENT_REQUESTS)
+        self.rejected: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+
+    def _full(self, nbytes: int) -> bool:
+        return bool(self.budget) and bool(self._active) and self.reserved + nbytes > self.budget
+
+    def check_headroom(self, nbytes: int = BASE_REQUEST_BYTES):
+        """Cheap early check (before the body is read) that a minimal request would fit."""
+        with self._lock:
+            if self._full(nbytes):
+                self.rejected["503"] += 1
+                raise AdmissionError(503, "Worker memory budget is in use, retry shortly", RETRY_AFTER_SECONDS)
+
+    def reserve(self, key: str, nbytes: int) -> Reservation:
+        with self._lock:
+            if self._full(nbytes):
+                self.rejected["503"] += 1
+                raise AdmissionError(503, f"Not enough memory budget for this recording now"
+                                          f" ({nbytes / MB:.0f} MB needed), retry shortly", RETRY_AFTER_SECONDS)
+            reservation = Reservation(self, key, nbytes)
+            self._active[key] = reservation
+            self.reserved += nbytes
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_rss, name="rss-sampler", daemon=True)
+                self._sampler.start()
+        return reservation
+
+    def admit(self, key: str, info: Optional[AudioInfo], size: int) -> Reservation:
+        """check_audio, then reserve the estimated working memory; raises AdmissionError."""
+        try:
+            check_audio(info, size)
+        except AdmissionError as e:
+            self.rejected[str(e.status_code)] += 1
+            raise
+        return self.reserve(key, estimate_request_bytes(info, size))
+
+    def _release(self, reservation: Reservation):
+        with self._lock:
+            self._active.pop(reservation.key, None)
+            self.reserved -= reservation.nbytes
+            record = reservation.as_dict()
+            self.recent.append(record)
+        growth = record["rss_growth_mb"]
+        if growth is not None and growth * MB > 2 * reservation.nbytes:
+            log.warning(f"Request {reservation.key[:8]} grew the worker by {growth:.0f} MB,"
+                        f" estimated {reservation.nbytes / MB:.0f} MB")
+
+    def _sample_rss(self):
+        # Runs only while requests hold reservations
+        while True:
+            rss = current_rss()
+            with self._lock:
+                if not self._active or rss is None:
+                    self._sampler = None
+                    return
+                for reservation in self._active.values():
+                    reservation.rss_peak = max(reservation.rss_peak or 0, rss)
+            time.sleep(RSS_SAMPLE_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        rss = current_rss()
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget / MB, 1),
+                "reserved_mb": round(self.reserved / MB, 1),
+                "rss_mb": round(rss / MB, 1) if rss is not None else None,
+                "max_direct_upload_mb": round(MAX_DIRECT_UPLOAD_BYTES / MB, 1),
+                "max_audio_minutes": round(MAX_AUDIO_SECONDS / 60, 1),
+                "rejected": dict(self.rejected),
+                "active": [r.as_dict() for r in self._active.values()],
+                "recent": list(self.recent)[-10:],
+            }
+
+
+class UploadAdmissionMiddleware:
+    """Turns away single-request uploads before their body is read.
+
+    413 when Content-Length (or the bytes received so far, for chunked
+    transfer encoding) is over MAX_DIRECT_UPLOAD_BYTES, and 503 when the
+    worker's memory budget has no room for even a small request.
+    """
+
+    def __init__(self, app, paths, budget: MemoryBudget):
+        self.app = app
+        self.paths = set(paths)
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        length = int(headers.get(b"content-length", b"0") or 0)
+        try:
+            if length > MAX_DIRECT_UPLOAD_BYTES:
+                self.budget.rejected["413"] += 1
+                raise AdmissionError(413, too_large_detail(length))
+            self.budget.check_headroom()
+        except AdmissionError as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > MAX_DIRECT_UPLOAD_BYTES:
+                    self.budget.rejected["413"] += 1
+                    raise HTTPException(status_code=413, detail=too_large_detail(received))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def too_large_detail(size: int) -> str:
+    return (f"Upload of {size / MB:.0f} MB is over the {MAX_DIRECT_UPLOAD_BYTES / MB:.0f} MB single-request limit;"
+            f" use the chunked upload API (POST /uploads/init)")
@@ -0,0 +1,72 @@
+# backend/agent_cache.py
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.result_codec import pack, unpack
+from backend.sqlite_cache import DATA_DIR
+
+AGENT_CACHE_SIZE = int(os.getenv("SALESSENSE_AGENT_CACHE_SIZE", "2000"))
+AGENT_CACHE_TTL_HOURS = float(os.getenv("SALESSENSE_AGENT_CACHE_TTL_HOURS", "168"))
+
+
+class AgentOutputCache:
+    """Raw output of each agent keyed by a hash of exactly the inputs it saw.
+
+    Kept separately from the full-analysis cache: a context edit misses that
+    cache but can still reuse the agents the edit did not touch. Synchronous,
+    since the agents run on executor threads.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_size: int = AGENT_CACHE_SIZE,
+                 ttl_hours: float = AGENT_CACHE_TTL_HOURS):
+        self.db_path = str(db_path or DATA_DIR / "agent_outputs.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.ttl_hours = ttl_hours
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agent_outputs ("
+                " key TEXT PRIMARY KEY,"
+                " agent TEXT NOT NULL,"
+                " output BLOB NOT NULL,"
+                " timestamp REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_outputs_timestamp ON agent_outputs(timestamp)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key: str) -> Any:
+        with self._connect() as conn:
+            row = conn.execute("SELECT output, timestamp FROM agent_outputs WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_hours * 3600:
+            return None
+        # Rows from before outputs were packed hold the raw text
+        return row[0] if isinstance(row[0], str) else unpack(row[0])
+
+    def set(self, key: str, agent: str, output: Any):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO agent_outputs (key, agent, output, timestamp) VALUES (?, ?, ?, ?)",
+                (key, agent, pack(output), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM agent_outputs WHERE key IN ("
+                " SELECT key FROM agent_outputs ORDER BY timestamp DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM agent_outputs")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT agent, COUNT(*) FROM agent_outputs GROUP BY agent").fetchall()
+        return {"entries": dict(rows), "max_entries": self.max_size, "ttl_hours": self.ttl_hours}
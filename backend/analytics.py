@@ -0,0 +1,81 @@
+# backend/analytics.py
+import time
+from typing import Optional
+
+from backend.results_store import ResultsStore
+
+SENTIMENTS = ("positive", "neutral", "negative")
+
+AGGREGATE_COLUMNS = [
+    "rep", "week", "calls", "avg_rep_talk_ratio_percent", "avg_customer_talk_ratio_percent",
+    "avg_questions_asked", "objections_total", "objection_rate", "followups_total",
+    "sentiment_positive", "sentiment_neutral", "sentiment_negative", "updated_at",
+]
+
+# call_metrics columns that are averaged or summed; model output can put text in
+# any of them, and one bad value must not turn a whole group into an object column
+MEAN_COLUMNS = ("rep_talk_ratio_percent", "customer_talk_ratio_percent", "questions_asked_by_rep")
+SUM_COLUMNS = ("objections_detected", "followups_committed")
+
+
+def compute_rep_weekly(metrics):
+    """Per rep, per week rollups from the flattened call_metrics table.
+
+    `metrics` is a DataFrame with one row per call. Everything is a grouped
+    column operation, so cost grows with the number of calls in the slice,
+    not with the size of the stored JSON.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if metrics.empty:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+
+    sentiment = metrics["overall_sentiment"].fillna("neutral").str.lower()
+    frame = metrics.assign(
+        **{f"sentiment_{s}": (sentiment == s).astype(np.float64) for s in SENTIMENTS},
+        # Unparseable means are left out of the average; missing counts count as zero
+        **{c: pd.to_numeric(metrics[c], errors="coerce") for c in MEAN_COLUMNS},
+        **{c: pd.to_numeric(metrics[c], errors="coerce").fillna(0) for c in SUM_COLUMNS},
+    )
+    grouped = frame.groupby(["rep", "week"], sort=True)
+    out = grouped.agg(
+        calls=("analysis_id", "size"),
+        avg_rep_talk_ratio_percent=("rep_talk_ratio_percent", "mean"),
+        avg_customer_talk_ratio_percent=("customer_talk_ratio_percent", "mean"),
+        avg_questions_asked=("questions_asked_by_rep", "mean"),
+        objections_total=("objections_detected", "sum"),
+        followups_total=("followups_committed", "sum"),
+        # Mean of a 0/1 indicator = share of calls with that sentiment
+        sentiment_positive=("sentiment_positive", "mean"),
+        sentiment_neutral=("sentiment_neutral", "mean"),
+        sentiment_negative=("sentiment_negative", "mean"),
+    ).reset_index()
+    out["objection_rate"] = out["objections_total"] / out["calls"]
+    out["updated_at"] = time.time()
+    return out[AGGREGATE_COLUMNS].round(3)
+
+
+def refresh_aggregates(store: ResultsStore, rep: Optional[str] = None, week: Optional[str] = None) -> int:
+    """Recompute rollups for one rep/week (after a new call) or for everything."""
+    import pandas as pd
+
+    conditions, params = [], []
+    if rep is not None:
+        conditions.append("rep = ?")
+        params.append(rep)
+    if week is not None:
+        conditions.append("week = ?")
+        params.append(week)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with store._connect() as conn:
+        metrics = pd.read_sql_query(f"SELECT * FROM call_metrics{where}", conn, params=params)
+        rollup = compute_rep_weekly(metrics)
+        conn.execute(f"DELETE FROM rep_weekly_aggregates{where}", params)
+        conn.executemany(
+            f"INSERT INTO rep_weekly_aggregates ({', '.join(AGGREGATE_COLUMNS)})"
+            f" VALUES ({', '.join('?' for _ in AGGREGATE_COLUMNS)})",
+            rollup.astype(object).where(rollup.notna(), None).itertuples(index=False, name=None),
+        )
+    return len(rollup)
@@ -0,0 +1,232 @@
+# backend/audio_fingerprint.py
+import os
+import re
+import sqlite3
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.sqlite_cache import DATA_DIR
+
+FINGERPRINT_ENABLED = os.getenv("SALESSENSE_FINGERPRINT", "1") != "0"
+# Max bit error rate between two fingerprints to treat them as the same recording
+FINGERPRINT_THRESHOLD = float(os.getenv("SALESSENSE_FINGERPRINT_THRESHOLD", "0.25"))
+# Only this much audio (after leading silence) is decoded and hashed
+FINGERPRINT_SECONDS = float(os.getenv("SALESSENSE_FINGERPRINT_SECONDS", "120"))
+# Near-duplicates must also have about the same length (trailing silence, re-encode padding)
+DURATION_TOLERANCE_SECONDS = float(os.getenv("SALESSENSE_FINGERPRINT_DURATION_TOLERANCE", "10"))
+
+SAMPLE_RATE = 8000
+FRAME_SIZE = 1024        # 128 ms analysis window
+HOP_SIZE = 256           # 32 ms between sub-fingerprints
+BANDS = 33               # 33 bands -> 32 energy-difference bits per frame
+MIN_FREQ, MAX_FREQ = 300.0, 2000.0
+MAX_OFFSET_FRAMES = 16   # tolerate ~0.5 s of misalignment
+MIN_OVERLAP_FRAMES = 64
+# Every Nth sub-fingerprint goes into the exact-match lookup table
+LOOKUP_STRIDE = 4
+
+
+def decode_pcm(path: str, seconds: float = FINGERPRINT_SECONDS):
+    """Mono 8 kHz int16 PCM of the start of the file, with leading silence trimmed."""
+    import ffmpeg
+    import numpy as np
+
+    out, _ = (
+        ffmpeg.input(path)
+        .filter("silenceremove", start_periods=1, start_threshold="-50dB")
+        .output("pipe:", format="s16le", ac=1, ar=SAMPLE_RATE, t=seconds)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, dtype=np.int16)
+
+
+@dataclass
+class AudioInfo:
+    """What the container header says about a recording; read without decoding it."""
+    duration: Optional[float]
+    codec: Optional[str]
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    container: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# `ffmpeg -i` output, for hosts that have ffmpeg but not ffprobe
+_FFMPEG_INPUT = re.compile(r"Input #0, ([^,]+)")
+_FFMPEG_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_FFMPEG_AUDIO = re.compile(r"Stream #\S+.*?: Audio: (\w+)[^,]*(?:, (\d+) Hz)?(?:, (mono|stereo|\d+ channels))?")
+
+
+def _probe_with_ffmpeg(path: str) -> Optional[AudioInfo]:
+    # Exits non-zero without an output file, after printing the input's streams
+    err = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True,
+                         errors="replace", timeout=30).stderr
+    container = _FFMPEG_INPUT.search(err)
+    if container is None:
+        return None
+    duration = _FFMPEG_DURATION.search(err)
+    audio = _FFMPEG_AUDIO.search(err)
+    channels = None
+    if audio and audio.group(3):
+        layout = audio.group(3)
+        channels = {"mono": 1, "stereo": 2}.get(layout) or int(layout.split()[0])
+    return AudioInfo(
+        duration=int(duration.group(1)) * 3600 + int(duration.group(2)) * 60 + float(duration.group(3)) if duration else None,
+        codec=audio.group(1) if audio else None,
+        sample_rate=int(audio.group(2)) if audio and audio.group(2) else None,
+        channels=channels,
+        container=container.group(1),
+    )
+
+
+def probe_audio(path: str) -> Optional[AudioInfo]:
+    """Duration and codec of the first audio stream (codec None: no audio); None if unreadable."""
+    try:
+        import ffmpeg
+        probe = ffmpeg.probe(path)
+    except FileNotFoundError:
+        try:
+            return _probe_with_ffmpeg(path)
+        except Exception:
+            return None
+    except Exception:
+        return None
+    audio = next((s for s in probe.get("streams", []) if s.get("codec_type") == "audio"), {})
+    duration = probe.get("format", {}).get("duration") or audio.get("duration")
+    return AudioInfo(
+        duration=float(duration) if duration else None,
+        codec=audio.get("codec_name"),
+        sample_rate=int(audio["sample_rate"]) if audio.get("sample_rate") else None,
+        channels=audio.get("channels"),
+        container=probe.get("format", {}).get("format_name"),
+    )
+
+
+def probe_duration(path: str) -> Optional[float]:
+    info = probe_audio(path)
+    return info.duration if info else None
+
+
+def compute_fingerprint(pcm):
+    """32-bit sub-fingerprint per 32 ms hop (Haitsma/Kalker style).
+
+    Bit m of frame n is the sign of the change, from frame n-1 to n, in the
+    energy difference between bands m and m+1. The signs survive re-encoding,
+    volume changes and small EQ differences, while the raw bytes do not.
+    """
+    import numpy as np
+
+    samples = pcm.astype(np.float32) / 32768.0
+    if len(samples) < FRAME_SIZE + HOP_SIZE:
+        return np.zeros(0, dtype=np.uint32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE), axis=1)) ** 2
+
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1.0 / SAMPLE_RATE)
+    edges = np.geomspace(MIN_FREQ, MAX_FREQ, BANDS + 1)
+    band_index = np.digitize(freqs, edges) - 1
+    valid = (band_index >= 0) & (band_index < BANDS)
+    energy = np.zeros((len(frames), BANDS), dtype=np.float64)
+    np.add.at(energy.T, band_index[valid], spectrum[:, valid].T)
+
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    weights = (1 << np.arange(32, dtype=np.uint64)).astype(np.uint64)
+    return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+
+def bit_error_rate(a, b, max_offset: int = MAX_OFFSET_FRAMES) -> float:
+    """Lowest fraction of differing bits over small alignment offsets (1.0 = unrelated)."""
+    import numpy as np
+
+    best = 1.0
+    for offset in range(-max_offset, max_offset + 1):
+        x = a[max(offset, 0):]
+        y = b[max(-offset, 0):]
+        n = min(len(x), len(y))
+        if n < MIN_OVERLAP_FRAMES:
+            continue
+        diff = np.bitwise_xor(x[:n], y[:n])
+        errors = np.unpackbits(diff.view(np.uint8)).sum()
+        best = min(best, errors / (32.0 * n))
+    return best
+
+
+def fingerprint_file(path: str) -> Tuple[Any, Optional[float]]:
+    return compute_fingerprint(decode_pcm(path)), probe_duration(path)
+
+
+class FingerprintIndex:
+    """Stored fingerprints keyed by the audio sha256 of the recording they came from."""
+
+    def __init__(self, db_path: Optional[str] = None, threshold: float = FINGERPRINT_THRESHOLD):
+        self.db_path = str(db_path or DATA_DIR / "fingerprints.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        with self._connect() as conn:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                " audio_sha TEXT PRIMARY KEY, fingerprint BLOB NOT NULL,"
+                " duration REAL, created_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS fingerprint_lookup ("
+                " value INTEGER NOT NULL, audio_sha TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS idx_fingerprint_lookup ON fingerprint_lookup(value);"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add(self, audio_sha: str, fingerprint, duration: Optional[float] = None):
+        if len(fingerprint) == 0:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM fingerprint_lookup WHERE audio_sha = ?", (audio_sha,))
+            conn.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)",
+                (audio_sha, fingerprint.tobytes(), duration, time.time()),
+            )
+            conn.executemany(
+                "INSERT INTO fingerprint_lookup VALUES (?, ?)",
+                [(int(v), audio_sha) for v in set(fingerprint[::LOOKUP_STRIDE].tolist())],
+            )
+
+    def _candidates(self, conn: sqlite3.Connection, fingerprint, limit: int = 20) -> List[str]:
+        """Recordings sharing at least one exact sub-fingerprint, most shared first."""
+        values = list({int(v) for v in fingerprint.tolist()})
+        counts: Dict[str, int] = {}
+        for start in range(0, len(values), 900):
+            chunk = values[start:start + 900]
+            for (sha,) in conn.execute(
+                f"SELECT audio_sha FROM fingerprint_lookup WHERE value IN ({', '.join('?' for _ in chunk)})", chunk
+            ):
+                counts[sha] = counts.get(sha, 0) + 1
+        return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+    def find_match(self, fingerprint, duration: Optional[float] = None,
+                   exclude: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Closest stored recording under the similarity threshold, if any."""
+        import numpy as np
+
+        if len(fingerprint) < MIN_OVERLAP_FRAMES:
+            return None
+        with self._connect() as conn:
+            best = None
+            for sha in self._candidates(conn, fingerprint):
+                if sha == exclude:
+                    continue
+                row = conn.execute("SELECT fingerprint, duration FROM fingerprints WHERE audio_sha = ?", (sha,)).fetchone()
+                if row is None:
+                    continue
+                if duration and row[1] and abs(duration - row[1]) > DURATION_TOLERANCE_SECONDS:
+                    continue
+                ber = bit_error_rate(fingerprint, np.frombuffer(row[0], dtype=np.uint32))
+                if ber <= self.threshold and (best is None or ber < best["bit_error_rate"]):
+                    best = {"audio_sha": sha, "bit_error_rate": round(float(ber), 4)}
+        return best
@@ -0,0 +1,699 @@
+# backend/backfill.py
+"""Offline backfill of historical calls into the results store.
+
+    python -m backend.backfill calls.jsonl --mode packed
+    python -m backend.backfill calls.jsonl --mode batch --token-budget 5000000
+    python -m backend.backfill --report
+
+Each manifest line is a JSON object with a call_id and either its transcript or
+`audio` (a path to transcribe), plus the fields stored for uploads:
+participants, details, call_types, rep, tenant, filename and created_at (unix
+time).
+
+Short calls are packed several to a request (one JSON answer keyed by call id),
+so the static instructions are sent once per pack instead of once per call.
+Calls with long transcripts, and calls a packed answer left out, go on their
+own. `--mode packed` sends the requests through the regular chat API at batch
+priority; `--mode batch` submits them through OpenAI's Batch API (half price,
+results within 24 hours, outside the chat TPM budget). `--pack-size 1` gives
+the per-call baseline.
+
+Progress lives in backfill.sqlite3, so a run that is interrupted resumes where
+it stopped: finished calls are skipped, agent outputs already received are
+kept, and batches already submitted are collected instead of resubmitted.
+Each call is written to the results store as soon as its last agent answers.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.multi_agent_system import (
+    AGENT_INPUTS, AGENT_ORDER, CALL_DATA_TEMPLATES, LLM_PROVIDER, PACKED_CALL_HEADER, PROMPT_TEMPLATES,
+    TRANSCRIPT_CHARS, agent_context, build_optimized_llm, combine_results_node, get_openai_api_key,
+    get_packed_prompt, get_prompt, invoke_llm, normalize_analysis, normalize_coaching, safe_json_parse,
+)
+from backend.model_router import model_router
+from backend.rate_limiter import estimate_tokens, rate_limits
+from backend.result_codec import pack, unpack
+from backend.sqlite_cache import DATA_DIR
+
+log = logging.getLogger("salessense.backend")
+
+# Most calls per request; fewer when their answers would not fit PACK_MAX_OUTPUT_TOKENS
+PACK_SIZE = int(os.getenv("SALESSENSE_BACKFILL_PACK_SIZE", "4"))
+# Calls with longer transcripts get a request of their own
+PACK_MAX_TRANSCRIPT_TOKENS = int(os.getenv("SALESSENSE_BACKFILL_PACK_MAX_TOKENS", "800"))
+PACK_MAX_OUTPUT_TOKENS = 4096
+# Requests per Batch API submission; smaller batches return (and store) results sooner
+BATCH_REQUESTS = int(os.getenv("SALESSENSE_BACKFILL_BATCH_REQUESTS", "200"))
+MAX_OPEN_BATCHES = 4
+BATCH_DONE_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Price of a token relative to a regular uncached input token
+CACHED_TOKEN_PRICE = 0.5
+BATCH_TOKEN_PRICE = 0.5
+# A call is marked failed after this many failed requests
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backfill_calls (
+    call_id TEXT PRIMARY KEY,
+    entry BLOB NOT NULL,
+    transcript TEXT,
+    outputs BLOB,
+    status TEXT NOT NULL,
+    solo INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_backfill_calls_status ON backfill_calls(status);
+
+CREATE TABLE IF NOT EXISTS backfill_batches (
+    batch_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    members BLOB NOT NULL,
+    estimated_tokens INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS backfill_runs (
+    run_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    pack_size INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    calls_done INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    billed_tokens REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class BackfillCall:
+    __slots__ = ("rowid", "call_id", "entry", "transcript", "outputs", "solo", "attempts")
+
+    def __init__(self, row: sqlite3.Row):
+        self.rowid = row["rowid"]
+        self.call_id = row["call_id"]
+        self.entry = unpack(row["entry"])
+        self.transcript = row["transcript"]
+        self.outputs = unpack(row["outputs"]) if row["outputs"] else {}
+        self.solo = bool(row["solo"])
+        self.attempts = row["attempts"]
+
+    @property
+    def context(self) -> Dict[str, str]:
+        # Same fields /analyze_call passes, so prompts match an interactive upload
+        return {
+            "participants": self.entry.get("participants", ""),
+            "details": self.entry.get("details", ""),
+            "call_types": self.entry.get("call_types", ""),
+            "note": "This transcript includes speaker labels for better analysis",
+        }
+
+    def call_data(self, agent: str) -> Dict[str, str]:
+        return {
+            "context": agent_context(self.context, agent),
+            "transcript": (self.transcript or "")[:TRANSCRIPT_CHARS.get(agent, 0)],
+            "summary": self.outputs.get("summary", ""),
+        }
+
+
+class BackfillStore:
+    """Calls to backfill, the agent outputs received so far, open batches and per-run usage."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or DATA_DIR / "backfill.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add_calls(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Queue manifest entries; call ids already known (done or not) are left alone."""
+        now = time.time()
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO backfill_calls (call_id, entry, transcript, status, updated_at)"
+                " VALUES (?, ?, ?, 'pending', ?)",
+                ((str(e["call_id"]), pack({k: v for k, v in e.items() if k != "transcript"}), e.get("transcript"), now)
+                 for e in entries),
+            )
+            return conn.total_changes - before
+
+    def pending(self, limit: int, after_rowid: int = 0) -> List[BackfillCall]:
+        """Up to `limit` unfinished calls in manifest order, after the given row."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT rowid, * FROM backfill_calls WHERE status = 'pending' AND rowid > ?"
+                                " ORDER BY rowid LIMIT ?", (after_rowid, limit)).fetchall()
+        return [BackfillCall(r) for r in rows]
+
+    def get_pending(self, call_ids: List[str]) -> List[BackfillCall]:
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT rowid, * FROM backfill_calls WHERE status = 'pending'"
+                                f" AND call_id IN ({','.join('?' * len(call_ids))})", call_ids).fetchall()
+        return [BackfillCall(r) for r in rows]
+
+    def set_transcript(self, call_id: str, transcript: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE backfill_calls SET transcript = ?, updated_at = ? WHERE call_id = ?",
+                         (transcript, time.time(), call_id))
+
+    def save_output(self, call: BackfillCall, agent: str, output: Any):
+        call.outputs[agent] = output
+        with self._connect() as conn:
+            conn.execute("UPDATE backfill_calls SET outputs = ?, updated_at = ? WHERE call_id = ?",
+                         (pack(call.outputs), time.time(), call.call_id))
+
+    def record_failure(self, call: BackfillCall, error: str, solo: bool = False):
+        """Count a failed request for the call; after MAX_ATTEMPTS it is given up on."""
+        call.attempts += 1
+        call.solo = call.solo or solo
+        status = "failed" if call.attempts >= MAX_ATTEMPTS else "pending"
+        with self._connect() as conn:
+            conn.execute("UPDATE backfill_calls SET attempts = ?, solo = ?, status = ?, error = ?, updated_at = ?"
+                         " WHERE call_id = ?",
+                         (call.attempts, int(call.solo), status, error, time.time(), call.call_id))
+        if status == "failed":
+            log.error(f"❌ Backfill gave up on call {call.call_id}: {error}")
+
+    def mark_done(self, call_id: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE backfill_calls SET status = 'done', error = NULL, updated_at = ? WHERE call_id = ?",
+                         (time.time(), call_id))
+
+    def add_batch(self, batch_id: str, run_id: str, agent: str, members: Dict[str, List[str]], estimated: int):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO backfill_batches VALUES (?, ?, ?, ?, ?, 'submitted', ?)",
+                         (batch_id, run_id, agent, pack(members), estimated, time.time()))
+
+    def open_batches(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM backfill_batches WHERE status = 'submitted' ORDER BY submitted_at")
+            return [{**dict(r), "members": unpack(r["members"])} for r in rows]
+
+    def close_batch(self, batch_id: str, status: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE backfill_batches SET status = ? WHERE batch_id = ?", (status, batch_id))
+
+    def start_run(self, mode: str, pack_size: int) -> str:
+        run_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute("INSERT INTO backfill_runs (run_id, mode, pack_size, started_at) VALUES (?, ?, ?, ?)",
+                         (run_id, mode, pack_size, time.time()))
+        return run_id
+
+    def record_usage(self, run_id: str, input_tokens: int, cached_tokens: int, output_tokens: int, billed: float):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE backfill_runs SET requests = requests + 1, input_tokens = input_tokens + ?,"
+                " cached_tokens = cached_tokens + ?, output_tokens = output_tokens + ?,"
+                " billed_tokens = billed_tokens + ? WHERE run_id = ?",
+                (input_tokens, cached_tokens, output_tokens, billed, run_id),
+            )
+
+    def count_done(self, run_id: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE backfill_runs SET calls_done = calls_done + 1 WHERE run_id = ?", (run_id,))
+
+    def finish_run(self, run_id: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE backfill_runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def run(self, run_id: str) -> Dict[str, Any]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT * FROM backfill_runs WHERE run_id = ?", (run_id,)).fetchone())
+
+    def runs(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute("SELECT * FROM backfill_runs ORDER BY started_at")]
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM backfill_calls GROUP BY status").fetchall())
+
+
+class OpenAIBatchAPI:
+    """Chat completions through OpenAI's Batch API: upload a JSONL file, poll, download the answers."""
+
+    def __init__(self):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=get_openai_api_key())
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        lines = "\n".join(json.dumps({"custom_id": r["custom_id"], "method": "POST", "url": "/v1/chat/completions",
+                                      "body": r["body"]}) for r in requests)
+        upload = self.client.files.create(file=("backfill.jsonl", lines.encode("utf-8")), purpose="batch")
+        batch = self.client.batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions",
+                                           completion_window="24h")
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """Answer or error per custom_id; an expired batch returns the part that finished."""
+        batch = self.client.batches.retrieve(batch_id)
+        answers = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                record = json.loads(line)
+                response = record.get("response") or {}
+                body = response.get("body") or {}
+                if response.get("status_code") != 200:
+                    answers[record["custom_id"]] = {"error": str(record.get("error") or body.get("error"))}
+                    continue
+                usage = body.get("usage") or {}
+                answers[record["custom_id"]] = {
+                    "content": body["choices"][0]["message"]["content"],
+                    "input_tokens": usage.get("prompt_tokens", 0),
+                    "output_tokens": usage.get("completion_tokens", 0),
+                    "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+                }
+        return answers
+
+
+def get_batch_api():
+    """Real Batch API, or the local stand-in when SALESSENSE_LLM=fake."""
+    if LLM_PROVIDER == "fake":
+        from backend.stand_ins import FakeBatchAPI
+        return FakeBatchAPI()
+    return OpenAIBatchAPI()
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "call_id" not in entry or not (entry.get("transcript") or entry.get("audio")):
+                raise ValueError(f"{path}:{number}: needs call_id and a transcript or audio path")
+            entries.append(entry)
+    return entries
+
+
+def billed_tokens(input_tokens: int, cached_tokens: int, output_tokens: int, batch: bool) -> float:
+    """Tokens at the price of regular input tokens: cached input and Batch API tokens cost half."""
+    billed = input_tokens - cached_tokens + cached_tokens * CACHED_TOKEN_PRICE + output_tokens
+    return billed * BATCH_TOKEN_PRICE if batch else billed
+
+
+def needed_agents(call: BackfillCall, in_flight: Set[Tuple[str, str]]) -> List[str]:
+    """Agents the call still needs whose inputs are ready and that aren't already requested."""
+    return [
+        agent for agent in AGENT_ORDER
+        if agent not in call.outputs and (call.call_id, agent) not in in_flight
+        and all(dep in call.outputs for dep in AGENT_INPUTS[agent] if dep in PROMPT_TEMPLATES)
+    ]
+
+
+def packable(call: BackfillCall, agent: str) -> bool:
+    if call.solo:
+        return False
+    # Coaching reads the summary, not the transcript
+    return agent == "coaching" or estimate_tokens(call.transcript or "") <= PACK_MAX_TRANSCRIPT_TOKENS
+
+
+def plan_requests(calls: List[BackfillCall], pack_size: int,
+                  in_flight: Set[Tuple[str, str]] = frozenset()) -> List[Tuple[str, List[BackfillCall]]]:
+    """(agent, calls) per request: packable calls in groups of up to pack_size, the rest alone."""
+    requests = []
+    for agent in AGENT_ORDER:
+        ready = [c for c in calls if agent in needed_agents(c, in_flight)]
+        per_call = model_router.route(agent, PACK_MAX_TRANSCRIPT_TOKENS).max_tokens
+        size = max(1, min(pack_size, PACK_MAX_OUTPUT_TOKENS // per_call))
+        packed = [c for c in ready if packable(c, agent)]
+        requests += [(agent, packed[i:i + size]) for i in range(0, len(packed), size)]
+        requests += [(agent, [c]) for c in ready if not packable(c, agent)]
+    return requests
+
+
+def request_messages(agent: str, group: List[BackfillCall]):
+    if len(group) == 1:
+        return get_prompt(agent).format_messages(**group[0].call_data(agent))
+    blocks = [PACKED_CALL_HEADER.format(call_id=c.call_id) + "\n" + CALL_DATA_TEMPLATES[agent].format(**c.call_data(agent))
+              for c in group]
+    return get_packed_prompt(agent).format_messages(calls="\n\n".join(blocks))
+
+
+def request_route(agent: str, group: List[BackfillCall]) -> Dict[str, Any]:
+    transcript_tokens = max(estimate_tokens(c.transcript or "") for c in group)
+    route = model_router.route(agent, transcript_tokens).as_dict()
+    route["max_tokens"] = min(PACK_MAX_OUTPUT_TOKENS, route["max_tokens"] * len(group))
+    # A packed answer takes longer to generate
+    route["timeout"] = route["timeout"] * len(group)
+    return route
+
+
+def parse_output(agent: str, value: Any) -> Any:
+    """A valid agent output, or None."""
+    if agent == "summary":
+        return value.strip() if isinstance(value, str) and value.strip() else None
+    if isinstance(value, str):
+        value = safe_json_parse(value, f"Backfill {agent}")
+    if not isinstance(value, dict) or not value:
+        return None
+    return normalize_analysis(value) if agent == "analysis" else normalize_coaching(value)
+
+
+def parse_answer(agent: str, group: List[BackfillCall], text: str) -> Dict[str, Any]:
+    """Outputs by call id; calls missing from a packed answer are left out."""
+    if len(group) == 1:
+        output = parse_output(agent, text)
+        return {group[0].call_id: output} if output is not None else {}
+    data = safe_json_parse(text, f"Packed {agent}")
+    if not isinstance(data, dict):
+        return {}
+    outputs = {}
+    for call in group:
+        output = parse_output(agent, data.get(call.call_id))
+        if output is not None:
+            outputs[call.call_id] = output
+    return outputs
+
+
+class Backfill:
+    """One backfill run over the calls in a BackfillStore."""
+
+    def __init__(self, store: BackfillStore, mode: str = "packed", pack_size: int = PACK_SIZE,
+                 concurrency: int = 4, token_budget: float = 0, poll_seconds: float = 30.0):
+        from backend.results_store import ResultsStore
+        from backend.search_index import SearchIndex
+
+        self.store = store
+        self.mode = mode
+        self.pack_size = max(1, pack_size)
+        self.concurrency = concurrency
+        self.token_budget = token_budget
+        self.poll_seconds = poll_seconds
+        self.results_store = ResultsStore()
+        self.search_index = SearchIndex()
+        self.run_id = store.start_run(mode, self.pack_size)
+        self._touched: Set[Tuple[str, str]] = set()
+
+    def over_budget(self, committed: float = 0) -> bool:
+        return bool(self.token_budget) and self.store.run(self.run_id)["billed_tokens"] + committed >= self.token_budget
+
+    def ready(self, calls: List[BackfillCall]) -> List[BackfillCall]:
+        """Calls with work left for the agents: audio is transcribed first, and calls whose
+        outputs all arrived before an interruption are stored now."""
+        calls = self.ensure_transcripts(calls)
+        for call in calls:
+            if all(agent in call.outputs for agent in AGENT_ORDER):
+                self.finish_call(call)
+        return [c for c in calls if not all(agent in c.outputs for agent in AGENT_ORDER)]
+
+    def ensure_transcripts(self, calls: List[BackfillCall]) -> List[BackfillCall]:
+        """Transcribe calls given as audio; returns the calls that have a transcript."""
+        from backend.crewai_transcription import transcribe_crew_ai
+
+        missing = [c for c in calls if not c.transcript]
+        if not missing:
+            return calls
+
+        def transcribe(call: BackfillCall) -> str:
+            rate_limits["assemblyai"].acquire(call.entry.get("tenant", "default"), "batch")
+            with open(call.entry["audio"], "rb") as audio_file:
+                return transcribe_crew_ai(audio_file)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(transcribe, c): c for c in missing}
+            for future in as_completed(futures):
+                call = futures[future]
+                try:
+                    call.transcript = future.result()
+                    self.store.set_transcript(call.call_id, call.transcript)
+                except Exception as e:
+                    self.store.record_failure(call, f"transcription: {e}")
+        return [c for c in calls if c.transcript]
+
+    def apply(self, agent: str, group: List[BackfillCall], text: Optional[str], usage: Dict[str, int],
+              error: str = ""):
+        """Store the outputs of one answered request, and the calls that are now complete."""
+        if usage:
+            self.store.record_usage(self.run_id, usage["input_tokens"], usage["cached_tokens"],
+                                    usage["output_tokens"], billed_tokens(batch=self.mode == "batch", **usage))
+        outputs = parse_answer(agent, group, text) if text is not None else {}
+        for call in group:
+            if call.call_id not in outputs:
+                # A packed answer that skipped this call: send it on its own next time
+                self.store.record_failure(call, error or f"no valid {agent} output", solo=len(group) > 1)
+                continue
+            self.store.save_output(call, agent, outputs[call.call_id])
+            if all(a in call.outputs for a in AGENT_ORDER):
+                self.finish_call(call)
+
+    def finish_call(self, call: BackfillCall):
+        result = combine_results_node({
+            **call.outputs,
+            "routing": {},
+            "agents": {"recomputed": list(AGENT_ORDER), "reused": []},
+        })["final_result"]
+        result["agents_used"] = f"Summary + Analysis + Coaching (backfill, {self.mode})"
+        entry = call.entry
+        saved = self.results_store.save_analysis(
+            call.call_id, result, transcript=call.transcript or "",
+            participants=entry.get("participants", ""), details=entry.get("details", ""),
+            call_types=entry.get("call_types", ""), filename=entry.get("filename", ""),
+            tenant=entry.get("tenant", "default"), rep=entry.get("rep"), created_at=entry.get("created_at"),
+        )
+        self.search_index.index_call(call.call_id, saved["rep"], call.transcript or "",
+                                     result.get("customer_objections"), result.get("notable_quotes"))
+        self._touched.add((saved["rep"], saved["week"]))
+        self.store.mark_done(call.call_id)
+        self.store.count_done(self.run_id)
+
+    def refresh_aggregates(self):
+        from backend.analytics import refresh_aggregates
+
+        for rep, week in self._touched:
+            refresh_aggregates(self.results_store, rep, week)
+        self._touched.clear()
+
+    def send(self, agent: str, group: List[BackfillCall]):
+        """One chat API request at batch priority; returns (text, usage)."""
+        route = request_route(agent, group)
+        llm = build_optimized_llm(route)
+        state = {"tenant": group[0].entry.get("tenant", "default"), "priority": "batch", "routing": {}}
+        response = invoke_llm(llm, request_messages(agent, group), state, agent)
+        usage = getattr(response, "usage_metadata", None) or {}
+        return getattr(response, "content", ""), {
+            "input_tokens": usage.get("input_tokens") or 0,
+            "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read") or 0,
+            "output_tokens": usage.get("output_tokens") or 0,
+        }
+
+    def run_packed(self):
+        """Work through pending calls a chunk at a time: summary and analysis, then coaching."""
+        chunk = self.concurrency * self.pack_size * 4
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self.over_budget():
+                calls = self.ready(self.store.pending(chunk))
+                requests = plan_requests(calls, self.pack_size)
+                if not requests:
+                    break
+                while requests and not self.over_budget():
+                    futures = {executor.submit(self.send, agent, group): (agent, group) for agent, group in requests}
+                    for future in as_completed(futures):
+                        agent, group = futures[future]
+                        try:
+                            text, usage = future.result()
+                            self.apply(agent, group, text, usage)
+                        except Exception as e:
+                            log.warning(f"⚠️ Backfill {agent} request for {len(group)} calls failed: {e}")
+                            self.apply(agent, group, None, {}, error=str(e))
+                    self.refresh_aggregates()
+                    calls = [c for c in calls if c.attempts < MAX_ATTEMPTS]
+                    requests = plan_requests(calls, self.pack_size)
+
+    def batch_request(self, agent: str, group: List[BackfillCall], custom_id: str) -> Tuple[Dict[str, Any], int]:
+        route = request_route(agent, group)
+        roles = {"system": "system", "human": "user"}
+        messages = [{"role": roles[m.type], "content": m.content} for m in request_messages(agent, group)]
+        body = {"model": route["model"], "messages": messages, "max_tokens": route["max_tokens"],
+                "temperature": 0.2, "prompt_cache_key": f"salessense-{agent}"}
+        estimated = estimate_tokens(*(m["content"] for m in messages), completion_tokens=route["max_tokens"])
+        return {"custom_id": custom_id, "body": body}, estimated
+
+    def collect(self, api, batch: Dict[str, Any]) -> bool:
+        """Apply a finished batch's answers; False while it is still running."""
+        status = api.status(batch["batch_id"])
+        if status not in BATCH_DONE_STATUSES:
+            return False
+        answers = api.results(batch["batch_id"]) if status in ("completed", "expired") else {}
+        agent = batch["agent"]
+        for custom_id, call_ids in batch["members"].items():
+            calls = {c.call_id: c for c in self.store.get_pending(call_ids)}
+            group = [calls[i] for i in call_ids if i in calls]
+            answer = answers.get(custom_id) or {"error": f"batch {status}"}
+            if "error" in answer:
+                self.apply(agent, group, None, {}, error=answer["error"])
+            else:
+                self.apply(agent, group, answer["content"], {k: answer[k] for k in
+                                                             ("input_tokens", "cached_tokens", "output_tokens")})
+        self.store.close_batch(batch["batch_id"], status)
+        self.refresh_aggregates()
+        log.info(f"📦 Batch {batch['batch_id']} {status}: {len(batch['members'])} requests collected")
+        return True
+
+    def run_batch(self):
+        """Keep up to MAX_OPEN_BATCHES submitted; collect them as they finish."""
+        api = get_batch_api()
+        while True:
+            open_batches = [b for b in self.store.open_batches() if not self.collect(api, b)]
+            in_flight = {(call_id, b["agent"]) for b in open_batches
+                         for call_ids in b["members"].values() for call_id in call_ids}
+            committed = sum(b["estimated_tokens"] for b in open_batches) * BATCH_TOKEN_PRICE
+            submitted = False
+            if len(open_batches) < MAX_OPEN_BATCHES and not self.over_budget(committed):
+                requests = self.plan_batch(in_flight)
+                for agent in AGENT_ORDER:
+                    group = [calls for a, calls in requests if a == agent]
+                    if group:
+                        self.submit_batch(api, agent, group)
+                        submitted = True
+            if not open_batches and not submitted:
+                break
+            time.sleep(self.poll_seconds)
+
+    def plan_batch(self, in_flight: Set[Tuple[str, str]]) -> List[Tuple[str, List[BackfillCall]]]:
+        """Up to BATCH_REQUESTS requests, skipping calls whose next agents are already submitted."""
+        requests, after = [], 0
+        while len(requests) < BATCH_REQUESTS:
+            page = self.store.pending(BATCH_REQUESTS * self.pack_size, after)
+            if not page:
+                break
+            after = page[-1].rowid
+            requests += plan_requests(self.ready(page), self.pack_size, in_flight)
+        # Coaching first: it completes calls, so results reach the store sooner
+        requests.sort(key=lambda request: request[0] != "coaching")
+        return requests[:BATCH_REQUESTS]
+
+    def submit_batch(self, api, agent: str, groups: List[List[BackfillCall]]):
+        lines, members, estimated = [], {}, 0
+        for n, group in enumerate(groups):
+            custom_id = f"{agent}-{n}"
+            line, tokens = self.batch_request(agent, group, custom_id)
+            lines.append(line)
+            members[custom_id] = [c.call_id for c in group]
+            estimated += tokens
+        batch_id = api.submit(lines)
+        self.store.add_batch(batch_id, self.run_id, agent, members, estimated)
+        log.info(f"📤 Submitted batch {batch_id}: {len(lines)} {agent} requests")
+
+    def run(self) -> Dict[str, Any]:
+        try:
+            self.run_batch() if self.mode == "batch" else self.run_packed()
+        finally:
+            self.refresh_aggregates()
+            self.store.finish_run(self.run_id)
+        return self.store.run(self.run_id)
+
+
+def run_summary(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Throughput and token cost of one run, per analysed call."""
+    hours = max((run["finished_at"] or time.time()) - run["started_at"], 1e-9) / 3600
+    done = run["calls_done"]
+    return {
+        "run_id": run["run_id"],
+        "mode": run["mode"],
+        "pack_size": run["pack_size"],
+        "calls_done": done,
+        "requests": run["requests"],
+        "hours": round(hours, 4),
+        "calls_per_hour": round(done / hours, 1),
+        "input_tokens_per_call": round(run["input_tokens"] / done) if done else None,
+        "cached_share": round(run["cached_tokens"] / run["input_tokens"], 3) if run["input_tokens"] else 0.0,
+        "output_tokens_per_call": round(run["output_tokens"] / done) if done else None,
+        "billed_tokens_per_call": round(run["billed_tokens"] / done) if done else None,
+        "calls_per_million_billed_tokens": round(done / run["billed_tokens"] * 1e6) if run["billed_tokens"] else None,
+    }
+
+
+def total_run(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """All runs as one, for backfills that were interrupted and resumed (tokens of a batch
+    count in the run that collected it, calls in the run that finished them)."""
+    total = {"run_id": "total", "mode": "/".join(sorted({r["mode"] for r in runs})), "pack_size": "",
+             "started_at": 0.0, "finished_at": 0.0}
+    for run in runs:
+        total["finished_at"] += (run["finished_at"] or time.time()) - run["started_at"]
+        for key in ("calls_done", "requests", "input_tokens", "cached_tokens", "output_tokens", "billed_tokens"):
+            total[key] = total.get(key, 0) + run[key]
+    return total
+
+
+def print_report(store: BackfillStore):
+    print(f"Calls: {store.counts()}\n")
+    print("| run | mode | pack | calls | requests | hours | calls/hour | input tok/call | cached |"
+          " output tok/call | billed tok/call | calls per 1M billed |")
+    print("|---|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|")
+    runs = store.runs()
+    for run in runs + ([total_run(runs)] if len(runs) > 1 else []):
+        s = run_summary(run)
+        print(f"| {s['run_id']} | {s['mode']} | {s['pack_size']} | {s['calls_done']} | {s['requests']} |"
+              f" {s['hours']} | {s['calls_per_hour']:,} | {s['input_tokens_per_call']} | {s['cached_share']:.0%} |"
+              f" {s['output_tokens_per_call']} | {s['billed_tokens_per_call']} |"
+              f" {s['calls_per_million_billed_tokens']} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", nargs="?", help="JSONL of calls to add before running")
+    parser.add_argument("--mode", choices=("packed", "batch"), default="packed")
+    parser.add_argument("--pack-size", type=int, default=PACK_SIZE, help="calls per request (1 = no packing)")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight (packed mode)")
+    parser.add_argument("--token-budget", type=float, default=0,
+                        help="stop once this many billed tokens are spent (0 = no limit)")
+    parser.add_argument("--poll-seconds", type=float, default=30.0, help="batch status poll interval")
+    parser.add_argument("--db", help="progress database (default DATA_DIR/backfill.sqlite3)")
+    parser.add_argument("--report", action="store_true", help="print the run report and exit")
+    parser.add_argument("--json", action="store_true", help="print this run's summary as JSON")
+    args = parser.parse_args()
+
+    from backend.logging_config import setup_logging
+    setup_logging()
+
+    store = BackfillStore(args.db)
+    if args.report:
+        print_report(store)
+        return
+    if args.manifest:
+        added = store.add_calls(load_manifest(args.manifest))
+        log.info(f"📥 {added} new calls queued from {args.manifest}")
+    backfill = Backfill(store, args.mode, args.pack_size, args.concurrency, args.token_budget, args.poll_seconds)
+    try:
+        run = backfill.run()
+    except KeyboardInterrupt:
+        run = store.run(backfill.run_id)
+        log.warning("Backfill interrupted; run it again to resume")
+    summary = run_summary(run)
+    if args.json:
+        print(json.dumps({**summary, "calls": store.counts()}))
+    else:
+        print_report(store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# backend/blob_store.py
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+from backend.sqlite_cache import DATA_DIR
+
+log = logging.getLogger("salessense.backend")
+
+# Uploaded audio, stored once per distinct content and shared by every request
+# that sends the same bytes
+BLOB_DIR = Path(os.getenv("SALESSENSE_BLOB_DIR", DATA_DIR / "blobs"))
+# Disk the store may use; GC removes unreferenced blobs, least recently used
+# first, until it fits (0 = no quota)
+BLOB_QUOTA_BYTES = int(float(os.getenv("SALESSENSE_BLOB_QUOTA_MB", "5120")) * 1024 * 1024)
+# Unreferenced blobs are kept this long so a re-upload or retry finds them
+BLOB_RETENTION_HOURS = float(os.getenv("SALESSENSE_BLOB_RETENTION_HOURS", "24"))
+BLOB_GC_SECONDS = float(os.getenv("SALESSENSE_BLOB_GC_SECONDS", "600"))
+# A reference older than this belonged to a request that never released it
+STALE_REF_SECONDS = 6 * 3600
+# Partial writes left behind by a crash are removed after this long
+STALE_TMP_SECONDS = 3600
+BLOCK_SIZE = 1024 * 1024
+
+
+class BlobRef:
+    """One request's hold on a stored blob; release it through the store when done."""
+
+    def __init__(self, ref_id: str, sha: str, path: Path, size: int, hasher, deduplicated: bool):
+        self.ref_id = ref_id
+        self.sha = sha
+        self.path = path
+        self.size = size
+        # sha256 over the bytes, for callers that derive more keys from it
+        self.hasher = hasher
+        self.deduplicated = deduplicated
+
+
+class BlobWriter:
+    """Streams bytes into a temporary file, hashing them; `commit` files them under their sha256."""
+
+    def __init__(self, store: "BlobStore", owner: str):
+        self.store = store
+        self.owner = owner
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.tmp_path = store.tmp_dir / f"{uuid.uuid4().hex}.part"
+        self._file = open(self.tmp_path, "wb")
+        self.ref: Optional[BlobRef] = None
+
+    def write(self, block: bytes):
+        self.hasher.update(block)
+        self._file.write(block)
+        self.size += len(block)
+
+    def commit(self) -> BlobRef:
+        self._file.close()
+        self.ref = self.store._commit(self)
+        return self.ref
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        # Uncommitted (an error, or the caller never committed): discard the partial file
+        if self.ref is None:
+            self.abort()
+
+
+class BlobStore:
+    """Content-addressed audio store: blobs/<ab>/<cd>/<sha256>, reference counted in SQLite.
+
+    Each request writing (or reusing) a blob holds a reference until it
+    releases it, and referenced blobs are never collected. Identical uploads
+    share one file. A blob is moved into place by an atomic rename inside the
+    same transaction that records the reference, so GC, which deletes in a
+    transaction too, can never remove a file a request is about to use.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or BLOB_DIR)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(self.root / "blobs.sqlite3")
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " sha TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used_at REAL NOT NULL,"
+                " puts INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS refs ("
+                " ref_id TEXT PRIMARY KEY,"
+                " sha TEXT NOT NULL,"
+                " owner TEXT,"
+                " worker_pid INTEGER NOT NULL,"
+                " acquired_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_refs_sha ON refs(sha)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs(last_used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha[2:4] / sha
+
+    def writer(self, owner: str = "") -> BlobWriter:
+        return BlobWriter(self, owner)
+
+    def put(self, fileobj: BinaryIO, owner: str = "") -> BlobRef:
+        """Store the contents of an open file and return a reference to them."""
+        with self.writer(owner) as writer:
+            while block := fileobj.read(BLOCK_SIZE):
+                writer.write(block)
+            return writer.commit()
+
+    def _commit(self, writer: BlobWriter) -> BlobRef:
+        sha = writer.hasher.hexdigest()
+        final = self.path(sha)
+        ref_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO blobs (sha, size, created_at, last_used_at, puts) VALUES (?, ?, ?, ?, 1)"
+                " ON CONFLICT(sha) DO UPDATE SET last_used_at = excluded.last_used_at, puts = puts + 1",
+                (sha, writer.size, now, now),
+            )
+            conn.execute("INSERT INTO refs VALUES (?, ?, ?, ?, ?)", (ref_id, sha, writer.owner, os.getpid(), now))
+            deduplicated = final.exists()
+            if deduplicated:
+                os.remove(writer.tmp_path)
+            else:
+                final.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(writer.tmp_path, final)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return BlobRef(ref_id, sha, final, writer.size, writer.hasher, deduplicated)
+
+    def release(self, ref: Optional[BlobRef]):
+        """Drop a reference; the blob stays until GC finds it unreferenced past retention or over quota."""
+        if ref is None:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM refs WHERE ref_id = ?", (ref.ref_id,))
+
+    def _drop_stale_refs(self, conn: sqlite3.Connection, now: float) -> int:
+        dropped = conn.execute("DELETE FROM refs WHERE acquired_at < ?", (now - STALE_REF_SECONDS,)).rowcount
+        for (pid,) in conn.execute("SELECT DISTINCT worker_pid FROM refs").fetchall():
+            if not _pid_alive(pid):
+                dropped += conn.execute("DELETE FROM refs WHERE worker_pid = ?", (pid,)).rowcount
+        return dropped
+
+    def gc(self, quota_bytes: int = BLOB_QUOTA_BYTES, retention_hours: float = BLOB_RETENTION_HOURS) -> Dict[str, Any]:
+        """Remove unreferenced blobs past retention, then more (least recently used first) while over quota."""
+        start = time.time()
+        removed, freed = 0, 0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            stale_refs = self._drop_stale_refs(conn, start)
+            stored = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            candidates = conn.execute(
+                "SELECT sha, size, last_used_at FROM blobs"
+                " WHERE NOT EXISTS (SELECT 1 FROM refs WHERE refs.sha = blobs.sha) ORDER BY last_used_at"
+            ).fetchall()
+            for row in candidates:
+                expired = start - row["last_used_at"] > retention_hours * 3600
+                if not expired and not (quota_bytes and stored - freed > quota_bytes):
+                    continue
+                conn.execute("DELETE FROM blobs WHERE sha = ?", (row["sha"],))
+                try:
+                    os.remove(self.path(row["sha"]))
+                except FileNotFoundError:
+                    pass
+                removed += 1
+                freed += row["size"]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        for tmp in self.tmp_dir.iterdir():
+            try:
+                if start - tmp.stat().st_mtime > STALE_TMP_SECONDS:
+                    tmp.unlink()
+            except FileNotFoundError:
+                continue
+        report = {**self.stats(), "quota_bytes": quota_bytes or None, "retention_hours": retention_hours,
+                  "removed": removed, "freed_bytes": freed, "stale_refs_dropped": stale_refs,
+                  "seconds": round(time.time() - start, 3)}
+        if quota_bytes and report["stored_bytes"] > quota_bytes:
+            log.warning(f"Blob store is over quota with {report['stored_bytes'] / 2**20:.0f} MB in use by requests")
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            blobs, stored, logical, puts = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(size * puts), 0), COALESCE(SUM(puts), 0)"
+                " FROM blobs"
+            ).fetchone()
+            refs, referenced = conn.execute("SELECT COUNT(*), COUNT(DISTINCT sha) FROM refs").fetchone()
+        return {
+            "blobs": blobs,
+            "stored_bytes": stored,
+            # What the same uploads would take without dedup
+            "logical_bytes": logical,
+            "dedup_ratio": round(logical / stored, 2) if stored else None,
+            "uploads": puts,
+            "references": refs,
+            "referenced_blobs": referenced,
+            "quota_bytes": BLOB_QUOTA_BYTES or None,
+            "retention_hours": BLOB_RETENTION_HOURS,
+        }
+
+
+_shared: Optional[BlobStore] = None
+
+
+def shared_store() -> BlobStore:
+    """The store at BLOB_DIR, created on first use and shared within the process."""
+    global _shared
+    if _shared is None:
+        _shared = BlobStore()
+    return _shared
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
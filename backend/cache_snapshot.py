@@ -0,0 +1,106 @@
+# backend/cache_snapshot.py
+import fcntl
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import msgpack
+
+# Memory caches are written to DATA_DIR/<name>.snapshot on shutdown and every
+# CACHE_SNAPSHOT_SECONDS (0 = only on shutdown), and loaded again at startup
+CACHE_SNAPSHOTS = os.getenv("SALESSENSE_CACHE_SNAPSHOTS", "1") == "1"
+CACHE_SNAPSHOT_SECONDS = float(os.getenv("SALESSENSE_CACHE_SNAPSHOT_SECONDS", "300"))
+SNAPSHOT_VERSION = 1
+
+# key, packed value (as the cache holds it), unix timestamp, rep, prompt version
+Entry = Tuple[str, bytes, float, str, str]
+
+
+@dataclass
+class Invalidation:
+    """Which cache entries to drop; every condition given must hold."""
+    prefix: Optional[str] = None
+    rep: Optional[str] = None
+    older_than_seconds: Optional[float] = None
+    # Drop entries made with this prompt version...
+    prompt_version: Optional[str] = None
+    # ...or with any version other than this one (the current prompts)
+    stale_for_prompt_version: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        return all(v is None for v in (self.prefix, self.rep, self.older_than_seconds,
+                                       self.prompt_version, self.stale_for_prompt_version))
+
+    def matches(self, key: str, timestamp: float, rep: str, prompt_version: str, now: float) -> bool:
+        return ((self.prefix is None or key.startswith(self.prefix))
+                and (self.rep is None or rep == self.rep)
+                and (self.older_than_seconds is None or now - timestamp > self.older_than_seconds)
+                and (self.prompt_version is None or prompt_version == self.prompt_version)
+                and (self.stale_for_prompt_version is None or prompt_version != self.stale_for_prompt_version))
+
+    def sql(self) -> Tuple[str, list]:
+        """WHERE clause and parameters for a table with key, timestamp, rep and prompt_version."""
+        clauses, params = [], []
+        if self.prefix is not None:
+            clauses.append("substr(key, 1, ?) = ?")
+            params += [len(self.prefix), self.prefix]
+        if self.rep is not None:
+            clauses.append("COALESCE(rep, '') = ?")
+            params.append(self.rep)
+        if self.older_than_seconds is not None:
+            clauses.append("timestamp < ?")
+            params.append(time.time() - self.older_than_seconds)
+        if self.prompt_version is not None:
+            clauses.append("COALESCE(prompt_version, '') = ?")
+            params.append(self.prompt_version)
+        if self.stale_for_prompt_version is not None:
+            clauses.append("COALESCE(prompt_version, '') != ?")
+            params.append(self.stale_for_prompt_version)
+        return " AND ".join(clauses) or "1", params
+
+
+def read_snapshot(path: Path) -> List[Entry]:
+    """Entries of a snapshot file, or none if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            data = msgpack.unpackb(f.read(), raw=False)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, msgpack.UnpackException):
+        return []
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return []
+    return [tuple(entry) for entry in data["entries"]]
+
+
+def write_snapshot(path: Path, entries: Iterable[Entry], max_entries: int, ttl_seconds: float,
+                   drop: Optional[Invalidation] = None, replace: bool = False) -> int:
+    """Merge entries into the snapshot file and return how many it holds.
+
+    Every worker with a memory cache writes the same file, so entries already
+    there are kept unless this worker has a newer copy (or `replace` is set):
+    the next start loads what all of them had. `drop` removes matching
+    entries from the file too. Writes go to a temporary file renamed over the
+    snapshot, under a lock, so a reader never sees half a file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged = {} if replace else {e[0]: e for e in read_snapshot(path)}
+        for entry in entries:
+            current = merged.get(entry[0])
+            if current is None or current[2] <= entry[2]:
+                merged[entry[0]] = entry
+        kept = [e for e in merged.values()
+                if now - e[2] <= ttl_seconds and not (drop and drop.matches(e[0], e[2], e[3], e[4], now))]
+        kept.sort(key=lambda e: e[2], reverse=True)
+        kept = kept[:max_entries]
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(msgpack.packb({"version": SNAPSHOT_VERSION, "entries": [list(e) for e in kept]},
+                                  use_bin_type=True))
+        os.replace(tmp, path)
+    return len(kept)
@@ -0,0 +1,120 @@
+# backend/chunked_upload.py
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+from backend.sqlite_cache import DATA_DIR
+
+UPLOAD_SESSION_DIR = Path(os.getenv("SALESSENSE_UPLOAD_SESSION_DIR", DATA_DIR / "upload_sessions"))
+MAX_CHUNK_BYTES = int(os.getenv("SALESSENSE_MAX_CHUNK_BYTES", 16 * 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("SALESSENSE_MAX_UPLOAD_BYTES", 500 * 1024 * 1024))
+# Unfinished sessions older than this are removed
+SESSION_TTL_HOURS = float(os.getenv("SALESSENSE_UPLOAD_SESSION_TTL_HOURS", "24"))
+
+
+class UploadError(ValueError):
+    """Client-side problem with a chunked upload (bad checksum, unknown id, missing chunks)."""
+
+
+class ChunkedUploadStore:
+    """Resumable uploads: each chunk is its own file, verified on arrival.
+
+    Received chunks are whatever chunk files exist on disk, so any worker can
+    accept any chunk and a client can ask which ones are still missing.
+    """
+
+    def __init__(self, root: Path = UPLOAD_SESSION_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _session_dir(self, upload_id: str) -> Path:
+        if not upload_id.isalnum():
+            raise UploadError("Invalid upload id")
+        path = self.root / upload_id
+        if not (path / "manifest.json").exists():
+            raise UploadError("Unknown or expired upload id")
+        return path
+
+    def _manifest(self, upload_id: str) -> Dict[str, Any]:
+        return json.loads((self._session_dir(upload_id) / "manifest.json").read_text())
+
+    @staticmethod
+    def _chunk_name(index: int) -> str:
+        return f"chunk_{index:06d}.part"
+
+    def init_upload(self, filename: str, size: int, chunk_size: int) -> Dict[str, Any]:
+        if size <= 0 or size > MAX_UPLOAD_BYTES:
+            raise UploadError(f"size must be between 1 and {MAX_UPLOAD_BYTES} bytes")
+        if chunk_size <= 0 or chunk_size > MAX_CHUNK_BYTES:
+            raise UploadError(f"chunk_size must be between 1 and {MAX_CHUNK_BYTES} bytes")
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        manifest = {
+            "upload_id": upload_id,
+            "filename": os.path.basename(filename) or "upload",
+            "size": size,
+            "chunk_size": chunk_size,
+            "total_chunks": math.ceil(size / chunk_size),
+            "created_at": time.time(),
+        }
+        path = self.root / upload_id
+        path.mkdir(parents=True)
+        (path / "manifest.json").write_text(json.dumps(manifest))
+        return manifest
+
+    def put_chunk(self, upload_id: str, index: int, data: bytes, checksum: str) -> Dict[str, Any]:
+        manifest = self._manifest(upload_id)
+        total = manifest["total_chunks"]
+        if not 0 <= index < total:
+            raise UploadError(f"chunk index must be between 0 and {total - 1}")
+        expected = manifest["chunk_size"] if index < total - 1 else manifest["size"] - manifest["chunk_size"] * (total - 1)
+        if len(data) != expected:
+            raise UploadError(f"chunk {index} should be {expected} bytes, got {len(data)}")
+        if hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise UploadError(f"checksum mismatch for chunk {index}")
+
+        session = self._session_dir(upload_id)
+        tmp = session / f"{self._chunk_name(index)}.{uuid.uuid4().hex}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, session / self._chunk_name(index))  # atomic: a chunk is either complete or absent
+        return {"upload_id": upload_id, "index": index, "received": True}
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        manifest = self._manifest(upload_id)
+        session = self._session_dir(upload_id)
+        received = sorted(
+            int(p.name[6:12]) for p in session.glob("chunk_*.part")
+        )
+        missing = sorted(set(range(manifest["total_chunks"])) - set(received))
+        return {**manifest, "received": received, "missing": missing, "complete": not missing}
+
+    def assemble(self, upload_id: str, out):
+        """Concatenate chunks into `out` (anything with write(), e.g. a BlobWriter) and return the manifest."""
+        status = self.status(upload_id)
+        if status["missing"]:
+            raise UploadError(f"upload incomplete, missing chunks: {status['missing'][:20]}")
+        session = self._session_dir(upload_id)
+        for index in range(status["total_chunks"]):
+            with open(session / self._chunk_name(index), "rb") as chunk:
+                for block in iter(lambda: chunk.read(1024 * 1024), b""):
+                    out.write(block)
+        return status
+
+    def delete(self, upload_id: str):
+        shutil.rmtree(self.root / upload_id, ignore_errors=True)
+
+    def cleanup_expired(self):
+        cutoff = time.time() - SESSION_TTL_HOURS * 3600
+        for session in self.root.iterdir():
+            manifest = session / "manifest.json"
+            try:
+                if manifest.stat().st_mtime < cutoff:
+                    shutil.rmtree(session, ignore_errors=True)
+            except FileNotFoundError:
+                continue
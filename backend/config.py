@@ -0,0 +1,20 @@
+# backend/config.py
+import threading
+from pathlib import Path
+
+ENV_FILE = Path(__file__).resolve().parent / ".env"
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+def load_env():
+    """Load backend/.env once per process, wherever the app was started from."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            if ENV_FILE.exists():
+                from dotenv import load_dotenv
+                load_dotenv(dotenv_path=ENV_FILE)
+            _env_loaded = True
@@ -1,62 +1,102 @@
 # backend/crewai_transcription.py
-import assemblyai as aai
 import os
-import tempfile
-from dotenv import load_dotenv
+
+from backend.config import load_env
 
 # Load environment variables
-load_dotenv(dotenv_path=r"backend\.env")
+load_env()
+
+# "assemblyai" for real transcription; "fake" uses the local stand-in (load tests, offline runs)
+TRANSCRIBER = os.getenv("SALESSENSE_TRANSCRIBER", "assemblyai")
+
+def get_assemblyai():
+    """Import the AssemblyAI SDK on first use and configure its API key."""
+    import assemblyai as aai
+    if not aai.settings.api_key:
+        aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+    return aai
+
+def transcription_config(aai):
+    """Speaker diarization with formatted, punctuated text and language detection."""
+    return aai.TranscriptionConfig(
+        speaker_labels=True,
+        format_text=True,
+        punctuate=True,
+        speech_model=aai.SpeechModel.best,
+        language_detection=True
+    )
 
-# Set AssemblyAI API key
-aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
+def format_transcript(transcript) -> str:
+    """Transcript text with one "Speaker X: ..." line per utterance."""
+    if transcript.utterances:
+        return "\n".join([
+            f"Speaker {utterance.speaker}: {utterance.text}"
+            for utterance in transcript.utterances
+        ])
+    # Fallback to regular transcript if no utterances
+    return transcript.text or "No speech detected"
 
 def transcribe_crew_ai(audio_file):
     """
     Transcribes an uploaded audio file using AssemblyAI with speaker labels.
     Returns transcript text with speaker diarization.
     """
-    # Save the uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-        tmp.write(audio_file.read())
-        tmp_path = tmp.name
+    if TRANSCRIBER == "fake":
+        from backend.stand_ins import fake_transcribe
+        return fake_transcribe(audio_file)
+    aai = get_assemblyai()
+    # An open file on disk is sent as is; anything else is streamed into the
+    # blob store first (shared with uploads of the same bytes), never read
+    # into memory whole
+    name = getattr(audio_file, "name", None)
+    blob, store = None, None
+    if isinstance(name, str) and os.path.isfile(name):
+        audio_path = name
+    else:
+        from backend.blob_store import shared_store
+        store = shared_store()
+        blob = store.put(audio_file, owner="transcription")
+        audio_path = str(blob.path)
 
     try:
-        # Transcription config with speaker diarization
-        config = aai.TranscriptionConfig(
-            speaker_labels=True,
-            format_text=True,
-            punctuate=True,
-            speech_model=aai.SpeechModel.best,
-            language_detection=True
-        )
-
-        transcriber = aai.Transcriber(config=config)
-        transcript = transcriber.transcribe(tmp_path)
+        transcriber = aai.Transcriber(config=transcription_config(aai))
+        transcript = transcriber.transcribe(audio_path)
 
         if transcript.status == aai.TranscriptStatus.error:
             raise RuntimeError(f"Transcription failed: {transcript.error}")
 
         # Format transcript with speaker labels
-        if transcript.utterances:
-            formatted_transcript = "\n".join([
-                f"Speaker {utterance.speaker}: {utterance.text}" 
-                for utterance in transcript.utterances
-            ])
-        else:
-            # Fallback to regular transcript if no utterances
-            formatted_transcript = transcript.text or "No speech detected"
-
-        return formatted_transcript
+        return format_transcript(transcript)
 
     finally:
-        # Clean up temporary file
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        if blob is not None:
+            store.release(blob)
 
-def remove_file(file_path: str) -> None:
-    """Quick cleanup - keeping same interface as your current code"""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    except Exception:
-        pass
+class AssemblyAITranscriptionService:
+    """Submit-and-callback transcription: AssemblyAI POSTs to the webhook when it is done.
+
+    Nothing blocks while the audio is processed; only submit (which uploads
+    the file) and fetch are calls on a thread.
+    """
+
+    def submit(self, file_path: str, webhook_url: str, auth_header: tuple = (None, None)) -> str:
+        aai = get_assemblyai()
+        config = transcription_config(aai).set_webhook(webhook_url, *auth_header)
+        transcript = aai.Transcriber(config=config).submit(file_path)
+        if transcript.status == aai.TranscriptStatus.error:
+            raise RuntimeError(f"Transcription submit failed: {transcript.error}")
+        return transcript.id
+
+    def status(self, transcript_id: str) -> str:
+        """queued, processing, completed or error"""
+        return get_assemblyai().Transcript.get_by_id(transcript_id).status.value
+
+    def fetch(self, transcript_id: str) -> str:
+        aai = get_assemblyai()
+        transcript = aai.Transcript.get_by_id(transcript_id)
+        if transcript.status == aai.TranscriptStatus.error:
+            raise RuntimeError(f"Transcription failed: {transcript.error}")
+        # An early or forged callback must not turn an unfinished transcript into text
+        if transcript.status != aai.TranscriptStatus.completed:
+            raise RuntimeError(f"Transcript {transcript_id} is {transcript.status.value}, not completed")
+        return format_transcript(transcript)
@@ -0,0 +1,234 @@
+# backend/ingest_watcher.py
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.sqlite_cache import DATA_DIR
+
+log = logging.getLogger("salessense.backend")
+
+# Drop directory to watch (where Dialpad exports land); unset turns ingest off
+INGEST_DIR = os.getenv("SALESSENSE_INGEST_DIR", "")
+INGEST_POLL_SECONDS = float(os.getenv("SALESSENSE_INGEST_POLL_SECONDS", "5"))
+# A file is picked up once its size and mtime have not changed for this long
+INGEST_SETTLE_SECONDS = float(os.getenv("SALESSENSE_INGEST_SETTLE_SECONDS", "10"))
+# Pre-analyses running at once in each worker; they queue as batch work behind uploads
+INGEST_CONCURRENCY = int(os.getenv("SALESSENSE_INGEST_CONCURRENCY", "2"))
+INGEST_TENANT = os.getenv("SALESSENSE_INGEST_TENANT", "default")
+# Rep whose calls land in the drop directory, if it is one rep's export
+INGEST_REP = os.getenv("SALESSENSE_INGEST_REP", "")
+INGEST_EXTENSIONS = (".mp3", ".wav", ".m4a", ".aac")
+# Names browsers and sync tools give files that are still being written
+PARTIAL_SUFFIXES = (".part", ".partial", ".tmp", ".crdownload", ".download")
+# A claim older than this belonged to a worker that died mid-analysis
+STALE_CLAIM_SECONDS = 3600
+# How often a worker re-reads which recordings are claimed, to notice stale claims
+CLAIMS_REFRESH_SECONDS = 300
+
+# Dialpad export names: "Jane Roe (469) 569-4320 Aug 5, 2025.mp3"
+DIALPAD_NAME = re.compile(
+    r"^(?P<contact>.+?)\s*\((?P<area>\d{3})\)\s*(?P<number>[\d-]+)\s+(?P<date>[A-Z][a-z]{2} \d{1,2}, \d{4})"
+)
+
+
+def ingest_context(filename: str) -> Dict[str, str]:
+    """Participants, details and call types for a dropped recording, from its file name."""
+    stem = Path(filename).stem
+    match = DIALPAD_NAME.match(stem)
+    contact = match.group("contact").strip() if match else stem
+    participants = f"{contact} (Prospect)"
+    if INGEST_REP:
+        participants = f"{INGEST_REP} (Sales Rep), {participants}"
+    if match:
+        details = f"Dialpad call with {contact} ({match.group('area')}) {match.group('number')} on {match.group('date')}"
+    else:
+        details = f"Dialpad call recording {filename}"
+    return {"participants": participants, "details": details, "call_types": "Other"}
+
+
+class IngestStore:
+    """Recordings seen in the drop directory and their pre-analysis, shared by every worker.
+
+    Workers claim a file with a conditional write, so each new or changed file
+    is analysed once however many workers are watching.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or DATA_DIR / "ingest.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recordings ("
+                " path TEXT PRIMARY KEY,"
+                " filename TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"
+                " worker_pid INTEGER,"
+                " claimed_at REAL NOT NULL,"
+                " finished_at REAL,"
+                " analysis_id TEXT,"
+                " audio_sha TEXT,"
+                " error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_recordings_claimed ON recordings(claimed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def versions(self) -> Dict[str, Tuple[int, int]]:
+        """(size, mtime_ns) by path of the recordings handled or being handled (stale claims left out)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT path, size, mtime_ns FROM recordings"
+                                " WHERE status != 'processing' OR claimed_at >= ?",
+                                (time.time() - STALE_CLAIM_SECONDS,))
+            return {r["path"]: (r["size"], r["mtime_ns"]) for r in rows}
+
+    def claim(self, path: str, size: int, mtime_ns: int) -> bool:
+        """Take a new, changed or abandoned recording for this worker."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO recordings (path, filename, size, mtime_ns, status, worker_pid, claimed_at)"
+                " VALUES (?, ?, ?, ?, 'processing', ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns,"
+                " status = 'processing', worker_pid = excluded.worker_pid, claimed_at = excluded.claimed_at,"
+                " finished_at = NULL, analysis_id = NULL, error = NULL"
+                " WHERE CASE recordings.status WHEN 'processing' THEN recordings.claimed_at < ?"
+                " ELSE recordings.size != excluded.size OR recordings.mtime_ns != excluded.mtime_ns END",
+                (path, os.path.basename(path), size, mtime_ns, os.getpid(), now, now - STALE_CLAIM_SECONDS),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, path: str):
+        """Give a claim back (shutdown mid-analysis) so the next scan picks the file up again."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM recordings WHERE path = ? AND status = 'processing' AND worker_pid = ?",
+                         (path, os.getpid()))
+
+    def finish(self, path: str, analysis_id: str, audio_sha: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE recordings SET status = 'done', finished_at = ?, analysis_id = ?, audio_sha = ?"
+                         " WHERE path = ?", (time.time(), analysis_id, audio_sha, path))
+
+    def fail(self, path: str, error: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE recordings SET status = 'failed', finished_at = ?, error = ? WHERE path = ?",
+                         (time.time(), error, path))
+
+    def recent(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        query, params = "SELECT * FROM recordings", []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY claimed_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(query, params)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM recordings GROUP BY status").fetchall())
+            row = conn.execute("SELECT AVG(finished_at - claimed_at) FROM recordings WHERE status = 'done'").fetchone()
+        return {"by_status": counts, "avg_analysis_seconds": round(row[0], 1) if row[0] else None}
+
+
+class DirectoryWatcher:
+    """Polls a drop directory and pre-analyses each recording once it has finished arriving.
+
+    Polling (one scandir per interval) works on every platform and on network
+    mounts, where inotify sees nothing. A file counts as complete once its size
+    and mtime have stayed the same for INGEST_SETTLE_SECONDS, which skips
+    exports that are still being copied in.
+    """
+
+    def __init__(self, directory: str, process: Callable[[str], Awaitable[Dict[str, str]]],
+                 store: Optional[IngestStore] = None, poll_seconds: float = INGEST_POLL_SECONDS,
+                 settle_seconds: float = INGEST_SETTLE_SECONDS, concurrency: int = INGEST_CONCURRENCY):
+        self.directory = directory
+        self.process = process
+        self.store = store or IngestStore()
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        # path -> (size, mtime_ns, monotonic time first seen at that version)
+        self._pending: Dict[str, Tuple[int, int, float]] = {}
+        # Versions already claimed (by any worker), so a scan skips them without a query
+        self._claimed: Dict[str, Tuple[int, int]] = {}
+        self._tasks: set = set()
+
+    def scan(self) -> List[Tuple[str, int, int]]:
+        """(path, size, mtime_ns) of recordings that have settled and are not yet claimed."""
+        now = time.monotonic()
+        present, ready = set(), []
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            log.warning(f"Ingest directory {self.directory} does not exist")
+            return []
+        for entry in entries:
+            name = entry.name
+            if name.startswith(".") or name.lower().endswith(PARTIAL_SUFFIXES) \
+                    or not name.lower().endswith(INGEST_EXTENSIONS) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            version = (stat.st_size, stat.st_mtime_ns)
+            present.add(entry.path)
+            if self._claimed.get(entry.path) == version or stat.st_size == 0:
+                continue
+            seen = self._pending.get(entry.path)
+            if seen is None or seen[:2] != version:
+                # New or still growing: start (or restart) the settle timer
+                self._pending[entry.path] = (*version, now)
+            elif now - seen[2] >= self.settle_seconds:
+                del self._pending[entry.path]
+                ready.append((entry.path, *version))
+        for path in set(self._pending) - present:
+            del self._pending[path]
+        return ready
+
+    async def _ingest(self, path: str, size: int, mtime_ns: int):
+        async with self._slots:
+            try:
+                log.info(f"📥 Pre-analysing {os.path.basename(path)}")
+                result = await self.process(path)
+                await asyncio.to_thread(self.store.finish, path, result["analysis_id"], result["audio_sha"])
+                log.info(f"✅ Pre-analysed {os.path.basename(path)} as {result['analysis_id'][:8]}")
+            except asyncio.CancelledError:
+                await asyncio.shield(asyncio.to_thread(self.store.release, path))
+                raise
+            except Exception as e:
+                log.error(f"❌ Pre-analysis of {path} failed: {e}")
+                await asyncio.to_thread(self.store.fail, path, str(e))
+
+    async def run(self):
+        log.info(f"👀 Watching {self.directory} for new recordings (every {self.poll_seconds:.0f}s)")
+        next_refresh = 0.0
+        try:
+            while True:
+                if time.monotonic() >= next_refresh:
+                    self._claimed = await asyncio.to_thread(self.store.versions)
+                    next_refresh = time.monotonic() + CLAIMS_REFRESH_SECONDS
+                for path, size, mtime_ns in await asyncio.to_thread(self.scan):
+                    self._claimed[path] = (size, mtime_ns)
+                    if not await asyncio.to_thread(self.store.claim, path, size, mtime_ns):
+                        continue  # another worker has it
+                    task = asyncio.create_task(self._ingest(path, size, mtime_ns))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                await asyncio.sleep(self.poll_seconds)
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def status(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "settling": len(self._pending), "running": len(self._tasks)}
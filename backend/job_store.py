@@ -0,0 +1,214 @@
+# backend/job_store.py
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.result_codec import pack, unpack
+from backend.sqlite_cache import DATA_DIR
+
+ACTIVE_STATUSES = ("queued", "running")
+# Pipeline stages in order, as reported by run_analysis; a job may skip some
+STAGES = ("received", "fingerprinting", "waiting_for_quota", "transcribing", "waiting_for_agents", "analyzing", "done")
+# Stages whose duration grows with the length of the recording
+SCALED_STAGES = ("fingerprinting", "transcribing", "analyzing")
+# Used for ETAs until a stage has history: seconds, or seconds per audio second for scaled stages
+DEFAULT_STAGE_SECONDS = {
+    "received": 1.0,
+    "fingerprinting": 0.02,
+    "waiting_for_quota": 0.5,
+    "transcribing": 0.3,
+    "waiting_for_agents": 0.5,
+    "analyzing": 0.05,
+}
+# Only the most recent timings per stage feed the estimate
+HISTORY_SIZE = 200
+# A stage running this many times longer than expected is reported as overdue
+OVERDUE_FACTOR = float(os.getenv("SALESSENSE_OVERDUE_FACTOR", "3"))
+# Rough audio length from file size when ffprobe can't tell (128 kbps)
+BYTES_PER_AUDIO_SECOND = 16000
+
+
+class JobStore:
+    """Analysis job state in SQLite so any worker can answer for any job."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or DATA_DIR / "jobs.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " stage TEXT NOT NULL,"
+                " filename TEXT,"
+                " worker_pid INTEGER,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " error TEXT,"
+                " result BLOB)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+            # Columns added after the first release of this table
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("stage_started_at", "REAL"), ("audio_seconds", "REAL"), ("result_version", "INTEGER")):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stage_timings ("
+                " job_id TEXT NOT NULL,"
+                " stage TEXT NOT NULL,"
+                " seconds REAL NOT NULL,"
+                " audio_seconds REAL,"
+                " finished_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_timings_stage ON stage_timings(stage, finished_at)")
+
+    def create(self, job_id: str, filename: str = "", status: str = "running", stage: str = "received"):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, stage, filename, worker_pid, created_at, updated_at, stage_started_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, status, stage, filename, os.getpid(), now, now, now),
+            )
+
+    def update(self, job_id: str, **fields):
+        """Update any of status, stage, audio_seconds, error or result (a dict, stored packed) for a job.
+
+        Leaving a stage (a new stage, or a terminal status) records how long it
+        took, which is what ETAs for later jobs are built from.
+        """
+        if "result" in fields and fields["result"] is not None:
+            # A preview result is replaced by the final one; progress reports which is there
+            fields["result_version"] = fields["result"].get("result_version")
+            fields["result"] = pack(fields["result"])
+        now = fields["updated_at"] = time.time()
+        with self._connect() as conn:
+            finishing = fields.get("status") not in (None, *ACTIVE_STATUSES)
+            if "stage" in fields or finishing:
+                row = conn.execute(
+                    "SELECT stage, stage_started_at, audio_seconds FROM jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if row is not None and row["stage_started_at"] and row["stage"] != fields.get("stage"):
+                    # Failed stages aren't representative of how long the stage takes
+                    if fields.get("status") != "failed":
+                        conn.execute(
+                            "INSERT INTO stage_timings VALUES (?, ?, ?, ?, ?)",
+                            (job_id, row["stage"], now - row["stage_started_at"],
+                             fields.get("audio_seconds", row["audio_seconds"]), now),
+                        )
+                    fields["stage_started_at"] = None if finishing else now
+            columns = ", ".join(f"{name} = ?" for name in fields)
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job["result"]:
+            job["result"] = unpack(job["result"])
+        return job
+
+    def list_active(self, worker_pid: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT job_id, status, stage, filename, worker_pid, created_at, updated_at FROM jobs" \
+                f" WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})"
+        params: list = list(ACTIVE_STATUSES)
+        if worker_pid is not None:
+            query += " AND worker_pid = ?"
+            params.append(worker_pid)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def mark_interrupted(self, worker_pid: int) -> int:
+        """Flag jobs a worker could not finish before shutting down."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = 'interrupted', updated_at = ?"
+                f" WHERE worker_pid = ? AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+                (time.time(), worker_pid, *ACTIVE_STATUSES),
+            )
+            return cursor.rowcount
+
+    def stage_estimates(self) -> Dict[str, float]:
+        """Median recent duration per stage (per audio second for SCALED_STAGES)."""
+        estimates = dict(DEFAULT_STAGE_SECONDS)
+        with self._connect() as conn:
+            for stage in DEFAULT_STAGE_SECONDS:
+                scaled = stage in SCALED_STAGES
+                rows = conn.execute(
+                    "SELECT seconds, audio_seconds FROM stage_timings WHERE stage = ?"
+                    + (" AND audio_seconds > 0" if scaled else "")
+                    + " ORDER BY finished_at DESC LIMIT ?",
+                    (stage, HISTORY_SIZE),
+                ).fetchall()
+                values = sorted(r["seconds"] / r["audio_seconds"] if scaled else r["seconds"] for r in rows)
+                if values:
+                    estimates[stage] = values[len(values) // 2]
+        return estimates
+
+    def progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current stage, elapsed time and an ETA from historical stage timings."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id, status, stage, filename, worker_pid, created_at, updated_at, error,"
+                " stage_started_at, audio_seconds, result_version FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        now = time.time()
+        end = now if job["status"] in ACTIVE_STATUSES else job["updated_at"]
+        progress = {
+            "job_id": job_id,
+            "status": job["status"],
+            "stage": job["stage"],
+            "filename": job["filename"],
+            "worker_pid": job["worker_pid"],
+            "error": job["error"],
+            "audio_seconds": job["audio_seconds"],
+            # Rises when a preview, then the final result, is available from /jobs/{job_id}
+            "result_version": job["result_version"],
+            "elapsed_seconds": round(end - job["created_at"], 1),
+            "seconds_since_update": round(now - job["updated_at"], 1),
+        }
+        if job["status"] not in ACTIVE_STATUSES:
+            done = job["status"] == "completed"
+            return {**progress, "percent": 100 if done else None, "eta_seconds": 0 if done else None,
+                    "stage_elapsed_seconds": None, "expected_stage_seconds": None, "overdue": False}
+
+        estimates = self.stage_estimates()
+        audio_seconds = job["audio_seconds"] or 0
+
+        def expected(stage: str) -> float:
+            return estimates.get(stage, 0.0) * (audio_seconds if stage in SCALED_STAGES else 1)
+
+        stage = job["stage"]
+        stage_elapsed = now - (job["stage_started_at"] or job["updated_at"])
+        expected_stage = expected(stage)
+        remaining = max(expected_stage - stage_elapsed, 0.0)
+        if stage in STAGES:
+            remaining += sum(expected(s) for s in STAGES[STAGES.index(stage) + 1:])
+        elapsed = progress["elapsed_seconds"]
+        return {
+            **progress,
+            "percent": round(100 * elapsed / (elapsed + remaining), 1) if elapsed + remaining else 0,
+            "eta_seconds": round(remaining, 1),
+            "stage_elapsed_seconds": round(stage_elapsed, 1),
+            "expected_stage_seconds": round(expected_stage, 1),
+            # Slow jobs still move through stages; a stuck one sits far past the usual time
+            "overdue": expected_stage > 0 and stage_elapsed > OVERDUE_FACTOR * max(expected_stage, 5.0),
+        }
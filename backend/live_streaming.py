@@ -0,0 +1,239 @@
+# backend/live_streaming.py
+import json
+import os
+import queue
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+# "assemblyai" streams to AssemblyAI; "fake" replays a scripted call (local runs and tests)
+LIVE_TRANSCRIBER = os.getenv("SALESSENSE_LIVE_TRANSCRIBER", "assemblyai")
+# The agents see only the last WINDOW seconds of the call, re-run every INTERVAL seconds of audio
+LIVE_WINDOW_SECONDS = float(os.getenv("SALESSENSE_LIVE_WINDOW_SECONDS", "120"))
+LIVE_INTERVAL_SECONDS = float(os.getenv("SALESSENSE_LIVE_INTERVAL_SECONDS", "30"))
+# Clients send 16-bit mono PCM at this rate unless they say otherwise
+DEFAULT_SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+
+
+@dataclass
+class Turn:
+    """One finalized speaker turn; times are seconds from the start of the stream."""
+    speaker: str
+    text: str
+    start: float
+    end: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class StreamingTranscriber:
+    """Feed raw PCM frames in, get back the turns finalized since the previous call."""
+
+    def __init__(self, sample_rate: int = DEFAULT_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.bytes_received = 0
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.bytes_received / (self.sample_rate * BYTES_PER_SAMPLE)
+
+    def feed(self, frame: bytes) -> List[Turn]:
+        raise NotImplementedError
+
+    def close(self) -> List[Turn]:
+        """Flush whatever is still pending at the end of the call."""
+        return []
+
+
+FAKE_SCRIPT = [
+    ("A", "Hi, thanks for making time today. How is the quarter going for your team?"),
+    ("B", "Busy. We're still reconciling invoices by hand, which takes most of a week."),
+    ("A", "What happens when those numbers are late?"),
+    ("B", "Finance escalates and we end up working weekends."),
+    ("A", "Our platform automates the matching, most teams close in two days."),
+    ("B", "Honestly the price is a concern, we already pay for a competitor."),
+    ("A", "Understood. Would it help to see the savings against what you pay now?"),
+    ("B", "Sure, send something over and I'll share it with our CFO."),
+    ("A", "Great, I'll send a comparison by Friday and set up a call next week."),
+]
+
+
+class FakeStreamingTranscriber(StreamingTranscriber):
+    """Emits one scripted turn per `seconds_per_turn` of audio received, looping the script.
+
+    Only the byte count matters, so tests can stream silence and still get a
+    realistic, deterministic conversation back.
+    """
+
+    def __init__(self, sample_rate: int = DEFAULT_SAMPLE_RATE, seconds_per_turn: float = 4.0,
+                 script: Optional[List[tuple]] = None):
+        super().__init__(sample_rate)
+        self.seconds_per_turn = seconds_per_turn
+        self.script = script or FAKE_SCRIPT
+        self.emitted = 0
+
+    def _due(self, until: float) -> List[Turn]:
+        turns = []
+        while (self.emitted + 1) * self.seconds_per_turn <= until:
+            speaker, text = self.script[self.emitted % len(self.script)]
+            start = self.emitted * self.seconds_per_turn
+            turns.append(Turn(speaker, text, start, start + self.seconds_per_turn))
+            self.emitted += 1
+        return turns
+
+    def feed(self, frame: bytes) -> List[Turn]:
+        self.bytes_received += len(frame)
+        return self._due(self.audio_seconds)
+
+    def close(self) -> List[Turn]:
+        # A partial last turn still counts once the call ends
+        if self.audio_seconds > self.emitted * self.seconds_per_turn:
+            return self._due(self.emitted * self.seconds_per_turn + self.seconds_per_turn)
+        return []
+
+
+class AssemblyAIStreamingTranscriber(StreamingTranscriber):
+    """AssemblyAI Universal-Streaming with speaker labels; turns arrive on the SDK's thread."""
+
+    def __init__(self, sample_rate: int = DEFAULT_SAMPLE_RATE):
+        super().__init__(sample_rate)
+        from backend.config import load_env
+        from assemblyai.streaming.v3 import (
+            StreamingClient, StreamingClientOptions, StreamingEvents, StreamingParameters,
+        )
+
+        load_env()
+        api_key = os.getenv("ASSEMBLYAI_API_KEY")
+        if not api_key:
+            raise ValueError("ASSEMBLYAI_API_KEY not found in environment variables")
+        self._turns: "queue.Queue[Turn]" = queue.Queue()
+        self.client = StreamingClient(StreamingClientOptions(api_key=api_key))
+        self.client.on(StreamingEvents.Turn, self._on_turn)
+        self.client.connect(StreamingParameters(sample_rate=sample_rate, format_turns=True, speaker_labels=True))
+
+    def _on_turn(self, _client, event):
+        # Unformatted end-of-turn events are followed by a formatted copy; keep only that one
+        if not (event.end_of_turn and event.turn_is_formatted and event.transcript):
+            return
+        words = event.words or []
+        start = words[0].start / 1000 if words else self.audio_seconds
+        end = words[-1].end / 1000 if words else self.audio_seconds
+        self._turns.put(Turn(event.speaker_label or "A", event.transcript, start, end))
+
+    def _drain(self) -> List[Turn]:
+        turns = []
+        while True:
+            try:
+                turns.append(self._turns.get_nowait())
+            except queue.Empty:
+                return turns
+
+    def feed(self, frame: bytes) -> List[Turn]:
+        self.bytes_received += len(frame)
+        self.client.stream(frame)
+        return self._drain()
+
+    def close(self) -> List[Turn]:
+        self.client.disconnect(terminate=True)
+        return self._drain()
+
+
+def build_transcriber(sample_rate: int = DEFAULT_SAMPLE_RATE, kind: str = LIVE_TRANSCRIBER) -> StreamingTranscriber:
+    if kind == "fake":
+        return FakeStreamingTranscriber(sample_rate)
+    if kind == "assemblyai":
+        return AssemblyAIStreamingTranscriber(sample_rate)
+    raise ValueError(f"Unknown live transcriber {kind!r}, expected 'assemblyai' or 'fake'")
+
+
+def is_end_message(text: str) -> bool:
+    """Clients end a stream with the text "end" or the JSON {"type": "end"}."""
+    text = text.strip()
+    if text.lower() == "end":
+        return True
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(message, dict) and message.get("type") == "end"
+
+
+class LiveMetrics:
+    """Talk time and question counts, updated per turn (never by rescanning the call)."""
+
+    def __init__(self, rep_speaker: Optional[str] = None):
+        # Without a hint the rep is whoever speaks first, which is how outbound calls go
+        self.rep_speaker = rep_speaker
+        self.talk_seconds: Dict[str, float] = {}
+        self.questions: Dict[str, int] = {}
+        self.turns = 0
+
+    def update(self, turn: Turn):
+        if self.rep_speaker is None:
+            self.rep_speaker = turn.speaker
+        self.turns += 1
+        self.talk_seconds[turn.speaker] = self.talk_seconds.get(turn.speaker, 0.0) + max(turn.end - turn.start, 0.0)
+        self.questions[turn.speaker] = self.questions.get(turn.speaker, 0) + turn.text.count("?")
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = sum(self.talk_seconds.values())
+        rep = self.talk_seconds.get(self.rep_speaker, 0.0)
+        rep_percent = round(100 * rep / total) if total else 0
+        return {
+            "rep_speaker": self.rep_speaker,
+            "rep_talk_ratio_percent": rep_percent,
+            "customer_talk_ratio_percent": 100 - rep_percent if total else 0,
+            "questions_asked_by_rep": self.questions.get(self.rep_speaker, 0),
+            "questions_asked_by_customer": sum(n for s, n in self.questions.items() if s != self.rep_speaker),
+            "turns": self.turns,
+        }
+
+
+class LiveCallSession:
+    """State for one streamed call: transcriber, running metrics and the analysis window."""
+
+    def __init__(self, transcriber: StreamingTranscriber, rep_speaker: Optional[str] = None,
+                 window_seconds: float = LIVE_WINDOW_SECONDS, interval_seconds: float = LIVE_INTERVAL_SECONDS):
+        self.transcriber = transcriber
+        self.metrics = LiveMetrics(rep_speaker)
+        self.window_seconds = window_seconds
+        self.interval_seconds = interval_seconds
+        self.window: Deque[Turn] = deque()
+        self.last_analysis_at = 0.0
+        self.finished = False
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.transcriber.audio_seconds
+
+    def _add(self, turns: List[Turn]) -> List[Turn]:
+        for turn in turns:
+            self.metrics.update(turn)
+            self.window.append(turn)
+        if self.window:
+            cutoff = self.window[-1].end - self.window_seconds
+            while self.window and self.window[0].end < cutoff:
+                self.window.popleft()
+        return turns
+
+    def ingest(self, frame: bytes) -> List[Turn]:
+        """New turns from this frame; work done is proportional to the frame, not the call."""
+        return self._add(self.transcriber.feed(frame))
+
+    def finish(self) -> List[Turn]:
+        self.finished = True
+        return self._add(self.transcriber.close())
+
+    def analysis_due(self) -> bool:
+        return bool(self.window) and self.audio_seconds - self.last_analysis_at >= self.interval_seconds
+
+    def take_window(self) -> Dict[str, Any]:
+        """Transcript of the current window, marking it as analyzed."""
+        self.last_analysis_at = self.audio_seconds
+        return {
+            "start": self.window[0].start,
+            "end": self.window[-1].end,
+            "transcript": "\n".join(f"Speaker {t.speaker}: {t.text}" for t in self.window),
+        }
@@ -1,15 +1,20 @@
-from dotenv import load_dotenv
-load_dotenv(dotenv_path=r"backend\.env")
+from backend.config import load_env
+load_env()
 
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import Depends, FastAPI, UploadFile, File, Form, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import shutil
+from fastapi.responses import FileResponse, JSONResponse
+from contextlib import asynccontextmanager
 import os
 import traceback
 import json
 import hashlib
+import hmac
 import asyncio
-from datetime import datetime, timedelta
+import uuid
+import time
+from pathlib import Path
+from typing import Optional
 
 
 from backend.logging_config import setup_logging
@@ -20,24 +25,53 @@ import logging
 log = logging.getLogger("salessense.backend")
 
 
-from backend.crewai_transcription import transcribe_crew_ai, remove_file
+from backend.crewai_transcription import transcribe_crew_ai, get_assemblyai
+from backend.sqlite_cache import SQLiteCache, DATA_DIR
+from backend.cache_snapshot import (CACHE_SNAPSHOT_SECONDS, CACHE_SNAPSHOTS, Invalidation, read_snapshot,
+                                    write_snapshot)
+from backend.result_codec import pack, unpack
+from backend.audio_fingerprint import FINGERPRINT_ENABLED, FingerprintIndex, fingerprint_file, probe_audio, probe_duration
+from backend.admission import AdmissionError, MemoryBudget, UploadAdmissionMiddleware
+from backend.job_store import BYTES_PER_AUDIO_SECOND, JobStore
+from backend.rate_limiter import PRIORITIES, rate_limits, get_scheduler_status
+from backend.pipeline_scheduler import pipeline_scheduler
+from backend.model_router import DEGRADED_MODE, model_router
+from backend.results_store import ResultsStore, call_rep
+from backend.analytics import refresh_aggregates
+from backend.search_index import SearchIndex
+from backend.chunked_upload import MAX_CHUNK_BYTES, MAX_UPLOAD_BYTES, ChunkedUploadStore, UploadError
+from backend.blob_store import BLOB_GC_SECONDS, shared_store
+from backend.live_streaming import DEFAULT_SAMPLE_RATE, LiveCallSession, build_transcriber, is_end_message
+from backend.transcription_webhooks import (DONE_STATUSES, TRANSCRIPTION_MODE, WEBHOOK_AUTH_HEADER, WEBHOOK_PATH,
+                                            PendingTranscriptions, callback_status, submit_transcription,
+                                            verify_webhook_secret, wait_for_transcription)
+from backend.ingest_watcher import INGEST_DIR, INGEST_REP, INGEST_TENANT, DirectoryWatcher, IngestStore, ingest_context
+from backend.profiling import (PROFILE_MODES, ProcessSampler, ProfiledThreadPoolExecutor, list_profiles,
+                               profile_file, profile_request)
 
 # Import your enhanced multi-agent system
 try:
-    from backend.multi_agent_system import analyze_call_multi_agent_fast
+    from backend.multi_agent_system import (PROMPT_VERSION, analyze_call_multi_agent_fast, get_agent_cache,
+                                            prompt_cache_stats, versioned, warm_up)
     USE_MULTI_AGENT = True
     print("✅ Enhanced multi-agent system loaded successfully")
 except ImportError as e:
     USE_MULTI_AGENT = False
+    PROMPT_VERSION = ""
     print(f"❌ Failed to load multi-agent system: {e}")
 
-# Simple but effective cache implementation
+# Simple but effective cache implementation. Entries are held packed (see
+# result_codec): smaller than the dicts, and every get returns a fresh copy,
+# so callers annotating a hit can't change what is cached.
 class SimpleCache:
-    def __init__(self):
+    def __init__(self, max_size: int = 50, snapshot_path: Optional[Path] = None):
         self.store = {}
         self.lock = asyncio.Lock()
-        self.max_size = 50
+        self.max_size = max_size
         self.ttl_hours = 24
+        # Where this cache is saved across restarts (see cache_snapshot), if anywhere
+        self.snapshot_path = snapshot_path
+        self._changed = False
     
     async def compute_key(self, file_bytes: bytes, context: str) -> str:
         hasher = hashlib.sha256()
@@ -52,38 +86,243 @@ class SimpleCache:
                 return None
             
             # Check TTL
-            if datetime.now() - item['timestamp'] > timedelta(hours=self.ttl_hours):
+            if time.time() - item['timestamp'] > self.ttl_hours * 3600:
                 del self.store[key]
                 return None
                 
-            return item['result']
+            return unpack(item['result'])
     
-    async def set(self, key: str, result: dict):
+    async def set(self, key: str, result: dict, rep: str = "", prompt_version: str = ""):
+        """Store a result; rep and prompt_version let admins invalidate it selectively."""
         async with self.lock:
             # Simple LRU eviction
-            if len(self.store) >= self.max_size:
+            if len(self.store) >= self.max_size and key not in self.store:
                 oldest_key = min(self.store.keys(), key=lambda k: self.store[k]['timestamp'])
                 del self.store[oldest_key]
                 print(f"🗑️ Cache full, removed oldest entry")
             
             self.store[key] = {
-                'result': result,
-                'timestamp': datetime.now()
+                'result': pack(result),
+                'timestamp': time.time(),
+                'rep': rep,
+                'prompt_version': prompt_version,
             }
+            self._changed = True
             print(f"💾 Result cached (total entries: {len(self.store)})")
     
     async def get_stats(self):
         async with self.lock:
             return {
                 "total_entries": len(self.store),
+                "stored_bytes": sum(len(item['result']) for item in self.store.values()),
                 "max_entries": self.max_size,
-                "ttl_hours": self.ttl_hours
+                "ttl_hours": self.ttl_hours,
+                "backend": "memory",
+                "snapshot": str(self.snapshot_path) if self.snapshot_path else None,
             }
 
-# Global cache instance
-cache = SimpleCache()
+    async def clear(self):
+        """Drop every entry in place (requests holding the lock finish first), snapshot included."""
+        async with self.lock:
+            self.store.clear()
+            self._changed = False
+        if self.snapshot_path:
+            await asyncio.to_thread(write_snapshot, self.snapshot_path, [], self.max_size, 0, replace=True)
+
+    async def invalidate(self, invalidation: Invalidation) -> int:
+        """Drop matching entries here and from the snapshot; returns how many were dropped here."""
+        now = time.time()
+        async with self.lock:
+            doomed = [key for key, item in self.store.items()
+                      if invalidation.matches(key, item['timestamp'], item['rep'], item['prompt_version'], now)]
+            for key in doomed:
+                del self.store[key]
+        if self.snapshot_path:
+            await asyncio.to_thread(write_snapshot, self.snapshot_path, [], self.max_size,
+                                    self.ttl_hours * 3600, invalidation)
+        return len(doomed)
+
+    async def save_snapshot(self, force: bool = False) -> Optional[int]:
+        """Write the entries to the snapshot file if anything changed; returns the entries it holds."""
+        if not self.snapshot_path or not (self._changed or force):
+            return None
+        async with self.lock:
+            entries = [(key, item['result'], item['timestamp'], item['rep'], item['prompt_version'])
+                       for key, item in self.store.items()]
+            self._changed = False
+        return await asyncio.to_thread(write_snapshot, self.snapshot_path, entries, self.max_size,
+                                       self.ttl_hours * 3600)
+
+    async def load_snapshot(self) -> int:
+        """Fill the cache from the snapshot file (values stay packed, nothing is decoded)."""
+        if not self.snapshot_path:
+            return 0
+        entries = await asyncio.to_thread(read_snapshot, self.snapshot_path)
+        now = time.time()
+        async with self.lock:
+            for key, result, timestamp, rep, prompt_version in entries[:self.max_size]:
+                if now - timestamp <= self.ttl_hours * 3600 and key not in self.store:
+                    self.store[key] = {'result': result, 'timestamp': timestamp, 'rep': rep,
+                                       'prompt_version': prompt_version}
+            return len(self.store)
+
+# "memory" keeps the cache per process; "sqlite" shares it across workers
+CACHE_BACKEND = os.getenv("SALESSENSE_CACHE_BACKEND", "memory")
+
+def make_cache(name: str = "cache", max_size: int = 50):
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(DATA_DIR / f"{name}.sqlite3", max_size=max_size)
+    return SimpleCache(max_size=max_size, snapshot_path=DATA_DIR / f"{name}.snapshot" if CACHE_SNAPSHOTS else None)
+
+# Global cache instances: full analyses by (audio + context), transcripts by audio sha256
+cache = make_cache()
+transcript_cache = make_cache("transcripts", max_size=int(os.getenv("SALESSENSE_TRANSCRIPT_CACHE_SIZE", "500")))
+fingerprint_index = FingerprintIndex()
+job_store = JobStore()
+results_store = ResultsStore()
+search_index = SearchIndex()
+upload_store = ChunkedUploadStore()
+# Uploaded audio, content-addressed and shared with transcription
+blob_store = shared_store()
+pending_transcriptions = PendingTranscriptions()
+ingest_store = IngestStore()
+ingest_watcher = None
+process_sampler = ProcessSampler()
+memory_budget = MemoryBudget()
+
+# Shared secret for /admin endpoints and per-request profiling; empty leaves them open
+ADMIN_TOKEN = os.getenv("SALESSENSE_ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = "X-SalesSense-Admin-Token"
+PROFILE_HEADER = "X-SalesSense-Profile"
+
+# Seconds to wait for in-flight analyses on shutdown before marking them interrupted
+DRAIN_TIMEOUT = float(os.getenv("SALESSENSE_DRAIN_TIMEOUT", "120"))
+
+class InFlightTracker:
+    """Counts running analyses so shutdown can wait for them to finish."""
+    def __init__(self):
+        self.count = 0
+        self.draining = False
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.tasks = set()
+
+    def _enter(self):
+        if self.draining:
+            raise HTTPException(status_code=503, detail="Server is shutting down, retry on another worker")
+        self.count += 1
+        self.idle.clear()
 
-app = FastAPI(title="SalesSense Enhanced Multi-Agent Backend with Caching", version="2.0.0")
+    def _exit(self, *_):
+        self.count -= 1
+        if self.count == 0:
+            self.idle.set()
+
+    @asynccontextmanager
+    async def track(self):
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def spawn(self, coro):
+        """Run an analysis after the request returns; shutdown still waits for it."""
+        self._enter()
+        task = asyncio.create_task(coro)
+        # The event loop only keeps weak references to tasks
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        task.add_done_callback(self._exit)
+        return task
+
+    async def drain(self, timeout: float) -> bool:
+        self.draining = True
+        try:
+            await asyncio.wait_for(self.idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+inflight = InFlightTracker()
+
+# Load SDKs and build the graph in the background right after startup ("0" disables)
+WARMUP = os.getenv("SALESSENSE_WARMUP", "1") != "0"
+
+def warm_up_backend():
+    try:
+        get_assemblyai()
+        if USE_MULTI_AGENT:
+            warm_up()
+    except Exception as e:
+        log.warning(f"Background warm-up failed, SDKs will load on first use: {e}")
+
+async def restore_caches():
+    """Load the cache snapshots, then drop analyses made with other prompts."""
+    start = time.time()
+    loaded = [await c.load_snapshot() for c in (cache, transcript_cache)]
+    stale = await cache.invalidate(Invalidation(stale_for_prompt_version=PROMPT_VERSION)) if USE_MULTI_AGENT else 0
+    log.info(f"♻️ Caches warm in {time.time() - start:.2f}s: {loaded[0] - stale} analyses"
+             f" ({stale} stale for prompt version {PROMPT_VERSION} dropped), {loaded[1]} transcripts")
+
+async def collect_blobs_periodically():
+    while True:
+        try:
+            report = await asyncio.to_thread(blob_store.gc)
+            if report["removed"]:
+                log.info(f"🧹 Blob GC removed {report['removed']} blobs ({report['freed_bytes'] / 2**20:.1f} MB),"
+                         f" {report['stored_bytes'] / 2**20:.1f} MB stored, dedup ratio {report['dedup_ratio']}")
+        except Exception as e:
+            log.warning(f"Blob GC failed: {e}")
+        await asyncio.sleep(BLOB_GC_SECONDS)
+
+async def snapshot_caches_periodically():
+    while True:
+        await asyncio.sleep(CACHE_SNAPSHOT_SECONDS)
+        for c in (cache, transcript_cache):
+            try:
+                await c.save_snapshot()
+            except Exception as e:
+                log.warning(f"Cache snapshot failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Don't block startup on SDK imports: the worker answers /health immediately
+    # and the first analysis only waits for whatever warm-up has not finished.
+    warmup_task = asyncio.create_task(asyncio.to_thread(warm_up_backend)) if WARMUP else None
+    global ingest_watcher
+    # asyncio.to_thread work is profiled when the request that started it asked to be
+    asyncio.get_running_loop().set_default_executor(ProfiledThreadPoolExecutor(thread_name_prefix="asyncio"))
+    await restore_caches()
+    snapshot_task = asyncio.create_task(snapshot_caches_periodically()) if CACHE_SNAPSHOT_SECONDS > 0 else None
+    blob_gc_task = asyncio.create_task(collect_blobs_periodically()) if BLOB_GC_SECONDS > 0 else None
+    ingest_task = None
+    if INGEST_DIR:
+        ingest_watcher = DirectoryWatcher(INGEST_DIR, ingest_recording, ingest_store)
+        ingest_task = asyncio.create_task(ingest_watcher.run())
+    log.info(f"Worker {os.getpid()} ready (cache backend: {CACHE_BACKEND})")
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    if ingest_task is not None:
+        # Claims of unfinished pre-analyses are released; the next start picks them up
+        ingest_task.cancel()
+        await asyncio.gather(ingest_task, return_exceptions=True)
+    if inflight.count:
+        log.info(f"Draining {inflight.count} in-flight analyses (timeout {DRAIN_TIMEOUT:.0f}s)...")
+    if not await inflight.drain(DRAIN_TIMEOUT):
+        interrupted = await asyncio.to_thread(job_store.mark_interrupted, os.getpid())
+        log.warning(f"Drain timed out, marked {interrupted} jobs as interrupted")
+    for task in (snapshot_task, blob_gc_task):
+        if task is not None:
+            task.cancel()
+    # After the drain, so analyses that finished during it are saved too
+    for name, c in (("analysis", cache), ("transcript", transcript_cache)):
+        saved = await c.save_snapshot(force=True)
+        if saved is not None:
+            log.info(f"💾 Saved {name} cache snapshot ({saved} entries)")
+
+app = FastAPI(title="SalesSense Enhanced Multi-Agent Backend with Caching", version="2.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -92,9 +331,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-UPLOAD_DIR = "uploaded_files"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Oversized single-request uploads are refused before their body is read
+app.add_middleware(UploadAdmissionMiddleware, paths=("/analyze_call", "/transcribe/"), budget=memory_budget)
 
 @app.get("/health")
 async def health():
@@ -104,41 +342,310 @@ async def health():
         "status": "ok", 
         "message": f"{system_type} Backend is running", 
         "version": "2.0.0",
-        "cache_stats": cache_stats
+        "cache_stats": cache_stats,
+        "worker_pid": os.getpid(),
+        "in_flight": inflight.count
     }
 
 @app.get("/cache/stats")
 async def get_cache_stats():
     """Get current cache statistics"""
-    return await cache.get_stats()
+    return {**await cache.get_stats(), "prompt_version": PROMPT_VERSION,
+            "transcripts": await transcript_cache.get_stats()}
 
 @app.delete("/cache/clear")
 async def clear_cache():
     """Clear all cached results"""
-    global cache
-    cache = SimpleCache()
+    await cache.clear()
+    if USE_MULTI_AGENT:
+        # Otherwise a re-run after clearing would still reuse per-agent outputs
+        await asyncio.to_thread(get_agent_cache().clear)
     return {"message": "Cache cleared successfully"}
 
+@app.get("/scheduler/status")
+async def scheduler_status():
+    """Per-provider quota usage, queue depth and estimated wait by priority"""
+    return get_scheduler_status()
+
+@app.get("/scheduler/pipeline")
+async def pipeline_status():
+    """Slots in use, queue depth and queue wait percentiles per stage and priority class"""
+    return pipeline_scheduler.status()
+
+@app.get("/admission/status")
+async def admission_status():
+    """This worker's memory budget, reservations, observed RSS per request and rejections"""
+    return {"worker_pid": os.getpid(), **memory_budget.stats()}
+
+@app.get("/scheduler/transcriptions")
+async def transcriptions_status():
+    """Transcriptions submitted in webhook mode and still awaiting pickup, by status"""
+    stats = await asyncio.to_thread(pending_transcriptions.stats)
+    return {"mode": TRANSCRIPTION_MODE, **stats}
+
+@app.post(WEBHOOK_PATH)
+async def assemblyai_webhook(request: Request):
+    """AssemblyAI's completion callback: resumes the job waiting for this transcript"""
+    if not verify_webhook_secret(request.headers.get(WEBHOOK_AUTH_HEADER)):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    try:
+        payload = await request.json()
+        transcript_id, status = str(payload["transcript_id"]), str(payload["status"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Expected JSON with transcript_id and status")
+    try:
+        status = await asyncio.to_thread(callback_status, transcript_id, status)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Unknown transcript")
+    if status not in DONE_STATUSES:
+        # Early or forged: the waiting job keeps waiting
+        return {"received": transcript_id, "status": status}
+    await asyncio.to_thread(pending_transcriptions.complete, transcript_id, status)
+    pending_transcriptions.wake(transcript_id, status)
+    return {"received": transcript_id}
+
+@app.get("/llm/prompt_cache")
+async def llm_prompt_cache():
+    """Input tokens per agent and the share the provider served from its prompt cache"""
+    return prompt_cache_stats.snapshot() if USE_MULTI_AGENT else {}
+
+@app.get("/llm/health")
+async def llm_health():
+    """Recent LLM errors and latency per model, and whether requests are on the rule engine"""
+    return {"mode": DEGRADED_MODE, **model_router.health.snapshot(), "models": model_router.latency.snapshot()}
+
+def require_admin(request: Request):
+    received = request.headers.get(ADMIN_TOKEN_HEADER)
+    if ADMIN_TOKEN and (received is None or not hmac.compare_digest(received, ADMIN_TOKEN)):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def requested_profile(request: Request):
+    """Profiling mode asked for with the X-SalesSense-Profile header or ?profile=, if any."""
+    mode = request.headers.get(PROFILE_HEADER) or request.query_params.get("profile")
+    if not mode:
+        return None
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=422, detail=f"profile must be one of: {', '.join(PROFILE_MODES)}")
+    require_admin(request)
+    return mode
+
+@app.post("/admin/profiling/start", dependencies=[Depends(require_admin)])
+async def profiling_start(seconds: float = 30, interval_ms: float = 5):
+    """Sample every thread of the worker serving this request for `seconds`"""
+    try:
+        return process_sampler.start(seconds, interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/profiling/stop", dependencies=[Depends(require_admin)])
+async def profiling_stop():
+    try:
+        return await asyncio.to_thread(process_sampler.stop)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def profiling_status(limit: int = 20):
+    """This worker's sampler, and the newest saved profiles from every worker"""
+    return {**process_sampler.status(), "profiles": await asyncio.to_thread(list_profiles, limit)}
+
+@app.get("/admin/profiling/{profile_id}", dependencies=[Depends(require_admin)])
+async def profiling_download(profile_id: str, format: str = "collapsed"):
+    """A saved profile as collapsed stacks (for flamegraph.pl / speedscope) or, for cProfile runs, pstats"""
+    path = profile_file(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "text/plain" if format == "collapsed" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+@app.post("/admin/cache/invalidate", dependencies=[Depends(require_admin)])
+async def cache_invalidate(
+    target: str = "analyses",
+    prefix: Optional[str] = None,
+    rep: Optional[str] = None,
+    older_than_hours: Optional[float] = None,
+    prompt_version: Optional[str] = None
+):
+    """Drop cached analyses (or transcripts) matching every filter given.
+
+    prompt_version=stale drops analyses made with prompts other than the
+    current ones. With the memory backend only this worker's cache and the
+    shared snapshot are affected.
+    """
+    caches = {"analyses": cache, "transcripts": transcript_cache}
+    if target not in caches:
+        raise HTTPException(status_code=422, detail=f"target must be one of {list(caches)}")
+    if target == "transcripts" and (rep is not None or prompt_version is not None):
+        raise HTTPException(status_code=422, detail="Transcripts have no rep or prompt version")
+    invalidation = Invalidation(
+        prefix=prefix,
+        rep=rep,
+        older_than_seconds=older_than_hours * 3600 if older_than_hours is not None else None,
+        prompt_version=prompt_version if prompt_version != "stale" else None,
+        stale_for_prompt_version=PROMPT_VERSION if prompt_version == "stale" else None,
+    )
+    if invalidation.is_empty():
+        raise HTTPException(status_code=422, detail="Give at least one filter; DELETE /cache/clear drops everything")
+    dropped = await caches[target].invalidate(invalidation)
+    return {"target": target, "invalidated": dropped, "prompt_version": PROMPT_VERSION, "worker_pid": os.getpid()}
+
+@app.post("/admin/cache/snapshot", dependencies=[Depends(require_admin)])
+async def cache_snapshot():
+    """Write the memory caches' snapshots now instead of waiting for the schedule or shutdown"""
+    return {
+        "analyses": await cache.save_snapshot(force=True),
+        "transcripts": await transcript_cache.save_snapshot(force=True),
+        "worker_pid": os.getpid(),
+    }
+
+@app.get("/admin/blobs", dependencies=[Depends(require_admin)])
+async def blob_stats():
+    """Size of the upload store, its dedup ratio and the blobs requests still hold"""
+    return await asyncio.to_thread(blob_store.stats)
+
+@app.post("/admin/blobs/gc", dependencies=[Depends(require_admin)])
+async def blob_gc(quota_mb: Optional[float] = None, retention_hours: Optional[float] = None):
+    """Collect unreferenced blobs now, optionally with a tighter quota or retention than configured"""
+    kwargs = {}
+    if quota_mb is not None:
+        kwargs["quota_bytes"] = int(quota_mb * 1024 * 1024)
+    if retention_hours is not None:
+        kwargs["retention_hours"] = retention_hours
+    return await asyncio.to_thread(blob_store.gc, **kwargs)
+
+def validate_priority(priority: str) -> str:
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=422, detail=f"priority must be one of {list(PRIORITIES)}")
+    return priority
+
+@app.get("/analytics/reps")
+async def analytics_reps():
+    """Reps that have at least one stored analysis"""
+    return {"reps": await asyncio.to_thread(results_store.list_reps)}
+
+@app.get("/analytics/rep_weekly")
+async def analytics_rep_weekly(rep: str = "", weeks: int = 12):
+    """Precomputed per-rep weekly rollups (talk ratio, objection rate, sentiment mix)"""
+    rows = await asyncio.to_thread(results_store.rep_weekly, rep or None, weeks)
+    return {"rows": rows}
+
+@app.post("/analytics/refresh")
+async def analytics_refresh():
+    """Rebuild all weekly rollups from the stored call metrics"""
+    count = await asyncio.to_thread(refresh_aggregates, results_store)
+    return {"message": f"Rebuilt {count} rep/week aggregates"}
+
+@app.get("/search")
+async def search_calls(q: str, kind: str = "", rep: str = "", limit: int = 20):
+    """Keyword search over transcripts, objections and quotes (kind: transcript|objection|quote)"""
+    hits = await asyncio.to_thread(search_index.search, q, kind or None, rep or None, limit)
+    return {"query": q, "results": hits}
+
+@app.get("/search/semantic")
+async def semantic_search_calls(q: str, kind: str = "", rep: str = "", k: int = 10):
+    """Nearest-neighbour search over the local embedding index"""
+    hits = await asyncio.to_thread(search_index.semantic_search, q, k, kind or None, rep or None)
+    return {"query": q, "results": hits}
+
+@app.get("/search/stats")
+async def search_stats():
+    return await asyncio.to_thread(search_index.stats)
+
+@app.post("/search/reindex")
+async def search_reindex():
+    """Rebuild the search index from the results store"""
+    def reindex():
+        count = 0
+        for call in results_store.iter_calls():
+            result = call["result"]
+            search_index.index_call(call["analysis_id"], call["rep"], call["transcript"] or "",
+                                    result.get("customer_objections"), result.get("notable_quotes"))
+            count += 1
+        return count
+    count = await asyncio.to_thread(reindex)
+    return {"message": f"Reindexed {count} calls"}
+
+def store_analysis(analysis_id: str, result: dict, **call_info):
+    """Persist a finished analysis, refresh the affected rep/week rollup and index it for search."""
+    try:
+        saved = results_store.save_analysis(analysis_id, result, **call_info)
+    except Exception as e:
+        log.error(f"Failed to store analysis {analysis_id}: {e}", exc_info=True)
+        return
+    # The call is stored; a failing rollup must not keep it out of search, or the reverse
+    try:
+        # An earlier analysis of the same recording is replaced, not counted again
+        for week in {saved["week"]} | {week for _, week in saved["replaced"]}:
+            refresh_aggregates(results_store, saved["rep"], week)
+    except Exception as e:
+        log.error(f"Failed to refresh rollups for analysis {analysis_id}: {e}", exc_info=True)
+    try:
+        search_index.remove_calls(old_id for old_id, _ in saved["replaced"])
+        search_index.index_call(analysis_id, saved["rep"], call_info.get("transcript", ""),
+                                result.get("customer_objections"), result.get("notable_quotes"))
+    except Exception as e:
+        log.error(f"Failed to index analysis {analysis_id} for search: {e}", exc_info=True)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of an analysis job, whichever worker ran it"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/analyses/{analysis_id}")
+async def get_analysis(analysis_id: str):
+    """A finished analysis by id, so clients don't have to hold the whole payload"""
+    call = await asyncio.to_thread(results_store.get_call, analysis_id)
+    if call is not None:
+        return {**call["result"], "analysis_id": analysis_id}
+    # Not stored (older cache hits, or storing failed): the job row still has it
+    job = await asyncio.to_thread(job_store.get, analysis_id)
+    if job is None or not job.get("result"):
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return job["result"]
+
+@app.get("/analyses/{analysis_id}/transcript")
+async def get_analysis_transcript(analysis_id: str):
+    """Transcript of a stored call, fetched separately because it is the largest part"""
+    call = await asyncio.to_thread(results_store.get_call, analysis_id)
+    if call is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return {"analysis_id": analysis_id, "transcript": call["transcript"] or ""}
+
+@app.get("/jobs/{job_id}/progress")
+async def get_job_progress(job_id: str):
+    """Stage, elapsed time and ETA for polling clients (no result payload)"""
+    progress = await asyncio.to_thread(job_store.progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return progress
+
 @app.post("/transcribe/")
 async def transcribe_audio(file: UploadFile = File(...)):
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Use AssemblyAI transcription with speaker labels
-    with open(file_location, "rb") as audio_file:
-        transcript = transcribe_crew_ai(audio_file)
-    
-    remove_file(file_location)
+    request_id = uuid.uuid4().hex
+    blob = await store_upload(file, request_id)
+    try:
+        # Use AssemblyAI transcription with speaker labels
+        # /transcribe/ is not a job: nothing to mark failed on rejection
+        with await admit_upload(request_id, str(blob.path), has_job=False):
+            transcript = await transcribe_file(str(blob.path))
+    finally:
+        await asyncio.to_thread(blob_store.release, blob)
     return {"transcript": transcript}
 
 @app.post("/analyze/")
 async def analyze_call_endpoint(
     transcript: str = Form(...),
-    context: str = Form(...)
+    context: str = Form(...),
+    tenant: str = Form("default"),
+    priority: str = Form("interactive")
 ):
+    validate_priority(priority)
     if USE_MULTI_AGENT:
-        result = analyze_call_multi_agent_fast(context, transcript)
+        async with pipeline_scheduler.slot("agents", priority):
+            result = await asyncio.to_thread(analyze_call_multi_agent_fast, context, transcript, tenant, priority)
         return result
     else:
         return {
@@ -148,26 +655,392 @@ async def analyze_call_endpoint(
             "coaching_tips": [{"skill": "System", "tip": "Contact technical support"}]
         }
 
+@app.websocket("/live")
+async def live_call(
+    websocket: WebSocket,
+    participants: str = "",
+    details: str = "",
+    call_types: str = "",
+    tenant: str = "default",
+    rep_speaker: str = "",
+    sample_rate: int = DEFAULT_SAMPLE_RATE
+):
+    """Stream a live call as binary 16-bit mono PCM frames; send the text "end" to finish.
+
+    Replies are JSON: "turns" with newly finalized turns and updated metrics,
+    "insights" when the agents finish a pass over the recent window, and
+    "final" once the stream ends.
+    """
+    await websocket.accept()
+    if inflight.draining:
+        await websocket.close(code=1013, reason="Server is shutting down, retry on another worker")
+        return
+    try:
+        transcriber = await asyncio.to_thread(build_transcriber, sample_rate)
+    except Exception as e:
+        await websocket.close(code=1011, reason=f"Live transcription unavailable: {e}"[:120])
+        return
+
+    session = LiveCallSession(transcriber, rep_speaker or None)
+    context = (
+        f"Participants: {participants.strip()}\nCall details: {details.strip()}\nCall types: {call_types.strip()}\n"
+        f"Note: This is the most recent part of a call still in progress"
+    )
+    send_lock = asyncio.Lock()
+    analysis_task = None
+    last_insights = None
+
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def analyze_window(window: dict):
+        nonlocal last_insights
+        try:
+            async with pipeline_scheduler.slot("agents"):
+                result = await asyncio.to_thread(
+                    analyze_call_multi_agent_fast, context, window["transcript"], tenant, "interactive", False
+                )
+            last_insights = {"window_start": window["start"], "window_end": window["end"], "result": result}
+            await send({"type": "insights", **last_insights})
+        except Exception as e:
+            log.warning(f"Live window analysis failed: {e}")
+            await send({"type": "error", "detail": f"Window analysis failed: {e}"})
+
+    async def publish(turns):
+        nonlocal analysis_task
+        if turns:
+            await send({
+                "type": "turns",
+                "turns": [t.as_dict() for t in turns],
+                "metrics": session.metrics.snapshot(),
+                "audio_seconds": round(session.audio_seconds, 2),
+            })
+        # One pass at a time: if the agents are still busy, the next window waits its turn
+        if USE_MULTI_AGENT and session.analysis_due() and (analysis_task is None or analysis_task.done()):
+            analysis_task = asyncio.create_task(analyze_window(session.take_window()))
+
+    async with inflight.track():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    await publish(await asyncio.to_thread(session.ingest, message["bytes"]))
+                elif message.get("text") is not None and is_end_message(message["text"]):
+                    await publish(await asyncio.to_thread(session.finish))
+                    if analysis_task is not None:
+                        await analysis_task
+                    # Cover the tail of the call if it arrived while the agents were busy
+                    if USE_MULTI_AGENT and session.analysis_due():
+                        await analyze_window(session.take_window())
+                    await send({
+                        "type": "final",
+                        "metrics": session.metrics.snapshot(),
+                        "audio_seconds": round(session.audio_seconds, 2),
+                        "insights": last_insights,
+                    })
+                    await websocket.close()
+                    break
+        except WebSocketDisconnect:
+            pass
+        finally:
+            if analysis_task is not None and not analysis_task.done():
+                analysis_task.cancel()
+            if not session.finished:
+                await asyncio.to_thread(session.finish)
+
+async def get_or_transcribe(job_id: str, file_location: str, audio_sha: str, filename: str,
+                            tenant: str = "default", priority: str = "interactive"):
+    """Transcript for an upload: exact audio hash hit, near-duplicate recording, or a fresh AssemblyAI run.
+
+    Returns (transcript, transcript_source) where transcript_source says which one happened.
+    """
+    cached = await transcript_cache.get(audio_sha)
+    if cached is not None:
+        print(f"✅ Transcript cache HIT for audio {audio_sha[:12]}...")
+        return cached["transcript"], {"source": "cache", "audio_sha": audio_sha}
+
+    fingerprint, duration, match = None, None, None
+    if FINGERPRINT_ENABLED:
+        await asyncio.to_thread(job_store.update, job_id, stage="fingerprinting")
+        try:
+            fingerprint, duration = await asyncio.to_thread(fingerprint_file, file_location)
+            match = await asyncio.to_thread(fingerprint_index.find_match, fingerprint, duration, audio_sha)
+        except Exception as e:
+            log.warning(f"Fingerprinting skipped for {filename}: {e}")
+    if match:
+        cached = await transcript_cache.get(match["audio_sha"])
+        if cached is not None:
+            print(f"♻️ Near-duplicate of audio {match['audio_sha'][:12]} (BER {match['bit_error_rate']}), reusing transcript")
+            await transcript_cache.set(audio_sha, cached)
+            return cached["transcript"], {
+                "source": "near_duplicate",
+                "audio_sha": audio_sha,
+                "matched_audio_sha": match["audio_sha"],
+                "bit_error_rate": match["bit_error_rate"],
+            }
+
+    print("🎤 AssemblyAI transcription with speaker diarization...")
+    await asyncio.to_thread(job_store.update, job_id, stage="waiting_for_quota")
+    transcript = await transcribe_file(file_location, job_id, tenant, priority)
+    print(f"✅ Transcribed with speaker labels: {len(transcript)} characters")
+
+    await transcript_cache.set(audio_sha, {"transcript": transcript})
+    if fingerprint is not None:
+        await asyncio.to_thread(fingerprint_index.add, audio_sha, fingerprint, duration)
+    return transcript, {"source": "assemblyai", "audio_sha": audio_sha}
+
+async def transcribe_file(file_location: str, job_id: str = "", tenant: str = "default",
+                          priority: str = "interactive") -> str:
+    """AssemblyAI transcript with speaker labels, by callback or by a blocking poll.
+
+    Takes a transcription slot and AssemblyAI quota first. In webhook mode the
+    slot covers only the submit: while AssemblyAI works the job holds no slot
+    and no thread, so a worker's slots aren't pinned by turnaround time.
+    """
+    async with pipeline_scheduler.slot("transcription", priority):
+        await asyncio.to_thread(rate_limits["assemblyai"].acquire, tenant, priority)
+        if job_id:
+            await asyncio.to_thread(job_store.update, job_id, stage="transcribing")
+        if TRANSCRIPTION_MODE != "webhook":
+            # Off the event loop so the worker keeps serving
+            with open(file_location, "rb") as audio_file_obj:
+                return await asyncio.to_thread(transcribe_crew_ai, audio_file_obj)
+        transcript_id = await submit_transcription(pending_transcriptions, file_location, job_id)
+    # The webhook resumes this coroutine
+    return await wait_for_transcription(pending_transcriptions, transcript_id)
+
+async def store_upload(upload: UploadFile, owner: str):
+    """Stream an upload into the blob store in 1 MB blocks, hashing on the way.
+
+    Returns the BlobRef (release it when the request ends); its path is
+    named by content, so concurrent uploads with the same file name never
+    share a file, and identical uploads share one.
+    """
+    with blob_store.writer(owner) as writer:
+        while block := await upload.read(1024 * 1024):
+            writer.write(block)
+        return await asyncio.to_thread(writer.commit)
+
+async def admit_upload(job_id: str, file_location: str, has_job: bool = True):
+    """Probe a saved upload and reserve its working memory before the heavy steps.
+
+    Returns the Reservation (release it when the request ends); 413 for
+    recordings over the length limit, 415 for files that are not audio, 503
+    with Retry-After when the worker's memory budget is full. A rejection
+    marks the job failed, unless the request has no job (has_job=False).
+    """
+    info = await asyncio.to_thread(probe_audio, file_location)
+    try:
+        return memory_budget.admit(job_id, info, os.path.getsize(file_location))
+    except AdmissionError as e:
+        if has_job:
+            await asyncio.to_thread(job_store.update, job_id, status="failed", error=e.detail)
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
+def analysis_cache_key(audio_hasher, context: str) -> str:
+    """Same key as cache.compute_key(file_bytes, context), from an already-fed audio hasher."""
+    hasher = audio_hasher.copy()
+    hasher.update(context.encode('utf-8'))
+    return hasher.hexdigest()
+
+@app.post("/uploads/init")
+async def upload_init(
+    filename: str = Form(...),
+    size: int = Form(...),
+    chunk_size: int = Form(8 * 1024 * 1024)
+):
+    """Start a resumable upload; the client then PUTs chunks 0..total_chunks-1"""
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {MAX_UPLOAD_BYTES} bytes")
+    try:
+        return upload_store.init_upload(filename, size, chunk_size)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(upload_id: str, index: int, request: Request):
+    """Store one chunk; the X-Chunk-Sha256 header must match its sha256"""
+    checksum = request.headers.get("X-Chunk-Sha256")
+    if not checksum:
+        raise HTTPException(status_code=400, detail="X-Chunk-Sha256 header is required")
+    too_large = HTTPException(status_code=413, detail=f"Chunks are limited to {MAX_CHUNK_BYTES} bytes")
+    # Refuse oversized chunks before reading them, and cap the read for clients that lie or stream
+    try:
+        declared = int(request.headers.get("Content-Length", 0))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+    if declared > MAX_CHUNK_BYTES:
+        raise too_large
+    data = bytearray()
+    async for block in request.stream():
+        data += block
+        if len(data) > MAX_CHUNK_BYTES:
+            raise too_large
+    try:
+        return await asyncio.to_thread(upload_store.put_chunk, upload_id, index, bytes(data), checksum)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    """Received and missing chunks, so an interrupted client can resume"""
+    try:
+        return await asyncio.to_thread(upload_store.status, upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/uploads/{upload_id}/complete")
+async def upload_complete(
+    upload_id: str,
+    participants: str = Form(...),
+    details: str = Form(...),
+    call_types: str = Form(...),
+    tenant: str = Form("default"),
+    priority: str = Form("interactive"),
+    rep: str = Form(""),
+    background: bool = Form(False),
+    preview: bool = Form(False)
+):
+    """Assemble the chunks and run the same pipeline as /analyze_call.
+
+    With background=true the response is just the job id; poll
+    /jobs/{job_id}/progress and fetch the result from /jobs/{job_id}.
+    Adding preview=true puts a quick preview result on the job first
+    (result_stage "preview"), which the final result then replaces.
+    """
+    validate_priority(priority)
+    async with inflight.track():
+        job_id = uuid.uuid4().hex
+        try:
+            with blob_store.writer(job_id) as writer:
+                status = await asyncio.to_thread(upload_store.assemble, upload_id, writer)
+                blob = await asyncio.to_thread(writer.commit)
+        except UploadError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        await asyncio.to_thread(job_store.create, job_id, status["filename"])
+        try:
+            # Rejected uploads keep their chunks, so complete can be retried
+            reservation = await admit_upload(job_id, str(blob.path))
+        except HTTPException:
+            await asyncio.to_thread(blob_store.release, blob)
+            raise
+
+        async def analyze_upload():
+            try:
+                result = await run_analysis(job_id, str(blob.path), blob.hasher, status["filename"],
+                                            participants, details, call_types, tenant, priority, rep,
+                                            preview=background and preview)
+                if "error" not in result:
+                    await asyncio.to_thread(upload_store.delete, upload_id)
+                return result
+            finally:
+                reservation.release()
+                await asyncio.to_thread(blob_store.release, blob)
+
+        if background:
+            inflight.spawn(analyze_upload())
+            return JSONResponse({"job_id": job_id, "status": "running"}, status_code=202)
+        return await analyze_upload()
+
+def hash_file(path: str):
+    """sha256 hasher over a file already on disk, read in 1 MB blocks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            hasher.update(block)
+    return hasher
+
+async def ingest_recording(path: str) -> dict:
+    """Pre-analyse a recording from the drop directory, queued as batch work behind uploads.
+
+    This warms the transcript cache, so when a manager uploads the same call
+    with their own context only the agents run.
+    """
+    filename = os.path.basename(path)
+    ctx = ingest_context(filename)
+    audio_hasher = await asyncio.to_thread(hash_file, path)
+    job_id = uuid.uuid4().hex
+    await asyncio.to_thread(job_store.create, job_id, filename)
+    try:
+        async with inflight.track():
+            result = await run_analysis(job_id, path, audio_hasher, filename, ctx["participants"], ctx["details"],
+                                        ctx["call_types"], INGEST_TENANT, "batch", INGEST_REP)
+    except asyncio.CancelledError:
+        await asyncio.to_thread(job_store.update, job_id, status="interrupted")
+        raise
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return {"analysis_id": result.get("analysis_id", job_id), "audio_sha": audio_hasher.hexdigest()}
+
+@app.get("/ingest/recordings")
+async def ingest_recordings(status: str = "done", limit: int = 50):
+    """Recordings picked up from the drop directory, newest first."""
+    recordings = await asyncio.to_thread(ingest_store.recent, limit, status)
+    return {"recordings": recordings}
+
+@app.get("/ingest/status")
+async def ingest_status():
+    stats = await asyncio.to_thread(ingest_store.stats)
+    return {**stats, "worker_pid": os.getpid(), "watcher": ingest_watcher.status() if ingest_watcher else None}
+
 @app.post("/analyze_call")
 async def analyze_call_combined(
+    request: Request,
+    response: Response,
     audio_file: UploadFile = File(...),
     participants: str = Form(...),
     details: str = Form(...),
-    call_types: str = Form(...)
+    call_types: str = Form(...),
+    tenant: str = Form("default"),
+    priority: str = Form("interactive"),
+    rep: str = Form("")
 ):
+    validate_priority(priority)
+    profile_mode = requested_profile(request)
+    async with inflight.track():
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(job_store.create, job_id, audio_file.filename)
+        blob = None
+        try:
+            async with profile_request(profile_mode, f"analyze_call {job_id[:8]}",
+                                       lambda: inflight.count - 1) as profile:
+                # Stream to disk and hash on the way instead of holding the upload in memory
+                blob = await store_upload(audio_file, job_id)
+                with await admit_upload(job_id, str(blob.path)):
+                    result = await run_analysis(job_id, str(blob.path), blob.hasher, audio_file.filename,
+                                                participants, details, call_types, tenant, priority, rep)
+        finally:
+            await asyncio.to_thread(blob_store.release, blob)
+        if profile is not None:
+            response.headers[PROFILE_HEADER + "-Id"] = profile.profile_id
+            result = {**result, "profile_id": profile.profile_id}
+        return result
+
+async def run_analysis(job_id: str, file_location: str, audio_hasher, filename: str,
+                       participants: str, details: str, call_types: str,
+                       tenant: str = "default", priority: str = "interactive", rep: str = "",
+                       preview: bool = False):
+    """Cache lookup, transcription and multi-agent analysis for an audio file already on disk.
+
+    With `preview`, a quick preview result is put on the job (GET /jobs/{job_id})
+    while the agents run; the final result replaces it.
+    """
     try:
-        print(f"📁 Processing: {audio_file.filename}")
-        
-        # Read file bytes FIRST for caching
-        file_bytes = await audio_file.read()
-        file_size = len(file_bytes)
+        print(f"📁 Processing: {filename} (job {job_id[:8]})")
+        file_size = os.path.getsize(file_location)
         print(f"📊 File size: {file_size} bytes")
+        # Recording length drives the ETA shown while the job runs
+        audio_seconds = await asyncio.to_thread(probe_duration, file_location) or file_size / BYTES_PER_AUDIO_SECOND
+        await asyncio.to_thread(job_store.update, job_id, audio_seconds=audio_seconds)
 
         # Build normalized context string for consistent cache keys
         context = f"Participants: {participants.strip()}\nCall details: {details.strip()}\nCall types: {call_types.strip()}"
 
         # Compute cache key and check cache
-        cache_key = await cache.compute_key(file_bytes, context)
+        cache_key = analysis_cache_key(audio_hasher, context)
         cached_result = await cache.get(cache_key)
         
         if cached_result is not None:
@@ -175,36 +1048,46 @@ async def analyze_call_combined(
             cached_result["cached"] = True
             cached_result["processing_time"] = "0.0s (cached)"
             cached_result["transcription_method"] = "AssemblyAI with Speaker Diarization (cached)"
+            cached_result["job_id"] = job_id
+            versioned(cached_result, "final")
+            if "agents" in cached_result:
+                agents = cached_result["agents"]
+                cached_result["agents"] = {"recomputed": [], "reused": agents.get("recomputed", []) + agents.get("reused", [])}
+            await asyncio.to_thread(job_store.update, job_id, status="completed", stage="cache_hit", result=cached_result)
             return cached_result
 
         # Cache miss - process the file
         print(f"❌ CACHE MISS for key: {cache_key[:12]}...")
         
-        # Save file temporarily for processing
-        file_location = os.path.join(UPLOAD_DIR, audio_file.filename)
-        with open(file_location, "wb") as buffer:
-            buffer.write(file_bytes)
-        
-        print("🎤 AssemblyAI transcription with speaker diarization...")
-        
-        # Use AssemblyAI with speaker labels
-        with open(file_location, "rb") as audio_file_obj:
-            transcript = transcribe_crew_ai(audio_file_obj)
-        
-        print(f"✅ Transcribed with speaker labels: {len(transcript)} characters")
-        remove_file(file_location)
-
-        # Enhanced context for analysis
-        analysis_context = (
-            f"{context}\n"
-            f"Note: This transcript includes speaker labels for better analysis"
+        transcript, transcript_source = await get_or_transcribe(
+            job_id, file_location, audio_hasher.hexdigest(), filename, tenant, priority
         )
 
+        # Context as separate fields so a one-field edit only re-runs the agents that read it
+        analysis_context = {
+            "participants": participants,
+            "details": details,
+            "call_types": call_types,
+            "note": "This transcript includes speaker labels for better analysis",
+        }
+
         # Multi-agent analysis
         if USE_MULTI_AGENT:
             print("🚀 Multi-agent analysis with speaker-aware context...")
-            analysis_result = analyze_call_multi_agent_fast(analysis_context, transcript)
-            print("✅ All 3 agents completed")
+            # The transcription slot is free again; queue for the agents like any new job
+            await asyncio.to_thread(job_store.update, job_id, stage="waiting_for_agents")
+            def _store_preview(result):
+                job_store.update(job_id, result={**result, "job_id": job_id, "analysis_id": job_id,
+                                                 "transcript_source": transcript_source, "cached": False})
+            on_preview = _store_preview if preview else None
+            async with pipeline_scheduler.slot("agents", priority):
+                await asyncio.to_thread(job_store.update, job_id, stage="analyzing")
+                analysis_result = await asyncio.to_thread(
+                    analyze_call_multi_agent_fast, analysis_context, transcript, tenant, priority, True, on_preview
+                )
+            agents = analysis_result.get("agents", {})
+            print(f"✅ Agents completed (recomputed: {', '.join(agents.get('recomputed', [])) or 'none'};"
+                  f" reused: {', '.join(agents.get('reused', [])) or 'none'})")
 
             # Ensure required frontend keys exist
             analysis_result.setdefault("improvement_areas", ["Continue developing sales skills", "Practice active listening"])
@@ -212,14 +1095,30 @@ async def analyze_call_combined(
             
             # Add metadata
             analysis_result["transcription_method"] = "AssemblyAI with Speaker Diarization"
+            analysis_result["transcript_source"] = transcript_source
             analysis_result["cached"] = False
+            # Cache hits point back at this stored analysis
+            analysis_result["analysis_id"] = job_id
             
-            # Cache the result for future use
-            await cache.set(cache_key, analysis_result)
+            # Cache the result for future use; a rule-engine result is not, so the
+            # next upload of this call gets the full analysis once the LLM is back
+            if not analysis_result.get("degraded"):
+                # Tagged with the rep the results store and analytics file the call under
+                await cache.set(cache_key, analysis_result, rep=call_rep(rep, participants.strip()),
+                                prompt_version=PROMPT_VERSION)
+            await asyncio.to_thread(
+                store_analysis, job_id, analysis_result, transcript=transcript,
+                participants=participants.strip(), details=details.strip(), call_types=call_types.strip(),
+                filename=filename, tenant=tenant, rep=rep, audio_sha=audio_hasher.hexdigest()
+            )
+            response = {**analysis_result, "job_id": job_id}
+            await asyncio.to_thread(job_store.update, job_id, status="completed", stage="done", result=response)
             
             print("🎉 PROCESSING COMPLETE - Result cached for future use!")
-            return analysis_result
+            return response
         else:
+            await asyncio.to_thread(job_store.update, job_id, status="failed", stage="analyzing",
+                                    error="Multi-agent system not available")
             return {
                 "error": "Multi-agent system not available",
                 "summary": f"Transcription completed ({len(transcript)} characters) but analysis system is not working.",
@@ -231,6 +1130,7 @@ async def analyze_call_combined(
     except Exception as e:
         print(f"❌ Error in analyze_call_combined: {e}")
         print(traceback.format_exc())
+        await asyncio.to_thread(job_store.update, job_id, status="failed", error=str(e))
         return {
             "error": f"Processing failed: {str(e)}",
             "summary": f"Error occurred during processing: {str(e)}",
@@ -248,7 +1148,8 @@ async def analyze_call_combined(
             "customer_objections": [],
             "next_steps": [],
             "notable_quotes": [],
-            "cached": False
+            "cached": False,
+            "job_id": job_id
         }
 log.info("Backend starting…")
 log.debug("Loaded config and environment")
@@ -0,0 +1,266 @@
+# backend/model_router.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, List, Optional
+
+log = logging.getLogger("salessense.backend")
+
+# Cheap, fast model for previews and for agents whose usual model is over its SLO
+FAST_MODEL = os.getenv("SALESSENSE_FAST_MODEL", "gpt-4o-mini")
+
+# Per agent: tiers ordered by transcript size. A tier applies while the
+# transcript has at most `max_transcript_tokens` tokens (None = no upper bound).
+# max_tokens never goes below the 800 every agent had before routing: a
+# completion cut off mid-JSON or mid-section costs more than the tokens saved.
+DEFAULT_ROUTES: Dict[str, List[Dict[str, Any]]] = {
+    "summary": [
+        {"max_transcript_tokens": 600, "model": "gpt-3.5-turbo", "max_tokens": 800, "timeout": 20},
+        {"max_transcript_tokens": None, "model": "gpt-3.5-turbo", "max_tokens": 800, "timeout": 30},
+    ],
+    "analysis": [
+        {"max_transcript_tokens": 600, "model": "gpt-3.5-turbo", "max_tokens": 800, "timeout": 30},
+        {"max_transcript_tokens": None, "model": "gpt-3.5-turbo", "max_tokens": 1000, "timeout": 45},
+    ],
+    "coaching": [
+        {"max_transcript_tokens": None, "model": "gpt-3.5-turbo", "max_tokens": 800, "timeout": 45},
+    ],
+    # Short gist of the call's opening, shown while the full analysis runs
+    "preview": [
+        {"max_transcript_tokens": None, "model": FAST_MODEL, "max_tokens": 150, "timeout": 10},
+    ],
+}
+
+# JSON with the same shape as DEFAULT_ROUTES; agents it names replace the defaults
+ROUTES_OVERRIDE = os.getenv("SALESSENSE_MODEL_ROUTES")
+# Per-agent latency budget; a model whose observed p95 exceeds it is swapped for FAST_MODEL
+LATENCY_SLO_SECONDS = float(os.getenv("SALESSENSE_LATENCY_SLO_SECONDS", "30"))
+# Observations needed before p95 is trusted
+MIN_SAMPLES = 5
+# Latency samples older than this are ignored. A model over its SLO gets no
+# traffic, so this is how long before it is tried again
+LATENCY_SAMPLE_TTL_SECONDS = float(os.getenv("SALESSENSE_LATENCY_SAMPLE_TTL_SECONDS", "300"))
+
+# Degraded mode: agents are answered by the local rule engine instead of the LLM.
+# "auto" switches interactive requests over while the LLM is failing, slow or
+# queued too long; "force" always uses the rules; "off" never does
+DEGRADED_MODE = os.getenv("SALESSENSE_DEGRADED_MODE", "auto").lower()
+DEGRADE_ERROR_RATE = float(os.getenv("SALESSENSE_DEGRADE_ERROR_RATE", "0.5"))
+DEGRADE_LATENCY_SECONDS = float(os.getenv("SALESSENSE_DEGRADE_LATENCY_SECONDS", "40"))
+# Estimated wait for OpenAI quota at which a request is answered by the rules instead
+DEGRADE_QUEUE_SECONDS = float(os.getenv("SALESSENSE_DEGRADE_QUEUE_SECONDS", "120"))
+# Once tripped, how long before one request probes the LLM again
+DEGRADE_HOLD_SECONDS = float(os.getenv("SALESSENSE_DEGRADE_HOLD_SECONDS", "60"))
+# Recent LLM calls (of any model) that the error rate and p95 are taken over
+HEALTH_WINDOW = 20
+
+
+@dataclass
+class RouteDecision:
+    agent: str
+    model: str
+    max_tokens: int
+    timeout: float
+    transcript_tokens: int
+    reason: str
+    primary_model: str
+    primary_p95_seconds: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class LatencyTracker:
+    """Sliding window of recent LLM call latencies per model, each sample kept for `ttl_seconds`.
+
+    Samples expire so that a model routed away from (and so no longer
+    observed) drops below MIN_SAMPLES and is tried again.
+    """
+
+    def __init__(self, window: int = 100, ttl_seconds: float = LATENCY_SAMPLE_TTL_SECONDS):
+        # (monotonic time, seconds) per call
+        self._samples: Dict[str, Deque] = defaultdict(lambda: deque(maxlen=window))
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._samples[model].append((time.monotonic(), seconds))
+
+    def _recent(self, model: str) -> List[float]:
+        cutoff = time.monotonic() - self.ttl_seconds
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                return []
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            return [seconds for _, seconds in samples]
+
+    def p95(self, model: str) -> Optional[float]:
+        samples = sorted(self._recent(model))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            models = list(self._samples)
+        return {m: {"samples": len(self._recent(m)), "p95_seconds": self.p95(m)} for m in models}
+
+
+class LLMHealth:
+    """Error rate and p95 latency of recent LLM calls, and whether to stop sending them.
+
+    Trips when either crosses its threshold. While tripped, requests go to the
+    rule engine; after DEGRADE_HOLD_SECONDS one request is let through as a
+    probe, and a fast success closes the switch again.
+    """
+
+    def __init__(self, window: int = HEALTH_WINDOW, error_rate: float = DEGRADE_ERROR_RATE,
+                 latency_seconds: float = DEGRADE_LATENCY_SECONDS, hold_seconds: float = DEGRADE_HOLD_SECONDS):
+        # (seconds, ok) per call
+        self._calls: Deque = deque(maxlen=window)
+        self.error_rate_limit = error_rate
+        self.latency_limit = latency_seconds
+        self.hold_seconds = hold_seconds
+        self._lock = threading.Lock()
+        self.tripped_reason: Optional[str] = None
+        self._retry_at = 0.0
+        self._probing = False
+
+    def record(self, seconds: float, ok: bool):
+        with self._lock:
+            self._calls.append((seconds, ok))
+            if self._probing:
+                self._probing = False
+                if ok and seconds <= self.latency_limit:
+                    log.info("✅ LLM probe succeeded, leaving degraded mode")
+                    self.tripped_reason = None
+                    # Judge the LLM on calls made from here on
+                    self._calls.clear()
+                else:
+                    self._retry_at = time.monotonic() + self.hold_seconds
+                return
+            if self.tripped_reason is None:
+                reason = self._check()
+                if reason:
+                    log.warning(f"🛟 Degraded mode on: {reason}")
+                    self.tripped_reason = reason
+                    self._retry_at = time.monotonic() + self.hold_seconds
+
+    def _check(self) -> Optional[str]:
+        if len(self._calls) < MIN_SAMPLES:
+            return None
+        errors = sum(1 for _, ok in self._calls if not ok)
+        if errors / len(self._calls) >= self.error_rate_limit:
+            return f"LLM error rate {errors}/{len(self._calls)}"
+        latencies = sorted(seconds for seconds, ok in self._calls if ok)
+        if len(latencies) >= MIN_SAMPLES:
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            if p95 > self.latency_limit:
+                return f"LLM p95 {p95:.1f}s over {self.latency_limit:.0f}s"
+        return None
+
+    def tripped(self) -> Optional[str]:
+        """Why the LLM should be skipped, or None (also None for the one request chosen to probe)."""
+        with self._lock:
+            if self.tripped_reason is None:
+                return None
+            # A probe that never reported back (its request died) is retried after another hold
+            if time.monotonic() >= self._retry_at:
+                self._probing = True
+                self._retry_at = time.monotonic() + self.hold_seconds
+                log.info("🔎 Probing the LLM with this request")
+                return None
+            return self.tripped_reason
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self._calls)
+            return {
+                "tripped": self.tripped_reason,
+                "calls": len(calls),
+                "errors": sum(1 for _, ok in calls if not ok),
+                "retry_in_seconds": round(max(0.0, self._retry_at - time.monotonic()), 1)
+                if self.tripped_reason else None,
+            }
+
+
+class ModelRouter:
+    """Picks model, max_tokens and timeout per agent from transcript size and observed latency."""
+
+    def __init__(self, routes: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 slo_seconds: float = LATENCY_SLO_SECONDS, fast_model: str = FAST_MODEL):
+        self.routes = dict(routes or DEFAULT_ROUTES)
+        self.slo_seconds = slo_seconds
+        self.fast_model = fast_model
+        self.latency = LatencyTracker()
+        self.health = LLMHealth()
+
+    def _tier(self, agent: str, transcript_tokens: int) -> Dict[str, Any]:
+        tiers = self.routes.get(agent) or self.routes["coaching"]
+        for tier in tiers:
+            limit = tier.get("max_transcript_tokens")
+            if limit is None or transcript_tokens <= limit:
+                return tier
+        return tiers[-1]
+
+    def route(self, agent: str, transcript_tokens: int) -> RouteDecision:
+        tier = self._tier(agent, transcript_tokens)
+        model = tier["model"]
+        limit = tier.get("max_transcript_tokens")
+        reason = f"{transcript_tokens} transcript tokens <= {limit}" if limit else f"{transcript_tokens} transcript tokens, largest tier"
+        p95 = self.latency.p95(model)
+        if p95 is not None and p95 > self.slo_seconds and model != self.fast_model:
+            reason = f"{model} p95 {p95:.1f}s over {self.slo_seconds:.0f}s SLO, using fast model"
+            log.warning(f"⚡ {agent}: {reason}")
+            model = self.fast_model
+        return RouteDecision(
+            agent=agent,
+            model=model,
+            max_tokens=int(tier["max_tokens"]),
+            timeout=float(min(tier["timeout"], self.slo_seconds * 1.5)),
+            transcript_tokens=transcript_tokens,
+            reason=reason,
+            primary_model=tier["model"],
+            primary_p95_seconds=p95,
+        )
+
+    def record_latency(self, model: str, seconds: float):
+        self.latency.record(model, seconds)
+        self.health.record(seconds, ok=True)
+
+    def record_error(self, model: str, seconds: float):
+        self.health.record(seconds, ok=False)
+
+    def degraded_reason(self, priority: str = "interactive", queue_wait_seconds: float = 0.0) -> Optional[str]:
+        """Why this request should use the rule engine instead of the LLM, or None.
+
+        Only interactive requests switch automatically: batch work can wait for
+        the LLM to recover and is worth the full analysis.
+        """
+        if DEGRADED_MODE == "force":
+            return "degraded mode forced"
+        if DEGRADED_MODE == "off" or priority != "interactive":
+            return None
+        if queue_wait_seconds > DEGRADE_QUEUE_SECONDS:
+            return f"OpenAI quota wait {queue_wait_seconds:.0f}s"
+        return self.health.tripped()
+
+
+def _load_routes() -> Dict[str, List[Dict[str, Any]]]:
+    routes = dict(DEFAULT_ROUTES)
+    if ROUTES_OVERRIDE:
+        try:
+            routes.update(json.loads(ROUTES_OVERRIDE))
+        except (json.JSONDecodeError, TypeError) as e:
+            log.error(f"❌ Ignoring invalid SALESSENSE_MODEL_ROUTES: {e}")
+    return routes
+
+
+model_router = ModelRouter(_load_routes())
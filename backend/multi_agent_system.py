@@ -1,36 +1,53 @@
 # backend/multi_agent_system.py
 
-from dotenv import load_dotenv
-load_dotenv(dotenv_path=r"backend\.env")
+from backend.config import load_env
+load_env()
 
 import os
 import json
 import time
 import re
+import hashlib
 import logging
-from typing import TypedDict, Dict, Any
-from concurrent.futures import ThreadPoolExecutor
-
-try:
+import threading
+from functools import lru_cache
+from typing import TypedDict, Callable, Dict, Any, List, Optional, Union, TYPE_CHECKING
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.rate_limiter import rate_limits, estimate_tokens
+from backend.model_router import DEGRADED_MODE, model_router
+from backend.profiling import bind
+from backend.result_codec import AnalysisResult, pack
+
+# LangChain/LangGraph are imported on first use (or by warm_up) so importing
+# this module stays cheap and does not need OPENAI_API_KEY.
+if TYPE_CHECKING:
     from langchain_openai import ChatOpenAI
-    from langgraph.graph import StateGraph, START, END
     from langchain_core.prompts import ChatPromptTemplate
-    log = logging.getLogger("salessense.backend")
-    log.info("✅ LangChain packages loaded successfully")
-except ImportError as e:
-    log.error(f"❌ LangChain import error: {e}")
-    raise
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY in backend/.env")
+log = logging.getLogger("salessense.backend")
+
+# "openai" for real completions; "fake" answers from backend.stand_ins (load tests, offline runs)
+LLM_PROVIDER = os.getenv("SALESSENSE_LLM", "openai")
+
+def get_openai_api_key() -> str:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY in backend/.env")
+    return api_key
 
 class MultiAgentState(TypedDict):
-    context: str
+    context: Union[str, Dict[str, str]]
     transcript: str
+    tenant: str
+    priority: str
+    reuse_outputs: bool
+    routing: Dict[str, Any]
     summary: str
-    analysis: str
-    coaching: str
+    analysis: Dict[str, Any]
+    coaching: Dict[str, Any]
+    agents: Dict[str, List[str]]
+    degraded: Dict[str, Any]
     final_result: Dict[str, Any]
 
 # ==================== BULLETPROOF JSON PARSING ====================
@@ -92,17 +109,25 @@ def safe_json_parse(text: str, agent_name: str = "Unknown") -> Dict[str, Any]:
         return {}
 
 # ==================== LLM & PROMPTS ====================
-def build_optimized_llm() -> ChatOpenAI:
+def build_optimized_llm(route: Optional[Dict[str, Any]] = None) -> "ChatOpenAI":
+    """Chat model for one agent call; `route` is a RouteDecision dict from the model router."""
+    route = route or {}
+    if LLM_PROVIDER == "fake":
+        from backend.stand_ins import FakeChatModel
+        return FakeChatModel(route.get("model", "gpt-3.5-turbo"), route.get("max_tokens", 800), route.get("agent", ""))
+    from langchain_openai import ChatOpenAI
     return ChatOpenAI(
-        openai_api_key=OPENAI_API_KEY,
-        model="gpt-3.5-turbo",
+        openai_api_key=get_openai_api_key(),
+        model=route.get("model", "gpt-3.5-turbo"),
         temperature=0.2,
-        max_tokens=800,
-        timeout=45,
-        streaming=False
+        max_tokens=route.get("max_tokens", 800),
+        timeout=route.get("timeout", 45),
+        streaming=False,
+        # Routes requests with the same static prefix to the same cache
+        extra_body={"prompt_cache_key": f"salessense-{route['agent']}"} if route.get("agent") else None
     )
 
-summary_prompt = ChatPromptTemplate.from_template("""Role:
+SUMMARY_TEMPLATE = """Role:
 You are “SalesSense Executive-Summary Agent Pro”, an ex-Director of Revenue Enablement who distills complex sales calls into crisp, manager-ready briefs.You are 
                                                   an expert in summarization, a veteran sales enablement leader who converts raw, speaker-labeled sales-call transcripts into
                                                   precise, machine-readable insights trusted by CXOs.
@@ -111,9 +136,9 @@ Objective:
 Convert a speaker-labeled sales-call transcript into one 8-10-sentence paragraph (≈130-180 words) that lets a frontline manager instantly grasp deal status, risk, and next actions—using facts only.
 
 Context:
-Dynamic (passed at runtime)
-{context} Participants · call details · call type
-{transcript} AssemblyAI transcript with speaker labels (≤5 000 chars)
+Dynamic (sent after these instructions)
+Transcript AssemblyAI transcript with speaker labels (≤5 000 chars)
+Context Participants · call details · call type
 
 Standing context (always apply; derived from project spec)
 
@@ -145,9 +170,9 @@ Treat silence or small talk as noise.
 
 Use neutral, third-person business prose—no emojis or exclamation points.
 
-Your summary seeds later metric and coaching agents; factual precision is mandatory.""")
+Your summary seeds later metric and coaching agents; factual precision is mandatory."""
 
-analysis_prompt = ChatPromptTemplate.from_template("""
+ANALYSIS_TEMPLATE = """
 Role: You are SalesSense Analysis Agent and an expert of analysis, a veteran Revenue-Ops analyst who converts raw, speaker-labeled sales-call transcripts into
                                                     precise, machine-readable insights trusted by CXOs.You have to deeply analyze the transcript and extract key metrics, strengths, weaknesses, objections, and notable quotes.
                                                    These insights will be used to generate coaching advice and next steps for the sales rep.So these insights must be accurate and actionable.
@@ -158,12 +183,7 @@ Role: You are SalesSense Analysis Agent and an expert of analysis, a veteran Rev
 
 
 Task: Return a single, valid JSON object with call metrics, strengths, weaknesses, and key quotes. Do not include any text, headers, or markdown outside of the JSON.
-
-Context:
-{context}
-
-Transcript:
-{transcript}
+The call's transcript and context follow these instructions.
 
 JSON Structure:
 ```json
@@ -203,21 +223,16 @@ Instructions:
 3. Count questions asked by the rep, objections from the customer, and follow-ups committed by the rep.
 4. If a field has no information, use an empty array `[]` or a default value (e.g., `0`).
 5. Only use facts present in the transcript. Do not invent any information.
-""")
+"""
 
-coaching_prompt = ChatPromptTemplate.from_template("""
+COACHING_TEMPLATE = """
 Role: You are a senior B2B sales coach providing actionable advice.And you have expertise in sales coaching, training, and performance improvement.
                                                    By analyzing the script and the conversation between the our company's representative and other person you have 
                                                    to provide improvement areas, next steps, and coaching tips and other metrics to our company's representative.So that
                                                    they can improve their performance in the future calls.Remember try to provide the best advices possible and 
                                                    they can differ from one person to another as each person has their own qualities and skills.
 Task: Return a single, valid JSON object with specific coaching tips, next steps, and drills. Do not include any text, headers, or markdown outside of the JSON.
-
-Context:
-{context}
-
-Summary:
-{summary}
+The call's summary and context follow these instructions.
 
 JSON Structure:
 ```json
@@ -252,10 +267,175 @@ Instructions:
 2. Focus on concrete, actionable advice for the rep.
 3. If a field has no information, use an empty array `[]` or a default value.
 4. Only use facts derived from the provided summary and context. Do not invent any information.
-""")
+"""
+
+PREVIEW_TEMPLATE = """Role: You brief a busy sales manager on a call while its full analysis is still running.
+Task: From the opening minutes of the call that follow these instructions, write the gist in at most three sentences: who is on the call, what the prospect needs, and where the conversation is heading.
+Rules: Plain text only, no lists or headings. Use only what is in the transcript and context; say nothing about the rest of the call.
+"""
+
+PROMPT_TEMPLATES = {
+    "summary": SUMMARY_TEMPLATE,
+    "analysis": ANALYSIS_TEMPLATE,
+    "coaching": COACHING_TEMPLATE,
+    "preview": PREVIEW_TEMPLATE,
+}
+
+# Per-call data goes in its own message after the static instructions, so every
+# request of an agent starts with the same bytes and the provider can serve that
+# prefix from its prompt cache. Most stable first: a re-run of the same call
+# (context edit, retry) also shares the transcript and gets it cached too.
+CALL_DATA_TEMPLATES = {
+    "summary": "Transcript:\n{transcript}\n\nContext:\n{context}",
+    "analysis": "Transcript:\n{transcript}\n\nContext:\n{context}",
+    "coaching": "Summary:\n{summary}\n\nContext:\n{context}",
+    "preview": "Opening of the call:\n{transcript}\n\nContext:\n{context}",
+}
+
+# Several short calls in one request (offline backfill). The system prompt above
+# stays first and unchanged, so packed requests share its cached prefix too.
+PACKED_CALLS_TEMPLATE = """Several calls follow, each starting with a line "### Call <id>". Treat each call on its own, exactly as the instructions above describe for a single call, and never mix facts between calls.
+Return only one JSON object whose keys are the call ids and whose values are each call's {result}."""
+PACKED_RESULT_SHAPES = {
+    "summary": "summary paragraph as a JSON string",
+    "analysis": "JSON object",
+    "coaching": "JSON object",
+}
+PACKED_CALL_HEADER = "### Call {call_id}"
+
+# Characters of transcript each agent reads (the rest of a long call is cut)
+TRANSCRIPT_CHARS = {"summary": 3000, "analysis": 3500}
+
+# What each agent reads: context fields, the transcript, or another agent's output.
+# An agent is re-run only when one of these changes; everything else is reused.
+AGENT_INPUTS = {
+    "summary": ("participants", "details", "call_types", "transcript"),
+    "analysis": ("participants", "details", "call_types", "transcript"),
+    "coaching": ("participants", "details", "call_types", "summary"),
+    "preview": ("participants", "details", "transcript"),
+}
+AGENT_ORDER = ("summary", "analysis", "coaching")
+# Changes whenever what the agents are asked changes; cached analyses made
+# under another version are stale (transcripts are not affected)
+PROMPT_VERSION = hashlib.sha256("\0".join(
+    f"{PROMPT_TEMPLATES[a]}\0{CALL_DATA_TEMPLATES[a]}\0{TRANSCRIPT_CHARS.get(a)}" for a in AGENT_ORDER
+).encode("utf-8")).hexdigest()[:12]
+CONTEXT_FIELDS = ("participants", "details", "call_types")
+CONTEXT_LABELS = {"participants": "Participants", "details": "Call details", "call_types": "Call types"}
+
+def agent_context(context: Union[str, Dict[str, str]], agent: str) -> str:
+    """The context lines an agent sees.
+
+    A plain string goes to every agent as-is. A dict of fields is filtered by
+    AGENT_INPUTS; keys other than CONTEXT_FIELDS (notes) go to every agent.
+    """
+    if isinstance(context, str):
+        return context
+    return "\n".join(
+        f"{CONTEXT_LABELS.get(name, name.replace('_', ' ').capitalize())}: {value.strip()}"
+        for name, value in context.items()
+        if name not in CONTEXT_FIELDS or name in AGENT_INPUTS[agent]
+    )
+
+def agent_cache_key(agent: str, state: MultiAgentState, outputs: Dict[str, Any]) -> str:
+    """Hash of the agent's prompt and every input it reads (upstream outputs included)."""
+    hasher = hashlib.sha256(f"{agent}\0{PROMPT_TEMPLATES[agent]}\0{CALL_DATA_TEMPLATES[agent]}\0".encode("utf-8"))
+    hasher.update(agent_context(state.get("context", ""), agent).encode("utf-8"))
+    for name in AGENT_INPUTS[agent]:
+        if name == "transcript":
+            hasher.update(b"\0transcript\0" + state.get("transcript", "").encode("utf-8"))
+        elif name in PROMPT_TEMPLATES:
+            hasher.update(f"\0{name}\0".encode("utf-8") + pack(outputs.get(name, "")))
+    return hasher.hexdigest()
+
+_agent_cache = None
+_agent_cache_lock = threading.Lock()
+
+def get_agent_cache():
+    global _agent_cache
+    with _agent_cache_lock:
+        if _agent_cache is None:
+            from backend.agent_cache import AgentOutputCache
+            _agent_cache = AgentOutputCache()
+    return _agent_cache
+
+@lru_cache(maxsize=None)
+def get_prompt(name: str) -> "ChatPromptTemplate":
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages([("system", PROMPT_TEMPLATES[name]), ("human", CALL_DATA_TEMPLATES[name])])
+
+@lru_cache(maxsize=None)
+def get_packed_prompt(name: str) -> "ChatPromptTemplate":
+    """Prompt for several calls at once; `calls` is each call's header and call data."""
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages([
+        ("system", PROMPT_TEMPLATES[name]),
+        ("system", PACKED_CALLS_TEMPLATE.format(result=PACKED_RESULT_SHAPES[name])),
+        ("human", "{calls}"),
+    ])
+
+class PromptCacheStats:
+    """Input tokens per agent and how many of them the provider served from its prompt cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, agent: str, input_tokens: int, cached_tokens: int):
+        with self._lock:
+            totals = self._totals.setdefault(agent, {"calls": 0, "cache_hits": 0, "input_tokens": 0,
+                                                     "cached_input_tokens": 0})
+            totals["calls"] += 1
+            totals["cache_hits"] += 1 if cached_tokens else 0
+            totals["input_tokens"] += input_tokens
+            totals["cached_input_tokens"] += cached_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                agent: {**totals, "cached_share": round(totals["cached_input_tokens"] / totals["input_tokens"], 3)
+                        if totals["input_tokens"] else 0.0}
+                for agent, totals in self._totals.items()
+            }
+
+prompt_cache_stats = PromptCacheStats()
+
+def invoke_llm(llm, messages, state: MultiAgentState, agent: str):
+    """Invoke the LLM once the caller's tenant/priority fits the OpenAI RPM/TPM budget.
+
+    Latency and token usage are recorded on the agent's routing entry and fed
+    back to the model router's p95 tracker.
+    """
+    limiter = rate_limits["openai"]
+    estimated = estimate_tokens(*(m.content for m in messages), completion_tokens=llm.max_tokens or 0)
+    waited = limiter.acquire(state.get("tenant", "default"), state.get("priority", "interactive"), estimated)
+    if waited > 1:
+        log.info(f"⏳ Waited {waited:.1f}s for OpenAI quota")
+    start = time.time()
+    try:
+        response = llm.invoke(messages)
+    except Exception:
+        model_router.record_error(llm.model_name, time.time() - start)
+        raise
+    elapsed = time.time() - start
+    model_router.record_latency(llm.model_name, elapsed)
+    usage = getattr(response, "usage_metadata", None) or {}
+    limiter.reconcile(estimated, usage.get("total_tokens", 0))
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    prompt_cache_stats.record(agent, usage.get("input_tokens") or 0, cached_tokens)
+    route = state.get("routing", {}).get(agent)
+    if route is not None:
+        route.update(
+            latency_seconds=round(elapsed, 2),
+            quota_wait_seconds=round(waited, 2),
+            input_tokens=usage.get("input_tokens"),
+            cached_input_tokens=cached_tokens,
+            output_tokens=usage.get("output_tokens"),
+        )
+    return response
 
 # ==================== HARDENED AGENTS ====================
-def run_agent_with_timing(agent_func, state, agent_name) -> Dict[str, str]:
+def run_agent_with_timing(agent_func, state, agent_name) -> Dict[str, Any]:
     start = time.time()
     try:
         result = agent_func(state)
@@ -266,26 +446,27 @@ def run_agent_with_timing(agent_func, state, agent_name) -> Dict[str, str]:
         return {}
 
 def summary_agent_node(state: MultiAgentState) -> Dict[str, str]:
-    llm = build_optimized_llm()
-    transcript = state.get("transcript", "")[:3000]
-    response = llm.invoke(summary_prompt.format_messages(
-        context=state.get("context", ""),
+    llm = build_optimized_llm(state.get("routing", {}).get("summary"))
+    transcript = state.get("transcript", "")[:TRANSCRIPT_CHARS["summary"]]
+    response = invoke_llm(llm, get_prompt("summary").format_messages(
+        context=agent_context(state.get("context", ""), "summary"),
         transcript=transcript
-    ))
+    ), state, "summary")
     summary = getattr(response, 'content', "").strip()
     return {"summary": summary}
 
-def analysis_agent_node(state: MultiAgentState) -> Dict[str, str]:
-    llm = build_optimized_llm()
-    transcript = state.get("transcript", "")[:3500]
-    response = llm.invoke(analysis_prompt.format_messages(
-        context=state.get("context", ""),
+def analysis_agent_node(state: MultiAgentState) -> Dict[str, Any]:
+    llm = build_optimized_llm(state.get("routing", {}).get("analysis"))
+    transcript = state.get("transcript", "")[:TRANSCRIPT_CHARS["analysis"]]
+    response = invoke_llm(llm, get_prompt("analysis").format_messages(
+        context=agent_context(state.get("context", ""), "analysis"),
         transcript=transcript
-    ))
+    ), state, "analysis")
     text = getattr(response, "content", "").strip()
-    
-    data = safe_json_parse(text, "Analysis Agent")
-    
+    return {"analysis": normalize_analysis(safe_json_parse(text, "Analysis Agent"))}
+
+def normalize_analysis(data: Any) -> Dict[str, Any]:
+    """Analysis agent output with every key present and talk ratios summing to 100."""
     # Guaranteed structure even if parse failed
     if not isinstance(data, dict):
         data = {}
@@ -319,18 +500,18 @@ def analysis_agent_node(state: MultiAgentState) -> Dict[str, str]:
         metrics['rep_talk_ratio_percent'] = 50
         metrics['customer_talk_ratio_percent'] = 50
     
-    return {"analysis": json.dumps(data, ensure_ascii=False)}
+    return data
 
-def coaching_agent_node(state: MultiAgentState) -> Dict[str, str]:
-    llm = build_optimized_llm()
-    response = llm.invoke(coaching_prompt.format_messages(
-        context=state.get("context", ""),
+def coaching_agent_node(state: MultiAgentState) -> Dict[str, Any]:
+    llm = build_optimized_llm(state.get("routing", {}).get("coaching"))
+    response = invoke_llm(llm, get_prompt("coaching").format_messages(
+        context=agent_context(state.get("context", ""), "coaching"),
         summary=state.get("summary", "")
-    ))
+    ), state, "coaching")
     text = getattr(response, "content", "").strip()
-    
-    data = safe_json_parse(text, "Coaching Agent")
-    
+    return {"coaching": normalize_coaching(safe_json_parse(text, "Coaching Agent"))}
+
+def normalize_coaching(data: Any) -> Dict[str, Any]:
     # Guaranteed structure even if parse failed
     if not isinstance(data, dict):
         data = {}
@@ -340,39 +521,120 @@ def coaching_agent_node(state: MultiAgentState) -> Dict[str, str]:
     data.setdefault('next_steps', [])
     data.setdefault('coaching_tips', [])
     
-    return {"coaching": json.dumps(data, ensure_ascii=False)}
+    return data
 
 # ==================== ORCHESTRATION ====================
-def parallel_processing_node(state: MultiAgentState) -> MultiAgentState:
-    log.info("🚀 Starting parallel execution of all 3 agents...")
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        f_sum = executor.submit(run_agent_with_timing, summary_agent_node, state, "Summary Agent")
-        f_ana = executor.submit(run_agent_with_timing, analysis_agent_node, state, "Analysis Agent")
-        f_coa = executor.submit(run_agent_with_timing, coaching_agent_node, state, "Coaching Agent")
-        
-        summary_result = f_sum.result()
-        analysis_result = f_ana.result()
-        coaching_result = f_coa.result()
+def route_agents(transcript: str) -> Dict[str, Any]:
+    transcript_tokens = estimate_tokens(transcript)
+    return {
+        agent: model_router.route(agent, transcript_tokens).as_dict()
+        for agent in ("summary", "analysis", "coaching")
+    }
 
-    updated_state = {**state}
-    updated_state.update(summary_result)
-    updated_state.update(analysis_result)
-    updated_state.update(coaching_result)
-    return updated_state
+AGENT_NODES = {
+    "summary": (summary_agent_node, "Summary Agent"),
+    "analysis": (analysis_agent_node, "Analysis Agent"),
+    "coaching": (coaching_agent_node, "Coaching Agent"),
+}
+
+def parallel_processing_node(state: MultiAgentState) -> MultiAgentState:
+    """Run each agent as soon as its upstream agents are done, reusing cached outputs.
+
+    Summary and analysis start together; coaching starts when the summary it
+    reads is ready. An agent whose inputs hash to a cached output is not run.
+
+    In degraded mode (see model_router.degraded_reason) agents that would call
+    the LLM are answered by the rule engine instead, as are agents whose LLM
+    call failed. Rule outputs are never cached.
+    """
+    from backend import rule_engine
+    log.info("🚀 Starting agents (summary + analysis in parallel, coaching after summary)...")
+    state = {**state, "routing": route_agents(state.get("transcript", ""))}
+    cache = get_agent_cache() if state.get("reuse_outputs", True) else None
+    outputs: Dict[str, Any] = {}
+    reused: List[str] = []
+    recomputed: List[str] = []
+    pending = list(AGENT_ORDER)
+    running = {}
+    degraded_reason: Optional[str] = None
+    checked_health = False
+    fallback: List[str] = []
+    rules: Dict[str, Any] = {}
+
+    def rule_output(agent: str, reason: str) -> Any:
+        if not rules:
+            rules.update(rule_engine.analyze(state.get("transcript", ""), state.get("context", ""), reason))
+        state["routing"][agent].update(model="rules", reason=reason)
+        fallback.append(agent)
+        return rules[agent]
+
+    with ThreadPoolExecutor(max_workers=len(AGENT_ORDER)) as executor:
+        while pending or running:
+            for agent in list(pending):
+                if any(dep in AGENT_NODES and dep not in outputs for dep in AGENT_INPUTS[agent]):
+                    continue
+                pending.remove(agent)
+                key = agent_cache_key(agent, state, outputs)
+                cached = cache.get(key) if cache else None
+                if cached is not None:
+                    outputs[agent] = cached
+                    reused.append(agent)
+                    state["routing"][agent]["reused"] = True
+                    continue
+                if not checked_health:
+                    # Decided once per request, at the first agent that would call the LLM
+                    checked_health = True
+                    priority = state.get("priority", "interactive")
+                    degraded_reason = model_router.degraded_reason(priority, quota_wait(priority))
+                if degraded_reason:
+                    outputs[agent] = rule_output(agent, degraded_reason)
+                    continue
+                node, name = AGENT_NODES[agent]
+                # bind() carries a per-request profile into the agent thread
+                running[executor.submit(bind(run_agent_with_timing), node, {**state, **outputs}, name)] = (agent, key)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                agent, key = running.pop(future)
+                output = future.result().get(agent, "")
+                if not output and DEGRADED_MODE != "off":
+                    # The LLM call failed; the rules still give a usable answer
+                    output = rule_output(agent, "LLM call failed")
+                elif cache and output:
+                    cache.set(key, agent, output)
+                outputs[agent] = output
+                recomputed.append(agent)
+
+    if reused:
+        log.info(f"♻️ Reused agent outputs: {', '.join(reused)}")
+    degraded = {}
+    if fallback:
+        log.warning(f"🛟 Rule engine answered: {', '.join(fallback)}")
+        degraded = {"engine": "rules", "agents": fallback,
+                    "reason": degraded_reason or state["routing"][fallback[0]]["reason"]}
+    return {**state, **outputs, "agents": {"recomputed": recomputed, "reused": reused}, "degraded": degraded}
+
+def quota_wait(priority: str) -> float:
+    """Estimated wait for OpenAI quota at this priority right now."""
+    queue = rate_limits["openai"].status().get("queues", {}).get(priority, {})
+    return float(queue.get("estimated_wait_seconds") or 0.0)
+
+def _agent_data(value: Any, agent_name: str) -> Dict[str, Any]:
+    """Agent output as a dict; outputs cached before agents returned dicts are JSON text."""
+    if isinstance(value, dict):
+        return value
+    data = safe_json_parse(value or "{}", agent_name)
+    return data if isinstance(data, dict) else {}
 
 def combine_results_node(state: MultiAgentState) -> MultiAgentState:
-    analysis_data = safe_json_parse(state.get("analysis", "{}"), "Final Analysis")
-    coaching_data = safe_json_parse(state.get("coaching", "{}"), "Final Coaching")
+    analysis_data = _agent_data(state.get("analysis"), "Final Analysis")
+    coaching_data = _agent_data(state.get("coaching"), "Final Coaching")
 
     # Extract with safe defaults
-    metrics = analysis_data.get("metrics", {})
-    strengths = analysis_data.get("strengths", [])
-    areas_to_improve = analysis_data.get("areas_to_improve", [])
+    metrics = dict(analysis_data.get("metrics") or {})
     objections = analysis_data.get("customer_objections", [])
-    quotes = analysis_data.get("notable_quotes", [])
-    
     next_steps = coaching_data.get("next_steps", [])
-    coaching_tips = coaching_data.get("coaching_tips", [])
     
     # Ensure metrics exist
     metrics.setdefault("overall_sentiment", "neutral")
@@ -382,20 +644,90 @@ def combine_results_node(state: MultiAgentState) -> MultiAgentState:
     metrics.setdefault("objections_detected", len(objections))
     metrics.setdefault("followups_committed", len(next_steps) if isinstance(next_steps, list) else 0)
 
-    final_result = {
-        "summary": state.get("summary", "Call analysis completed"),
-        "metrics": metrics,
-        "strengths": strengths,
-        "improvement_areas": areas_to_improve,
-        "customer_objections": objections,
-        "next_steps": next_steps,
-        "coaching_tips": coaching_tips,
-        "notable_quotes": quotes
-    }
-    return {"final_result": final_result}
+    final_result = AnalysisResult(
+        summary=state.get("summary", "Call analysis completed"),
+        metrics=metrics,
+        strengths=analysis_data.get("strengths", []),
+        improvement_areas=analysis_data.get("areas_to_improve", []),
+        customer_objections=objections,
+        next_steps=next_steps,
+        coaching_tips=coaching_data.get("coaching_tips", []),
+        notable_quotes=analysis_data.get("notable_quotes", []),
+        routing=state.get("routing", {}),
+        agents=state.get("agents") or {"recomputed": list(AGENT_ORDER), "reused": []},
+    )
+    if state.get("degraded"):
+        final_result.extra["degraded"] = state["degraded"]
+    return {"final_result": final_result.to_dict()}
+
+# ==================== PREVIEW ====================
+# Two-phase results: a preview within seconds, then the final analysis that
+# replaces it. Clients tell them apart by result_stage and keep the highest
+# result_version they have seen.
+PREVIEW_VERSION = 1
+FINAL_VERSION = 2
+# The preview summary reads this much of the start of the call
+PREVIEW_MINUTES = float(os.getenv("SALESSENSE_PREVIEW_MINUTES", "3"))
+SPOKEN_WORDS_PER_MINUTE = 150
+
+def opening_minutes(transcript: str, minutes: float = PREVIEW_MINUTES) -> str:
+    """The transcript lines spoken in roughly the first `minutes`, from word counts."""
+    budget = int(minutes * SPOKEN_WORDS_PER_MINUTE)
+    lines, words = [], 0
+    for line in (transcript or "").splitlines():
+        if words >= budget:
+            break
+        lines.append(line)
+        words += len(line.split())
+    return "\n".join(lines)
+
+def versioned(result: Dict[str, Any], stage: str) -> Dict[str, Any]:
+    result["result_stage"] = stage
+    result["result_version"] = PREVIEW_VERSION if stage == "preview" else FINAL_VERSION
+    return result
+
+def preview_call(context: Union[str, Dict[str, str]], transcript: str, tenant: str = "default",
+                 priority: str = "interactive") -> Dict[str, Any]:
+    """First result for a call: rule-engine metrics over the whole transcript and a
+    short summary of its opening minutes from the fast model.
+
+    Coaching is left for the final result. In degraded mode, or if the fast
+    model fails, the rule engine's summary is used instead.
+    """
+    from backend import rule_engine
+    start = time.time()
+    rules = rule_engine.analyze(transcript, context)
+    opening = opening_minutes(transcript)
+    state = {"context": context or "", "tenant": tenant, "priority": priority,
+             "routing": {"preview": model_router.route("preview", estimate_tokens(opening)).as_dict()}}
+    summary = ""
+    if not model_router.degraded_reason(priority, quota_wait(priority)):
+        try:
+            llm = build_optimized_llm(state["routing"]["preview"])
+            response = invoke_llm(llm, get_prompt("preview").format_messages(
+                context=agent_context(state["context"], "preview"),
+                transcript=opening
+            ), state, "preview")
+            summary = getattr(response, "content", "").strip()
+        except Exception as e:
+            log.warning(f"⚠️ Preview summary failed, using the rule summary: {e}")
+    if not summary:
+        state["routing"]["preview"].update(model="rules")
+    preview = combine_results_node({
+        "summary": summary or rules["summary"],
+        "analysis": rules["analysis"],
+        "coaching": {"next_steps": rules["coaching"]["next_steps"]},
+        "routing": state["routing"],
+        "agents": {"recomputed": ["preview"], "reused": []},
+    })["final_result"]
+    preview["processing_time"] = f"{time.time() - start:.1f}s"
+    preview["agents_used"] = "Preview (fast model + local metrics)"
+    log.info(f"👀 Preview ready in {time.time() - start:.2f}s")
+    return versioned(preview, "preview")
 
 # ==================== GRAPH SETUP ====================
 def build_fast_multi_agent_graph():
+    from langgraph.graph import StateGraph, START, END
     graph = StateGraph(state_schema=MultiAgentState)
     graph.add_node("parallel_processing", parallel_processing_node)
     graph.add_node("combine_results", combine_results_node)
@@ -405,13 +737,54 @@ def build_fast_multi_agent_graph():
     return graph.compile()
 
 _fast_multi_agent_graph = None
+_graph_lock = threading.Lock()
 
-def analyze_call_multi_agent_fast(context: str, transcript: str) -> Dict[str, Any]:
+def preload_graph():
+    """Build the compiled graph once per process (safe to call from any thread)."""
     global _fast_multi_agent_graph
-    if _fast_multi_agent_graph is None:
-        log.info("🔧 Building multi-agent graph...")
-        _fast_multi_agent_graph = build_fast_multi_agent_graph()
-        log.info("✅ Multi-agent graph ready")
+    with _graph_lock:
+        if _fast_multi_agent_graph is None:
+            log.info("🔧 Building multi-agent graph...")
+            _fast_multi_agent_graph = build_fast_multi_agent_graph()
+            log.info("✅ Multi-agent graph ready")
+    return _fast_multi_agent_graph
+
+def warm_up():
+    """Import the heavy SDKs, compile prompts and build the graph ahead of the first request."""
+    start = time.time()
+    import langchain_openai  # noqa: F401 - pulls in openai/httpx/tiktoken
+    for name in PROMPT_TEMPLATES:
+        get_prompt(name)
+    preload_graph()
+    log.info(f"✅ LangChain packages loaded and graph warmed in {time.time() - start:.1f}s")
+
+def analyze_call_multi_agent_fast(context: Union[str, Dict[str, str]], transcript: str, tenant: str = "default",
+                                  priority: str = "interactive", reuse_outputs: bool = True,
+                                  on_preview: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Run the three agents on a transcript.
+
+    Pass `context` as a dict of CONTEXT_FIELDS so each agent only depends on
+    the fields it reads: an edit to one field then re-runs just the agents
+    that read it. `reuse_outputs=False` skips the agent output cache (for
+    one-off inputs such as live-call windows).
+
+    With `on_preview`, a preview (see preview_call) is built next to the
+    agents and passed to it as soon as it is ready, always before this
+    returns the final result that replaces it.
+    """
+    graph = _fast_multi_agent_graph or preload_graph()
+
+    preview_thread = None
+    if on_preview is not None:
+        def publish_preview(full_transcript: str):
+            try:
+                on_preview(preview_call(context, full_transcript, tenant, priority))
+            except Exception as e:
+                log.warning(f"⚠️ Preview failed: {e}", exc_info=True)
+        # The agents read a truncated transcript; the local metrics are cheap enough for all of it
+        preview_thread = threading.Thread(target=bind(publish_preview), args=(transcript or "",),
+                                          name="preview", daemon=True)
+        preview_thread.start()
 
     if transcript and len(transcript) > 5000:
         transcript = transcript[:5000] + "... [truncated]"
@@ -419,24 +792,42 @@ def analyze_call_multi_agent_fast(context: str, transcript: str) -> Dict[str, An
     initial_state: MultiAgentState = {
         "context": context or "",
         "transcript": transcript or "",
+        "tenant": tenant,
+        "priority": priority,
+        "reuse_outputs": reuse_outputs,
+        "routing": {},
         "summary": "",
-        "analysis": "",
-        "coaching": "",
+        "analysis": {},
+        "coaching": {},
+        "agents": {},
+        "degraded": {},
         "final_result": {}
     }
 
     log.info(f"🎯 Processing transcript ({len(transcript or '')} chars)...")
     start = time.time()
     try:
-        result_state: MultiAgentState = _fast_multi_agent_graph.invoke(initial_state)
+        result_state: MultiAgentState = graph.invoke(initial_state)
         total = time.time() - start
         out = result_state.get("final_result", {})
         out["processing_time"] = f"{total:.1f}s"
-        out["agents_used"] = "Summary + Analysis + Coaching (parallel, JSON-safe)"
+        out["agents_used"] = "Summary + Analysis + Coaching (dependency-ordered, JSON-safe)"
         log.info("🎉 TOTAL PROCESSING: Analysis complete with ALL 3 AGENTS!")
-        return out
+        return versioned(out, "final")
     except Exception as e:
         log.error(f"❌ Multi-agent failure: {e}", exc_info=True)
+        try:
+            if DEGRADED_MODE == "off":
+                raise RuntimeError("degraded mode is off")
+            from backend import rule_engine
+            rules = rule_engine.analyze(initial_state["transcript"], initial_state["context"], "analysis error")
+            out = combine_results_node({**initial_state, **rules, "degraded": {
+                "engine": "rules", "agents": list(AGENT_ORDER), "reason": "analysis error"}})["final_result"]
+            out["processing_time"] = f"{time.time() - start:.1f}s"
+            out["agents_used"] = "Rule engine (error fallback)"
+            return versioned(out, "final")
+        except Exception as rule_error:
+            log.error(f"❌ Rule engine fallback failed: {rule_error}", exc_info=True)
         return {
             "summary": "Analysis failed due to a system error. Please try again or with a different file.",
             "metrics": {},
@@ -447,5 +838,11 @@ def analyze_call_multi_agent_fast(context: str, transcript: str) -> Dict[str, An
             "coaching_tips": [{"skill": "Technical", "tip": "Contact support with the error log."}],
             "notable_quotes": [],
             "processing_time": "error",
-            "agents_used": "Error fallback"
+            "agents_used": "Error fallback",
+            "result_stage": "final",
+            "result_version": FINAL_VERSION,
         }
+    finally:
+        if preview_thread is not None:
+            # A preview published after the final result would replace it
+            preview_thread.join()
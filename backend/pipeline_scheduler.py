@@ -0,0 +1,185 @@
+# backend/pipeline_scheduler.py
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from backend.rate_limiter import PRIORITIES, WORKER_COUNT
+
+# Share of the queue each class is served when both are waiting (weighted fair queuing)
+CLASS_WEIGHTS = {
+    "interactive": float(os.getenv("SALESSENSE_INTERACTIVE_WEIGHT", "4")),
+    "batch": float(os.getenv("SALESSENSE_BATCH_WEIGHT", "1")),
+}
+# Most of a stage's slots a class may hold at once (at least one), so batch leaves the rest free.
+# Caps are enforced per worker, not across the deployment: a worker with one
+# slot could not hold back anything for uploads, so while any class is capped
+# below its full share every worker keeps at least two slots of each stage,
+# even if that puts the deployment above the configured total. The provider
+# quotas in rate_limiter still bound the API calls those extra slots can make.
+CLASS_SLOT_SHARE = {
+    "interactive": float(os.getenv("SALESSENSE_INTERACTIVE_SLOT_SHARE", "1.0")),
+    "batch": float(os.getenv("SALESSENSE_BATCH_SLOT_SHARE", "0.5")),
+}
+MIN_WORKER_SLOTS = 2 if min(CLASS_SLOT_SHARE.values()) < 1.0 else 1
+
+# Pipeline stages that hold a slot; a job gives its slot back between them, so
+# work that arrived meanwhile at a higher priority gets the next agents slot
+STAGE_SLOTS = {
+    "transcription": max(MIN_WORKER_SLOTS, int(os.getenv("SALESSENSE_TRANSCRIBE_SLOTS", "4")) // WORKER_COUNT),
+    "agents": max(MIN_WORKER_SLOTS, int(os.getenv("SALESSENSE_AGENT_SLOTS", "4")) // WORKER_COUNT),
+}
+# Recent waits kept per stage and class for the percentiles
+WAIT_HISTORY = 500
+
+
+class _Waiter:
+    __slots__ = ("priority", "tag", "future", "enqueued_at")
+
+    def __init__(self, priority: str, tag: float, future: asyncio.Future):
+        self.priority = priority
+        self.tag = tag
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class _ClassStats:
+    __slots__ = ("granted", "total_wait", "waits", "overtaken")
+
+    def __init__(self):
+        self.granted = 0
+        self.total_wait = 0.0
+        self.waits: Deque[float] = deque(maxlen=WAIT_HISTORY)
+        # Times a job in this class was waiting and a later one from another class went first
+        self.overtaken = 0
+
+    def record(self, waited: float):
+        self.granted += 1
+        self.total_wait += waited
+        self.waits.append(waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3) if waits else 0.0
+
+        return {
+            "granted": self.granted,
+            "avg_wait_seconds": round(self.total_wait / self.granted, 3) if self.granted else 0.0,
+            "p50_wait_seconds": pct(0.5),
+            "p95_wait_seconds": pct(0.95),
+            "max_wait_seconds": round(waits[-1], 3) if waits else 0.0,
+            "overtaken": self.overtaken,
+        }
+
+
+class _Stage:
+    """Slots of one stage, handed out by start-time fair queuing across classes."""
+
+    def __init__(self, name: str, slots: int):
+        self.name = name
+        self.slots = slots
+        self.caps = {p: max(1, min(slots, int(slots * CLASS_SLOT_SHARE.get(p, 1.0)))) for p in PRIORITIES}
+        self.running = {p: 0 for p in PRIORITIES}
+        self.queues: Dict[str, Deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self.stats = {p: _ClassStats() for p in PRIORITIES}
+        # Virtual time is the tag of the last job started; each class's tags advance by
+        # 1/weight per job, so a class with weight 4 starts four jobs for every one of weight 1
+        self.virtual_time = 0.0
+        self.last_tag = {p: 0.0 for p in PRIORITIES}
+
+    def enqueue(self, priority: str) -> _Waiter:
+        tag = max(self.virtual_time, self.last_tag[priority]) + 1.0 / CLASS_WEIGHTS.get(priority, 1.0)
+        self.last_tag[priority] = tag
+        waiter = _Waiter(priority, tag, asyncio.get_running_loop().create_future())
+        self.queues[priority].append(waiter)
+        self.dispatch()
+        return waiter
+
+    def dispatch(self):
+        while sum(self.running.values()) < self.slots:
+            eligible = [self.queues[p][0] for p in PRIORITIES
+                        if self.queues[p] and self.running[p] < self.caps[p]]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (w.tag, PRIORITIES.index(w.priority)))
+            self.queues[waiter.priority].popleft()
+            for other in PRIORITIES:
+                queue = self.queues[other]
+                if other != waiter.priority and queue and queue[0].enqueued_at < waiter.enqueued_at:
+                    self.stats[other].overtaken += 1
+            self.running[waiter.priority] += 1
+            self.virtual_time = waiter.tag
+            waited = time.monotonic() - waiter.enqueued_at
+            self.stats[waiter.priority].record(waited)
+            waiter.future.set_result(waited)
+
+    def release(self, priority: str):
+        self.running[priority] -= 1
+        self.dispatch()
+
+    def abandon(self, waiter: _Waiter):
+        try:
+            self.queues[waiter.priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        classes = {}
+        for p in PRIORITIES:
+            queue = self.queues[p]
+            classes[p] = {
+                "weight": CLASS_WEIGHTS.get(p, 1.0),
+                "max_slots": self.caps[p],
+                "running": self.running[p],
+                "queue_depth": len(queue),
+                "oldest_wait_seconds": round(now - queue[0].enqueued_at, 3) if queue else 0.0,
+                **self.stats[p].snapshot(),
+            }
+        return {"slots": self.slots, "in_use": sum(self.running.values()), "classes": classes}
+
+
+class PipelineScheduler:
+    """Admission to the expensive pipeline stages (transcription, agents) by priority class.
+
+    Unlike the provider limiters, which pace individual API calls, this bounds how
+    many jobs are inside a stage at once. Classes share a stage by weight, each is
+    capped at its slot share, and a job queues again at every stage boundary, so a
+    backfill can hold at most its share of slots and interactive uploads that
+    arrive mid-backfill go ahead of it at the next boundary. Running stages are
+    never interrupted. One scheduler per worker process, like the limiters.
+    """
+
+    def __init__(self, slots: Optional[Dict[str, int]] = None):
+        self.stages = {name: _Stage(name, count) for name, count in (slots or STAGE_SLOTS).items()}
+
+    @asynccontextmanager
+    async def slot(self, stage: str, priority: str = "interactive"):
+        """Hold a slot of `stage` for the body; yields the seconds spent queued."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}")
+        queue = self.stages[stage]
+        waiter = queue.enqueue(priority)
+        try:
+            waited = await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller went away
+                queue.release(priority)
+            else:
+                queue.abandon(waiter)
+            raise
+        try:
+            yield waited
+        finally:
+            queue.release(priority)
+
+    def status(self) -> Dict[str, Any]:
+        return {name: stage.status() for name, stage in self.stages.items()}
+
+
+pipeline_scheduler = PipelineScheduler()
@@ -0,0 +1,358 @@
+# backend/profiling.py
+import asyncio
+import contextvars
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.sqlite_cache import DATA_DIR
+
+log = logging.getLogger("salessense.backend")
+
+PROFILE_DIR = DATA_DIR / "profiles"
+PROFILE_MODES = ("cprofile", "sample")
+# Sampling period; 5 ms is 200 stacks a second per profiled thread
+SAMPLE_INTERVAL_MS = float(os.getenv("SALESSENSE_PROFILE_SAMPLE_MS", "5"))
+# Process-wide sampling runs at most this long, whatever was asked for
+MAX_SAMPLE_SECONDS = float(os.getenv("SALESSENSE_PROFILE_MAX_SECONDS", "300"))
+# Saved profiles kept on disk; older ones are deleted as new ones are written
+PROFILE_KEEP = int(os.getenv("SALESSENSE_PROFILE_KEEP", "50"))
+# cProfile call chains deeper than this are cut off when turned into stacks
+MAX_STACK_DEPTH = 64
+
+# The profile of the request this code runs for, if it asked for one. Threads
+# started with asyncio.to_thread copy it; nothing else is set when it is None.
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("profile", default=None)
+_thread_state = threading.local()
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_frame(frame) -> str:
+    """A thread's current stack as one collapsed-stack line key, outermost frame first."""
+    names = []
+    while frame is not None:
+        names.append(frame_label(frame.f_code).replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def collapse_pstats(stats: pstats.Stats) -> Counter:
+    """Approximate collapsed stacks (in microseconds) from cProfile's caller/callee totals.
+
+    cProfile keeps one edge per caller and callee, not whole stacks, so a
+    function's own time is split between its callers in proportion to the
+    time each call path spent in it.
+    """
+    entries = stats.stats
+    children: Dict[tuple, List[tuple]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            children.setdefault(caller, []).append(func)
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    stacks: Counter = Counter()
+
+    def label(func) -> str:
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+    def walk(func, path: List[str], share: float, seen: frozenset):
+        _, _, own, total, _ = entries[func]
+        path = path + [label(func)]
+        if own * share > 0:
+            stacks[";".join(path)] += int(own * share * 1_000_000)
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for child in children.get(func, ()):
+            if child in seen:
+                continue
+            child_total = entries[child][3]
+            # Time this function's calls spent in the child, scaled to this path's share
+            via = entries[child][4][func][3] * share
+            # Paths under a microsecond are dropped, which keeps the expansion small
+            if child_total > 0 and via >= 1e-6:
+                walk(child, path, via / child_total, seen | {child})
+
+    for root in roots:
+        walk(root, [], 1.0, frozenset({root}))
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common() if count > 0)
+
+
+class StackSampler:
+    """Samples thread stacks from a background thread into collapsed-stack counts.
+
+    `wanted(ident)` picks the threads to record; None records every thread.
+    Nothing runs in the profiled threads themselves.
+    """
+
+    def __init__(self, wanted: Optional[Callable[[int], bool]] = None,
+                 interval_ms: float = SAMPLE_INTERVAL_MS, thread_names: bool = False):
+        self.wanted = wanted
+        self.interval = max(interval_ms, 0.5) / 1000
+        self.thread_names = thread_names
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, seconds: Optional[float] = None, on_done: Optional[Callable[[], None]] = None):
+        self._thread = threading.Thread(target=self._run, args=(seconds, on_done), name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self, seconds: Optional[float], on_done: Optional[Callable[[], None]]):
+        deadline = time.monotonic() + seconds if seconds else None
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()} if self.thread_names else {}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.wanted is not None and not self.wanted(ident)):
+                    continue
+                stack = collapse_frame(frame)
+                if self.thread_names:
+                    stack = f"{names.get(ident, ident)};{stack}"
+                self.stacks[stack] += 1
+            self.samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        if on_done is not None:
+            on_done()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+class RequestProfile:
+    """One request's profile, covering its coroutine and the threads it hands work to.
+
+    "sample" records stacks of those threads, and of the event loop while the
+    request's task is the one running on it. "cprofile" runs cProfile in those
+    threads instead (not on the event loop, where cProfile can't tell
+    coroutines apart). Only one thread at a time can hold cProfile, so threads
+    that start while another holds it, such as agents running in parallel, are
+    sampled and their samples counted as SAMPLE_INTERVAL_MS of wall time each.
+    """
+
+    def __init__(self, mode: str, label: str):
+        self.mode = mode
+        self.label = label
+        self.profile_id = new_profile_id(mode)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        # Threads currently running this request's work and being sampled
+        self._threads: Counter = Counter()
+        self._profiles: List[cProfile.Profile] = []
+        self.sampled_threads = 0
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._loop_thread = threading.get_ident()
+        self.sampler = StackSampler(self._wanted)
+        if mode == "sample":
+            self.sampler.start()
+
+    def _wanted(self, ident: int) -> bool:
+        if ident == self._loop_thread:
+            return self.mode == "sample" and asyncio.current_task(self._loop) is self._task
+        return self._threads[ident] > 0
+
+    def _start_cprofile(self) -> Optional[cProfile.Profile]:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            return profiler
+        except ValueError:
+            # Another thread (or another profiled request) holds the interpreter's profiler
+            return None
+
+    def run_in_thread(self, fn: Callable, *args, **kwargs):
+        """Run fn in this (worker) thread with the profile attached."""
+        if getattr(_thread_state, "profiling", False):
+            return fn(*args, **kwargs)
+        _thread_state.profiling = True
+        token = _current.set(self)
+        ident = threading.get_ident()
+        profiler = self._start_cprofile() if self.mode == "cprofile" else None
+        if profiler is None:
+            with self._lock:
+                self._threads[ident] += 1
+                self.sampled_threads += 1
+                if not self.sampler.running:
+                    self.sampler.start()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    self._profiles.append(profiler)
+            else:
+                with self._lock:
+                    self._threads[ident] -= 1
+            _current.reset(token)
+            _thread_state.profiling = False
+
+    def finish(self, concurrent: int = 0) -> Dict[str, Any]:
+        """Stop profiling and write the profile to PROFILE_DIR."""
+        self.sampler.stop()
+        pstats_data = None
+        if self.mode == "sample":
+            stacks, unit = self.sampler.stacks, "samples"
+        else:
+            with self._lock:
+                profiles = list(self._profiles)
+            stacks, unit = Counter(), "microseconds"
+            if profiles:
+                pstats_data = pstats.Stats(*profiles)
+                stacks = collapse_pstats(pstats_data)
+            sample_us = int(self.sampler.interval * 1_000_000)
+            for stack, count in self.sampler.stacks.items():
+                stacks[f"[sampled];{stack}"] += count * sample_us
+        meta = {
+            "profile_id": self.profile_id, "mode": self.mode, "label": self.label, "worker_pid": os.getpid(),
+            "started_at": self.started, "seconds": round(time.time() - self.started, 3), "unit": unit,
+            "samples": self.sampler.samples, "stacks": len(stacks), "sampled_threads": self.sampled_threads,
+            "cprofiled_calls": len(self._profiles),
+            # Other analyses in the worker at the end; they share the CPU with this one
+            "concurrent_requests": concurrent,
+        }
+        save_profile(meta, stacks, pstats_data)
+        return meta
+
+
+def bind(fn: Callable) -> Callable:
+    """fn itself, or, while a request is being profiled, fn wrapped to profile the thread it runs in.
+
+    Use it when handing work to a thread pool other than the event loop's
+    default executor, which does this for every asyncio.to_thread call.
+    """
+    profile = _current.get()
+    if profile is None:
+        return fn
+    return functools.partial(profile.run_in_thread, fn)
+
+
+class ProfiledThreadPoolExecutor(ThreadPoolExecutor):
+    """A ThreadPoolExecutor whose tasks are profiled when submitted by a profiled request.
+
+    Installed as the event loop's default executor, so asyncio.to_thread work
+    is covered. Unprofiled submits cost one context variable lookup.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(bind(fn), *args, **kwargs)
+
+
+@asynccontextmanager
+async def profile_request(mode: Optional[str], label: str, concurrent: Callable[[], int] = lambda: 0):
+    """Profile the body when mode is one of PROFILE_MODES; yields the RequestProfile (or None)."""
+    if mode is None:
+        yield None
+        return
+    profile = RequestProfile(mode, label)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+        meta = await asyncio.to_thread(profile.finish, concurrent())
+        log.info(f"🔬 Profiled {label} ({mode}, {meta['seconds']:.1f}s) as {profile.profile_id}")
+
+
+def new_profile_id(mode: str) -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{mode}-{uuid.uuid4().hex[:6]}"
+
+
+def save_profile(meta: Dict[str, Any], stacks: Counter, pstats_data: Optional[pstats.Stats] = None):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    base = PROFILE_DIR / meta["profile_id"]
+    Path(f"{base}.collapsed").write_text(format_collapsed(stacks), encoding="utf-8")
+    if pstats_data is not None:
+        pstats_data.dump_stats(f"{base}.pstats")
+    Path(f"{base}.json").write_text(json.dumps(meta), encoding="utf-8")
+    for old in sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)[:-PROFILE_KEEP]:
+        for path in PROFILE_DIR.glob(f"{old.stem}.*"):
+            path.unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    if not PROFILE_DIR.exists():
+        return []
+    metas = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)[:limit]
+    return [json.loads(p.read_text(encoding="utf-8")) for p in metas]
+
+
+def profile_file(profile_id: str, fmt: str = "collapsed") -> Optional[Path]:
+    """Path of a saved profile in the given format (collapsed or pstats), if it exists."""
+    if fmt not in ("collapsed", "pstats") or not profile_id.replace("-", "").isalnum():
+        return None
+    path = PROFILE_DIR / f"{profile_id}.{fmt}"
+    return path if path.exists() else None
+
+
+class ProcessSampler:
+    """Process-wide stack sampling for a fixed time, started and stopped from the admin API.
+
+    Covers every thread of the worker it runs in. Each gunicorn worker has its
+    own, so the admin request samples whichever worker served it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self._meta: Dict[str, Any] = {}
+
+    def start(self, seconds: float, interval_ms: float = SAMPLE_INTERVAL_MS) -> Dict[str, Any]:
+        seconds = min(max(seconds, 0.1), MAX_SAMPLE_SECONDS)
+        with self._lock:
+            if self._sampler is not None and self._sampler.running:
+                raise RuntimeError(f"Already sampling as {self._meta['profile_id']}")
+            self._meta = {"profile_id": new_profile_id("process"), "mode": "process", "label": "process",
+                          "worker_pid": os.getpid(), "started_at": time.time(), "requested_seconds": seconds,
+                          "interval_ms": interval_ms}
+            self._sampler = StackSampler(None, interval_ms, thread_names=True)
+            self._sampler.start(seconds, on_done=self._save)
+            return dict(self._meta)
+
+    def _save(self):
+        sampler, meta = self._sampler, self._meta
+        meta.update(seconds=round(time.time() - meta["started_at"], 3), unit="samples",
+                    samples=sampler.samples, stacks=len(sampler.stacks))
+        save_profile(meta, sampler.stacks)
+        log.info(f"🔬 Process sampling finished: {meta['profile_id']} ({sampler.samples} samples)")
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._sampler is None or not self._sampler.running:
+                raise RuntimeError("Not sampling")
+            sampler, meta = self._sampler, self._meta
+        sampler.stop()
+        return dict(meta)
+
+    def status(self) -> Dict[str, Any]:
+        sampler = self._sampler
+        running = sampler is not None and sampler.running
+        return {"running": running, "worker_pid": os.getpid(),
+                **({"profile_id": self._meta["profile_id"], "samples": sampler.samples} if running else {})}
@@ -0,0 +1,180 @@
+# backend/rate_limiter.py
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Highest priority first; interactive uploads always go ahead of batch jobs
+PRIORITIES = ("interactive", "batch")
+
+# Budgets are per deployment; each worker process enforces its share
+WORKER_COUNT = max(1, int(os.getenv("SALESSENSE_WORKERS", "1")))
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `per_minute`, holding at least `min_capacity`.
+
+    min_capacity matters when a worker's share is below one call per minute
+    (e.g. 2 RPM over 4 workers): a bucket that can never hold a whole call
+    would block forever, so it holds one and refills at the smaller rate.
+    """
+
+    def __init__(self, per_minute: float, min_capacity: float = 0.0):
+        self.per_minute = float(per_minute)
+        self.capacity = max(float(per_minute), float(min_capacity)) if per_minute > 0 else 0.0
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.last = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self, now: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + (now - self.last) * self.rate)
+        self.last = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.unlimited or self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class _Ticket:
+    __slots__ = ("tenant", "priority", "tokens", "enqueued_at")
+
+    def __init__(self, tenant: str, priority: str, tokens: int):
+        self.tenant = tenant
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class ProviderLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one external provider.
+
+    Waiting calls are served strictly by priority class, and round-robin across
+    tenants inside a class so one team's backlog can't starve another's uploads.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float = 0):
+        self.name = name
+        self.requests = _Bucket(rpm, min_capacity=1)
+        self.tokens = _Bucket(tpm)
+        self._cond = threading.Condition()
+        # priority -> tenant -> FIFO of tickets; dict order is the round-robin order
+        self._queues: Dict[str, Dict[str, Deque[_Ticket]]] = {p: {} for p in PRIORITIES}
+        self.granted = 0
+        self.total_wait_seconds = 0.0
+
+    def _head(self) -> Optional[_Ticket]:
+        for priority in PRIORITIES:
+            for tickets in self._queues[priority].values():
+                return tickets[0]
+        return None
+
+    def _dequeue(self, ticket: _Ticket):
+        tenants = self._queues[ticket.priority]
+        tickets = tenants.pop(ticket.tenant)
+        tickets.popleft()
+        if tickets:
+            # Re-insert at the back so the next tenant in line goes first
+            tenants[ticket.tenant] = tickets
+
+    def acquire(self, tenant: str = "default", priority: str = "interactive", tokens: int = 0) -> float:
+        """Block until the call fits the budget; returns seconds spent waiting."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}")
+        if not self.tokens.unlimited:
+            tokens = min(tokens, int(self.tokens.capacity))
+        ticket = _Ticket(tenant, priority, tokens)
+        with self._cond:
+            self._queues[priority].setdefault(tenant, deque()).append(ticket)
+            while True:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                if self._head() is ticket:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait == 0:
+                        if not self.requests.unlimited:
+                            self.requests.level -= 1
+                        if not self.tokens.unlimited:
+                            self.tokens.level -= tokens
+                        self._dequeue(ticket)
+                        waited = now - ticket.enqueued_at
+                        self.granted += 1
+                        self.total_wait_seconds += waited
+                        self._cond.notify_all()
+                        return waited
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the provider reports real usage."""
+        if self.tokens.unlimited or actual_tokens <= 0:
+            return
+        with self._cond:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            queues = {}
+            ahead_requests, ahead_tokens = 0, 0
+            for priority in PRIORITIES:
+                tenants = self._queues[priority]
+                ahead_requests += sum(len(t) for t in tenants.values())
+                ahead_tokens += sum(ticket.tokens for t in tenants.values() for ticket in t)
+                # A new call in this class waits behind everything at this priority or higher
+                wait = max(
+                    0.0 if self.requests.unlimited else (ahead_requests + 1 - self.requests.level) / self.requests.rate,
+                    0.0 if self.tokens.unlimited else (ahead_tokens - self.tokens.level) / self.tokens.rate,
+                )
+                queues[priority] = {
+                    "queue_depth": sum(len(t) for t in tenants.values()),
+                    "by_tenant": {tenant: len(t) for tenant, t in tenants.items()},
+                    "estimated_wait_seconds": round(max(0.0, wait), 2),
+                }
+            return {
+                "rpm_limit": self.requests.per_minute or None,
+                "tpm_limit": self.tokens.per_minute or None,
+                "requests_available": None if self.requests.unlimited else int(self.requests.level),
+                "tokens_available": None if self.tokens.unlimited else int(self.tokens.level),
+                "granted": self.granted,
+                "avg_wait_seconds": round(self.total_wait_seconds / self.granted, 3) if self.granted else 0.0,
+                "queues": queues,
+            }
+
+
+def _limit(name: str, default: float) -> float:
+    return float(os.getenv(name, default)) / WORKER_COUNT
+
+
+# One limiter per external provider; 0 disables a budget
+rate_limits: Dict[str, ProviderLimiter] = {
+    "openai": ProviderLimiter(
+        "openai",
+        rpm=_limit("SALESSENSE_OPENAI_RPM", 500),
+        tpm=_limit("SALESSENSE_OPENAI_TPM", 200000),
+    ),
+    "assemblyai": ProviderLimiter(
+        "assemblyai",
+        rpm=_limit("SALESSENSE_ASSEMBLYAI_RPM", 60),
+    ),
+}
+
+
+def estimate_tokens(*texts: str, completion_tokens: int = 0) -> int:
+    """Rough prompt size (~4 chars per token) plus the completion budget."""
+    return sum(len(t) for t in texts) // 4 + completion_tokens
+
+
+def get_scheduler_status() -> Dict[str, Any]:
+    return {name: limiter.status() for name, limiter in rate_limits.items()}
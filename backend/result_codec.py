@@ -0,0 +1,119 @@
+# backend/result_codec.py
+import json
+import os
+import zlib
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+import msgpack
+
+# Payloads at least this big are zlib-compressed (the nested objection/quote
+# dicts repeat the same keys, which compresses well)
+COMPRESS_MIN_BYTES = int(os.getenv("SALESSENSE_CODEC_COMPRESS_MIN_BYTES", "512"))
+ZLIB_LEVEL = int(os.getenv("SALESSENSE_CODEC_ZLIB_LEVEL", "1"))
+
+# First byte of every encoded value: format in the low bits, compression flag on top
+FORMAT_PACKED = 0x01   # any msgpack-able value
+FORMAT_RESULT = 0x02   # AnalysisResult, fields stored by position
+COMPRESSED = 0x10
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class AnalysisResult:
+    """One call analysis as returned by the agents plus the pipeline's metadata.
+
+    Nested values stay plain dicts/lists (their shape comes from the LLM);
+    keys not listed here are kept in `extra` so a round trip never loses data.
+    Fields that were never set are left out again by `to_dict`.
+    """
+    summary: str = ""
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    strengths: List[Any] = field(default_factory=list)
+    improvement_areas: List[Any] = field(default_factory=list)
+    customer_objections: List[Any] = field(default_factory=list)
+    next_steps: List[Any] = field(default_factory=list)
+    coaching_tips: List[Any] = field(default_factory=list)
+    notable_quotes: List[Any] = field(default_factory=list)
+    routing: Dict[str, Any] = field(default_factory=dict)
+    agents: Dict[str, Any] = field(default_factory=dict)
+    processing_time: Optional[str] = None
+    agents_used: Optional[str] = None
+    transcription_method: Optional[str] = None
+    transcript_source: Optional[Dict[str, Any]] = None
+    cached: Optional[bool] = None
+    analysis_id: Optional[str] = None
+    job_id: Optional[str] = None
+    error: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+    # Names of the fields that were actually present, in their original order
+    present: List[str] = field(default_factory=list, repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnalysisResult":
+        known = {k: v for k, v in data.items() if k in RESULT_FIELDS}
+        extra = {k: v for k, v in data.items() if k not in RESULT_FIELDS}
+        return cls(**known, extra=extra, present=list(data))
+
+    def to_dict(self) -> Dict[str, Any]:
+        names = self.present or [f for f in RESULT_FIELDS if getattr(self, f) is not None] + list(self.extra)
+        return {name: self.extra[name] if name in self.extra else getattr(self, name) for name in names}
+
+
+RESULT_FIELDS = tuple(f.name for f in fields(AnalysisResult) if f.name not in ("extra", "present"))
+_FIELD_INDEX = {name: i for i, name in enumerate(RESULT_FIELDS)}
+
+
+def is_analysis_result(value: Any) -> bool:
+    return isinstance(value, dict) and "summary" in value and "metrics" in value
+
+
+def _result_to_row(result: AnalysisResult) -> list:
+    # [version, key order, values of present known fields..., extra]; key order is
+    # field indexes (extras as their name) so to_dict restores the exact layout
+    present = result.present or list(result.to_dict())
+    order = [_FIELD_INDEX.get(name, name) for name in present]
+    values = [getattr(result, name) for name in present if name in _FIELD_INDEX]
+    return [SCHEMA_VERSION, order, *values, result.extra]
+
+
+def _row_to_result(row: list) -> AnalysisResult:
+    _version, order, *values, extra = row
+    names = [RESULT_FIELDS[i] if isinstance(i, int) else i for i in order]
+    known = dict(zip((n for n in names if n in _FIELD_INDEX), values))
+    return AnalysisResult(**known, extra=extra, present=names)
+
+
+def pack(value: Any) -> bytes:
+    """Encode a cache entry, job result or stored analysis for SQLite/memory."""
+    if isinstance(value, AnalysisResult):
+        fmt, payload = FORMAT_RESULT, _result_to_row(value)
+    elif is_analysis_result(value):
+        fmt, payload = FORMAT_RESULT, _result_to_row(AnalysisResult.from_dict(value))
+    else:
+        fmt, payload = FORMAT_PACKED, value
+    body = msgpack.packb(payload, use_bin_type=True)
+    if len(body) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(body, ZLIB_LEVEL)
+        if len(compressed) < len(body):
+            return bytes([fmt | COMPRESSED]) + compressed
+    return bytes([fmt]) + body
+
+
+def unpack(blob: Any) -> Any:
+    """Decode `pack` output; rows written before the codec existed are JSON text."""
+    if blob is None:
+        return None
+    if isinstance(blob, str):
+        return json.loads(blob)
+    blob = bytes(blob)
+    header = blob[0]
+    if header in (0x7B, 0x5B):  # '{' or '[': JSON stored as a blob
+        return json.loads(blob)
+    body = blob[1:]
+    if header & COMPRESSED:
+        body = zlib.decompress(body)
+    payload = msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if header & 0x0F == FORMAT_RESULT:
+        return _row_to_result(payload).to_dict()
+    return payload
@@ -0,0 +1,247 @@
+# backend/results_store.py
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.result_codec import pack, unpack
+from backend.sqlite_cache import DATA_DIR
+
+# Rep name from "Jane Doe (Sales Rep), John Roe (Prospect)" style participant lists
+REP_ROLE_PATTERN = re.compile(
+    r"\s*([^,(]+?)\s*\(([^)]*\b(?:rep|sales|account exec\w*|ae|sdr|bdr)\b[^)]*)\)",
+    re.IGNORECASE,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    analysis_id TEXT PRIMARY KEY,
+    rep TEXT NOT NULL,
+    tenant TEXT,
+    filename TEXT,
+    created_at REAL NOT NULL,
+    week TEXT NOT NULL,
+    participants TEXT,
+    details TEXT,
+    call_types TEXT,
+    summary TEXT,
+    transcript TEXT,
+    result BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_calls_rep_week ON calls(rep, week);
+
+CREATE TABLE IF NOT EXISTS call_metrics (
+    analysis_id TEXT PRIMARY KEY,
+    rep TEXT NOT NULL,
+    week TEXT NOT NULL,
+    overall_sentiment TEXT,
+    rep_talk_ratio_percent REAL,
+    customer_talk_ratio_percent REAL,
+    questions_asked_by_rep INTEGER,
+    objections_detected INTEGER,
+    followups_committed INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_call_metrics_rep_week ON call_metrics(rep, week);
+
+CREATE TABLE IF NOT EXISTS objections (
+    analysis_id TEXT NOT NULL,
+    rep TEXT NOT NULL,
+    week TEXT NOT NULL,
+    objection TEXT,
+    moment_quote TEXT,
+    rep_response_quality TEXT,
+    suggested_response TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_objections_analysis ON objections(analysis_id);
+
+CREATE TABLE IF NOT EXISTS next_steps (
+    analysis_id TEXT NOT NULL,
+    rep TEXT NOT NULL,
+    week TEXT NOT NULL,
+    owner TEXT,
+    action TEXT,
+    due_by TEXT,
+    success_criteria TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_next_steps_analysis ON next_steps(analysis_id);
+
+CREATE TABLE IF NOT EXISTS notable_quotes (
+    analysis_id TEXT NOT NULL,
+    rep TEXT NOT NULL,
+    week TEXT NOT NULL,
+    speaker TEXT,
+    quote TEXT,
+    why_it_matters TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_notable_quotes_analysis ON notable_quotes(analysis_id);
+
+CREATE TABLE IF NOT EXISTS rep_weekly_aggregates (
+    rep TEXT NOT NULL,
+    week TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    avg_rep_talk_ratio_percent REAL,
+    avg_customer_talk_ratio_percent REAL,
+    avg_questions_asked REAL,
+    objections_total INTEGER,
+    objection_rate REAL,
+    followups_total INTEGER,
+    sentiment_positive REAL,
+    sentiment_neutral REAL,
+    sentiment_negative REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (rep, week)
+);
+"""
+
+
+def week_start(timestamp: float) -> str:
+    """ISO week bucket (Monday's date) for a unix timestamp."""
+    day = datetime.fromtimestamp(timestamp).date()
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def detect_rep(participants: str) -> str:
+    match = REP_ROLE_PATTERN.match(participants or "") or REP_ROLE_PATTERN.search(participants or "")
+    return match.group(1).strip() if match else "Unknown"
+
+
+def call_rep(rep: Optional[str], participants: str) -> str:
+    """The rep a call is filed under: the one given, else the one detected from the participants."""
+    return (rep or "").strip() or detect_rep(participants)
+
+
+def _dicts(items: Any) -> List[Dict[str, Any]]:
+    return [i for i in items if isinstance(i, dict)] if isinstance(items, list) else []
+
+
+class ResultsStore:
+    """Persistent analysis results, flattened into per-call tables for cross-call analytics."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or DATA_DIR / "results.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Columns added after the first release of this table
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(calls)")}
+            for column, kind in (("audio_sha", "TEXT"),):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE calls ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_audio_rep ON calls(audio_sha, rep)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def save_analysis(self, analysis_id: str, result: Dict[str, Any], *, transcript: str = "",
+                      participants: str = "", details: str = "", call_types: str = "",
+                      filename: str = "", tenant: str = "default", rep: Optional[str] = None,
+                      created_at: Optional[float] = None, audio_sha: Optional[str] = None) -> Dict[str, Any]:
+        """Store one analysis and its flattened metrics/objections/next steps/quotes.
+
+        A recording is one call per rep: an earlier analysis with the same
+        audio_sha and rep (a re-upload, a context edit, an ingest
+        pre-analysis) is replaced, and returned under "replaced" as
+        (analysis_id, week) pairs so callers can refresh its rollup and index.
+        """
+        created_at = created_at or time.time()
+        rep = call_rep(rep, participants)
+        week = week_start(created_at)
+        metrics = result.get("metrics") or {}
+
+        with self._connect() as conn:
+            replaced = []
+            if audio_sha:
+                replaced = [(r["analysis_id"], r["week"]) for r in conn.execute(
+                    "SELECT analysis_id, week FROM calls WHERE audio_sha = ? AND rep = ? AND analysis_id != ?",
+                    (audio_sha, rep, analysis_id),
+                )]
+            for table in ("calls", "call_metrics", "objections", "next_steps", "notable_quotes"):
+                conn.executemany(f"DELETE FROM {table} WHERE analysis_id = ?",
+                                 [(old_id,) for old_id, _ in replaced] + [(analysis_id,)])
+            conn.execute(
+                "INSERT INTO calls (analysis_id, rep, tenant, filename, created_at, week,"
+                " participants, details, call_types, summary, transcript, result, audio_sha)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (analysis_id, rep, tenant, filename, created_at, week, participants, details,
+                 call_types, result.get("summary", ""), transcript, pack(result), audio_sha),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO call_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (analysis_id, rep, week,
+                 str(metrics.get("overall_sentiment", "neutral")).lower(),
+                 metrics.get("rep_talk_ratio_percent"),
+                 metrics.get("customer_talk_ratio_percent"),
+                 metrics.get("questions_asked_by_rep"),
+                 metrics.get("objections_detected"),
+                 metrics.get("followups_committed")),
+            )
+            conn.executemany(
+                "INSERT INTO objections VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(analysis_id, rep, week, o.get("objection"), o.get("moment_quote", o.get("moment")),
+                  o.get("rep_response_quality"), o.get("suggested_response"))
+                 for o in _dicts(result.get("customer_objections"))],
+            )
+            conn.executemany(
+                "INSERT INTO next_steps VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(analysis_id, rep, week, n.get("owner"), n.get("action", n.get("step")),
+                  n.get("due_by"), n.get("success_criteria"))
+                 for n in _dicts(result.get("next_steps"))],
+            )
+            conn.executemany(
+                "INSERT INTO notable_quotes VALUES (?, ?, ?, ?, ?, ?)",
+                [(analysis_id, rep, week, q.get("speaker"), q.get("quote", q.get("text")), q.get("why_it_matters"))
+                 for q in _dicts(result.get("notable_quotes"))],
+            )
+        return {"rep": rep, "week": week, "replaced": replaced}
+
+    def get_call(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM calls WHERE analysis_id = ?", (analysis_id,)).fetchone()
+        if row is None:
+            return None
+        call = dict(row)
+        call["result"] = unpack(call["result"]) if call["result"] else {}
+        return call
+
+    def iter_calls(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Every stored call, oldest first, without loading the whole table at once."""
+        last = 0.0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT analysis_id, rep, created_at, transcript, result FROM calls"
+                    " WHERE created_at > ? ORDER BY created_at LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                call = dict(row)
+                call["result"] = unpack(call["result"]) if call["result"] else {}
+                yield call
+            last = rows[-1]["created_at"]
+
+    def list_reps(self) -> List[str]:
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute("SELECT DISTINCT rep FROM calls ORDER BY rep")]
+
+    def rep_weekly(self, rep: Optional[str] = None, weeks: int = 12) -> List[Dict[str, Any]]:
+        """Precomputed weekly rollups (see backend.analytics), newest weeks first."""
+        conditions, params = [], []
+        if rep:
+            conditions.append("rep = ?")
+            params.append(rep)
+        if weeks:
+            conditions.append("week >= ?")
+            params.append(week_start(time.time() - weeks * 7 * 86400))
+        query = "SELECT * FROM rep_weekly_aggregates"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY week DESC, rep"
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(query, params)]
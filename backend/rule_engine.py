@@ -0,0 +1,271 @@
+# backend/rule_engine.py
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from backend.multi_agent_system import normalize_analysis, normalize_coaching
+
+# Rule-based stand-in for the three agents, used in degraded mode (LLM failing,
+# slow or over quota). CPU only: each lexicon is one compiled regex run once over
+# the whole transcript, and matches are counted per utterance with numpy.
+
+UTTERANCE_LINE = re.compile(r"^\s*(Speaker [^:]{1,20}|[^:\n]{1,40}):\s*(.*\S)\s*$", re.MULTILINE)
+SENTENCE = re.compile(r"[^.!?]+[.!?]*")
+
+
+def _lexicon(*phrases: str) -> "re.Pattern[str]":
+    return re.compile(r"\b(?:" + "|".join(phrases) + r")", re.IGNORECASE)
+
+
+OBJECTION_LEXICONS = {
+    "price": _lexicon(r"too expensive", r"expensive", r"pric(?:e|es|ing)\b", r"costs?\b", r"costly", r"budget",
+                      r"discount", r"cheaper", r"afford", r"out of (?:our|my) range", r"\broi\b"),
+    "timing": _lexicon(r"not (?:right )?now", r"next (?:quarter|year|month)", r"bad time", r"timing",
+                       r"too busy", r"revisit", r"circle back", r"not a priority", r"later this year",
+                       r"hold off", r"wait (?:until|till)"),
+    "integration": _lexicon(r"integrat\w*", r"\bapi\b", r"compatib\w*", r"works? with (?:our|the)", r"salesforce",
+                            r"hubspot", r"\bcrm\b", r"migrat\w*", r"connects? to", r"existing (?:system|tools?|stack)"),
+    "security": _lexicon(r"secur\w*", r"complian\w*", r"\bgdpr\b", r"soc ?2", r"\bhipaa\b", r"privacy",
+                         r"encrypt\w*", r"data protection", r"\bsso\b", r"legal (?:review|team)"),
+}
+QUESTION_MARK = re.compile(r"\?")
+# Questions the transcript left without a question mark
+INTERROGATIVE = re.compile(r"(?:^|[.!]\s+)(?:what|how|why|when|where|who|which|could you|can you|would you|"
+                           r"do you|does|are you|is there|have you|tell me about)\b", re.IGNORECASE)
+REP_COMMITMENT = _lexicon(r"(?:i(?:'ll| will)|we(?:'ll| will)|let me|i can|i'm going to|we're going to)\s+"
+                          r"(?:\w+\s+){0,2}?(?:send|follow[\s-]?up|share|email|get back|schedule|set up|book|"
+                          r"loop in|put together|circle back|call you)")
+PROSPECT_COMMITMENT = _lexicon(r"(?:i(?:'ll| will)|we(?:'ll| will)|let me)\s+(?:\w+\s+){0,2}?(?:review|discuss|"
+                               r"check|talk to|run it by|get back|look (?:at|into)|sign|confirm)")
+DUE_BY = _lexicon(r"today", r"tomorrow", r"tonight", r"this week", r"next week", r"end of (?:the )?(?:day|week|month)",
+                  r"(?:by|on) (?:monday|tuesday|wednesday|thursday|friday)", r"in (?:a|two|three|\d+) (?:days?|weeks?)")
+POSITIVE = _lexicon(r"great", r"love", r"perfect", r"excellent", r"awesome", r"excited", r"sounds good",
+                    r"makes sense", r"helpful", r"interested", r"impressive", r"exactly", r"definitely",
+                    r"thank(?:s| you)")
+NEGATIVE = _lexicon(r"concern(?:ed|s)?\b", r"worried", r"worry", r"problem", r"issue", r"frustrat\w*",
+                    r"unfortunately", r"not sure", r"disappoint\w*", r"(?:don't|do not) think", r"confusing",
+                    r"difficult", r"hesitant", r"skeptical", r"not interested")
+# Things sales reps say; picks the rep when the transcript only has "Speaker A/B"
+REP_CUES = _lexicon(r"our (?:product|platform|solution|team|pricing|customers)", r"we offer", r"let me show",
+                    r"calling from", r"reaching out", r"my name is", r"demo", r"free trial")
+
+FEATURES = {
+    **{f"objection_{name}": pattern for name, pattern in OBJECTION_LEXICONS.items()},
+    "question_marks": QUESTION_MARK,
+    "interrogatives": INTERROGATIVE,
+    "rep_commitments": REP_COMMITMENT,
+    "prospect_commitments": PROSPECT_COMMITMENT,
+    "positive": POSITIVE,
+    "negative": NEGATIVE,
+    "rep_cues": REP_CUES,
+}
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+SUGGESTED_RESPONSES = {
+    "price": "Anchor on the cost of the problem they described, then tie the price to those outcomes;"
+             " offer a phased start before any discount.",
+    "timing": "Ask what changes by then and what waiting costs them; agree a dated next step even if the"
+              " decision comes later.",
+    "integration": "Confirm their exact stack, share the matching integration guide and offer a technical call"
+                   " with their evaluator.",
+    "security": "Send the security pack (certifications, data handling) and offer a review with their IT or"
+                " legal team.",
+}
+OBJECTION_DRILLS = {
+    "price": "Role-play three price pushbacks; pass when each answer restates their pain before the number.",
+    "timing": "Practise two 'not now' replies that end with a dated follow-up.",
+    "integration": "List the top five tools customers connect and one proof point for each.",
+    "security": "Rehearse a 60-second security overview and know where the documents live.",
+}
+# Rep share of talk time above which the rep is coached to listen more
+TALK_RATIO_CEILING = 65
+MIN_QUESTIONS = 3
+QUOTE_CHARS = 220
+
+
+def parse_utterances(transcript: str) -> Tuple[List[str], List[str]]:
+    """(speakers, texts) from "Speaker X: text" lines; unlabeled text is one utterance by "Speaker ?"."""
+    speakers, texts = [], []
+    for match in UTTERANCE_LINE.finditer(transcript or ""):
+        speakers.append(match.group(1).strip())
+        texts.append(match.group(2))
+    if not texts and transcript and transcript.strip():
+        speakers, texts = ["Speaker ?"], [transcript.strip()]
+    return speakers, texts
+
+
+def feature_counts(texts: List[str]) -> np.ndarray:
+    """Matches of every lexicon in every utterance, as an (utterances x FEATURES) matrix."""
+    counts = np.zeros((len(texts), len(FEATURES)), dtype=np.int32)
+    if not texts:
+        return counts
+    joined = "\n".join(texts)
+    # Offset where each utterance starts in the joined text
+    starts = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+    for column, pattern in enumerate(FEATURES.values()):
+        positions = [m.start() for m in pattern.finditer(joined)]
+        if positions:
+            rows = np.searchsorted(starts, positions, side="right") - 1
+            counts[:, column] = np.bincount(rows, minlength=len(texts))
+    return counts
+
+
+def _quote(text: str) -> str:
+    return text if len(text) <= QUOTE_CHARS else text[:QUOTE_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+def _sentence_with(text: str, pattern: "re.Pattern[str]") -> Optional[str]:
+    for sentence in SENTENCE.findall(text):
+        if pattern.search(sentence):
+            return sentence.strip()
+    return None
+
+
+def pick_rep(speakers: List[str], counts: np.ndarray, words: np.ndarray, participants: str = "") -> str:
+    labels = sorted(set(speakers), key=speakers.index)
+    if len(labels) == 1:
+        return labels[0]
+    speaker_ids = np.array([labels.index(s) for s in speakers])
+    per_speaker = np.zeros((len(labels), counts.shape[1]), dtype=np.int64)
+    np.add.at(per_speaker, speaker_ids, counts)
+    # A named speaker marked "(Sales Rep)" in the participants wins outright
+    for label in labels:
+        name = label.split()[0].lower()
+        if name != "speaker" and re.search(rf"\b{re.escape(name)}\b[^,]*\((?:sales rep|rep|ae|account executive)\)",
+                                           participants, re.IGNORECASE):
+            return label
+    score = (per_speaker[:, FEATURE_INDEX["rep_cues"]] * 2
+             + per_speaker[:, FEATURE_INDEX["question_marks"]]
+             + per_speaker[:, FEATURE_INDEX["rep_commitments"]] * 2).astype(float)
+    score[0] += 1.5  # reps usually open the call
+    return labels[int(np.argmax(score))]
+
+
+def analyze(transcript: str, context: Union[str, Dict[str, str]] = "", reason: str = "") -> Dict[str, Any]:
+    """Summary, analysis and coaching outputs in the agents' shapes, from lexicons alone."""
+    participants = context.get("participants", "") if isinstance(context, dict) else str(context or "")
+    speakers, texts = parse_utterances(transcript)
+    counts = feature_counts(texts)
+    words = np.array([len(t.split()) for t in texts], dtype=np.int64)
+    if not texts:
+        return {"summary": "No speech was found in the transcript.", "analysis": normalize_analysis({}),
+                "coaching": normalize_coaching({})}
+
+    rep = pick_rep(speakers, counts, words, participants)
+    is_rep = np.array([s == rep for s in speakers])
+    column = lambda name: counts[:, FEATURE_INDEX[name]]
+
+    rep_words, total_words = int(words[is_rep].sum()), int(words.sum())
+    rep_pct = round(100 * rep_words / total_words) if total_words else 50
+    # A question mark where the transcript has them, interrogative openings where it doesn't
+    questions = np.where(column("question_marks") > 0, column("question_marks"), column("interrogatives"))
+    rep_questions = int(questions[is_rep].sum())
+
+    # Objections: customer utterances matching a category, first occurrence per category
+    objections = []
+    for name in OBJECTION_LEXICONS:
+        rows = np.flatnonzero(column(f"objection_{name}") * ~is_rep)
+        if not len(rows):
+            continue
+        row = int(rows[0])
+        replies = np.flatnonzero(is_rep[row + 1:])
+        reply = row + 1 + int(replies[0]) if len(replies) else None
+        if reply is None:
+            quality = "weak"
+        elif counts[reply, FEATURE_INDEX[f"objection_{name}"]] and words[reply] >= 15:
+            quality = "good"
+        elif counts[reply, FEATURE_INDEX[f"objection_{name}"]] or questions[reply]:
+            quality = "adequate"
+        else:
+            quality = "weak"
+        objections.append({"objection": name, "moment_quote": _quote(texts[row]),
+                           "rep_response_quality": quality, "suggested_response": SUGGESTED_RESPONSES[name]})
+
+    # Follow-ups: the sentence holding each commitment, with a due date if one is said
+    next_steps = []
+    for pattern, owner, mask in ((REP_COMMITMENT, "rep", is_rep), (PROSPECT_COMMITMENT, "prospect", ~is_rep)):
+        key = "rep_commitments" if owner == "rep" else "prospect_commitments"
+        for row in np.flatnonzero((column(key) > 0) & mask):
+            sentence = _sentence_with(texts[row], pattern) or texts[row]
+            due = DUE_BY.search(sentence)
+            next_steps.append({"owner": owner, "action": _quote(sentence), "due_by": due.group(0) if due else "",
+                               "success_criteria": ""})
+    followups = int(column("rep_commitments")[is_rep].sum())
+
+    # Sentiment from the customer's side of the call
+    tone = (column("positive") - column("negative"))[~is_rep]
+    tone_total = int(tone.sum())
+    sentiment = "positive" if tone_total >= 2 else "negative" if tone_total <= -2 else "neutral"
+    customer_rows = np.flatnonzero(~is_rep)
+    quotes = []
+    if len(customer_rows):
+        for idx in np.argsort(-np.abs(tone), kind="stable")[:3]:
+            if tone[idx] == 0:
+                break
+            row = int(customer_rows[idx])
+            quotes.append({"speaker": "customer", "quote": _quote(texts[row]),
+                           "why_it_matters": "Positive signal" if tone[idx] > 0 else "Concern to address"})
+
+    strengths, improvements = [], []
+    if rep_questions >= MIN_QUESTIONS:
+        strengths.append(f"Asked {rep_questions} questions to understand the customer")
+    else:
+        improvements.append(f"Asked only {rep_questions} questions; more discovery needed")
+    if rep_pct <= TALK_RATIO_CEILING:
+        strengths.append(f"Left room for the customer (rep spoke {rep_pct}% of the time)")
+    else:
+        improvements.append(f"Rep spoke {rep_pct}% of the time; listen more")
+    if followups:
+        strengths.append(f"Committed to {followups} concrete follow-up(s)")
+    else:
+        improvements.append("No clear follow-up committed by the rep")
+    weak = [o["objection"] for o in objections if o["rep_response_quality"] == "weak"]
+    if weak:
+        improvements.append(f"{', '.join(weak).capitalize()} objection(s) left unanswered")
+
+    analysis = normalize_analysis({
+        "metrics": {
+            "overall_sentiment": sentiment,
+            "sentiment_rationale": f"{int(column('positive')[~is_rep].sum())} positive and"
+                                   f" {int(column('negative')[~is_rep].sum())} negative cues from the customer",
+            "rep_talk_ratio_percent": rep_pct,
+            "customer_talk_ratio_percent": 100 - rep_pct,
+            "questions_asked_by_rep": rep_questions,
+            "objections_detected": len(objections),
+            "followups_committed": followups,
+        },
+        "strengths": strengths,
+        "areas_to_improve": improvements,
+        "customer_objections": objections,
+        "notable_quotes": quotes,
+    })
+
+    tips, areas = [], []
+    for name in weak:
+        tips.append({"skill": "Objection Handling", "tip": SUGGESTED_RESPONSES[name]})
+        areas.append({"skill": "Objection Handling", "issue_observed": f"{name.capitalize()} concern not addressed",
+                      "behavior_change": SUGGESTED_RESPONSES[name], "practice_drill": OBJECTION_DRILLS[name],
+                      "ready_to_use_prompts": []})
+    if rep_questions < MIN_QUESTIONS:
+        tips.append({"skill": "Discovery", "tip": "Ask open questions about their current process, its cost and"
+                                                 " who decides before presenting."})
+    if rep_pct > TALK_RATIO_CEILING:
+        tips.append({"skill": "Discovery", "tip": f"You spoke {rep_pct}% of the time; pause after each question"
+                                                 " and aim for under 60%."})
+    if not followups:
+        tips.append({"skill": "Next-Step Control", "tip": "Close with a dated next step and a named owner."})
+    if not tips:
+        tips.append({"skill": "General", "tip": "Keep this structure: discovery questions, handled concerns and a"
+                                               " dated next step."})
+    coaching = normalize_coaching({"improvement_areas": areas, "next_steps": next_steps, "coaching_tips": tips})
+
+    raised = ", ".join(o["objection"] for o in objections)
+    summary = " ".join(filter(None, [
+        "Automated summary from keyword rules" + (f" ({reason})" if reason else "") + ".",
+        f"The call had {len(texts)} turns; the rep spoke {rep_pct}% of the time and asked {rep_questions} questions.",
+        f"The customer raised {raised} concerns." if raised else "No objections were detected.",
+        f"The rep committed to {followups} follow-up(s)." if followups else "No follow-up was committed.",
+        f"Customer tone was {sentiment}.",
+    ]))
+    return {"summary": summary, "analysis": analysis, "coaching": coaching}
@@ -0,0 +1,276 @@
+# backend/search_index.py
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.sqlite_cache import DATA_DIR
+
+log = logging.getLogger("salessense.backend")
+
+# "0" turns the vector index off; full-text search is always on
+SEMANTIC_INDEX = os.getenv("SALESSENSE_SEMANTIC_INDEX", "1") != "0"
+# Optional sentence-transformers model name; the default is a dependency-free hashing embedder
+EMBEDDING_MODEL = os.getenv("SALESSENSE_EMBEDDING_MODEL", "")
+HASH_DIMENSIONS = 256
+# Transcripts are embedded in windows of roughly this many characters
+CHUNK_CHARS = 800
+
+WORD = re.compile(r"[a-z0-9']+")
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS call_text USING fts5(
+    analysis_id UNINDEXED,
+    rep UNINDEXED,
+    kind UNINDEXED,
+    label UNINDEXED,
+    content,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS embeddings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    analysis_id TEXT NOT NULL,
+    rep TEXT,
+    kind TEXT NOT NULL,
+    label TEXT,
+    content TEXT NOT NULL,
+    vector BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_analysis ON embeddings(analysis_id);
+-- Bumped whenever embeddings are deleted, so every worker reloads its matrix
+CREATE TABLE IF NOT EXISTS index_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO index_state VALUES ('generation', 0);
+"""
+
+
+class HashingEmbedder:
+    """Feature-hashed unigram+bigram vectors: no model download, stable across processes."""
+
+    def __init__(self, dimensions: int = HASH_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed(self, texts: List[str]):
+        import numpy as np
+
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = WORD.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+                matrix[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]):
+        import numpy as np
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+def build_embedder():
+    if EMBEDDING_MODEL:
+        try:
+            return SentenceTransformerEmbedder(EMBEDDING_MODEL)
+        except ImportError:
+            log.warning("sentence-transformers not installed, falling back to hashing embedder")
+    return HashingEmbedder()
+
+
+def chunk_transcript(transcript: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """Group speaker turns into windows so each vector covers a stretch of conversation."""
+    chunks, current = [], ""
+    for line in (transcript or "").splitlines():
+        if current and len(current) + len(line) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def _fts_query(query: str) -> str:
+    """Quote each term so user input can't break FTS5 syntax; terms are ANDed."""
+    terms = WORD.findall(query.lower())
+    return " ".join(f'"{t}"' for t in terms)
+
+
+class SearchIndex:
+    """Full-text (FTS5) and optional vector index over stored transcripts, objections and quotes."""
+
+    def __init__(self, db_path: Optional[str] = None, semantic: bool = SEMANTIC_INDEX):
+        self.db_path = str(db_path or DATA_DIR / "search.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.semantic = semantic
+        self._embedder = None
+        # In-memory copy of the embeddings table, topped up from the last loaded row id
+        # and rebuilt when the shared generation changes (rows deleted by any worker)
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._meta: List[Tuple[int, str, str, str, str, str]] = []
+        # kind and rep per row, for filtering without a Python loop
+        self._kinds = None
+        self._reps = None
+        self._last_id = 0
+        self._generation = None
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = build_embedder()
+        return self._embedder
+
+    def _documents(self, transcript: str, objections: Iterable[Any], quotes: Iterable[Any]) -> List[Tuple[str, str, str]]:
+        docs = [("transcript", f"part {i + 1}", chunk) for i, chunk in enumerate(chunk_transcript(transcript))]
+        for o in objections or []:
+            if isinstance(o, dict):
+                text = " ".join(str(o.get(k) or "") for k in ("objection", "moment_quote", "suggested_response")).strip()
+                if text:
+                    docs.append(("objection", str(o.get("objection") or "other"), text))
+        for q in quotes or []:
+            if isinstance(q, dict) and q.get("quote"):
+                docs.append(("quote", str(q.get("speaker") or ""), f"{q['quote']} {q.get('why_it_matters') or ''}".strip()))
+        return docs
+
+    def index_call(self, analysis_id: str, rep: str, transcript: str,
+                   objections: Iterable[Any] = (), quotes: Iterable[Any] = ()) -> int:
+        """Add (or replace) one call; only this call's rows are touched."""
+        docs = self._documents(transcript, objections, quotes)
+        vectors = self.embedder.embed([d[2] for d in docs]) if self.semantic and docs else None
+        with self._connect() as conn:
+            conn.execute("DELETE FROM call_text WHERE analysis_id = ?", (analysis_id,))
+            if conn.execute("DELETE FROM embeddings WHERE analysis_id = ?", (analysis_id,)).rowcount:
+                self._bump_generation(conn)
+            conn.executemany(
+                "INSERT INTO call_text (analysis_id, rep, kind, label, content) VALUES (?, ?, ?, ?, ?)",
+                [(analysis_id, rep, kind, label, text) for kind, label, text in docs],
+            )
+            if vectors is not None:
+                conn.executemany(
+                    "INSERT INTO embeddings (analysis_id, rep, kind, label, content, vector) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(analysis_id, rep, kind, label, text, vec.tobytes()) for (kind, label, text), vec in zip(docs, vectors)],
+                )
+        return len(docs)
+
+    @staticmethod
+    def _bump_generation(conn: sqlite3.Connection):
+        conn.execute("UPDATE index_state SET value = value + 1 WHERE key = 'generation'")
+
+    def remove_calls(self, analysis_ids: Iterable[str]):
+        """Drop calls (e.g. analyses replaced by a newer one of the same recording)."""
+        params = [(a,) for a in analysis_ids]
+        if not params:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM call_text WHERE analysis_id = ?", params)
+            conn.executemany("DELETE FROM embeddings WHERE analysis_id = ?", params)
+            self._bump_generation(conn)
+
+    def search(self, query: str, kind: Optional[str] = None, rep: Optional[str] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """BM25-ranked keyword search with highlighted snippets."""
+        match = _fts_query(query)
+        if not match:
+            return []
+        sql = ("SELECT analysis_id, rep, kind, label, snippet(call_text, 4, '[', ']', '…', 16), bm25(call_text)"
+               " FROM call_text WHERE call_text MATCH ?")
+        params: list = [match]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        if rep:
+            sql += " AND rep = ?"
+            params.append(rep)
+        sql += " ORDER BY bm25(call_text) LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {"analysis_id": a, "rep": r, "kind": k, "label": l, "snippet": s, "score": round(-score, 4)}
+            for a, r, k, l, s, score in rows
+        ]
+
+    def _refresh_vectors(self):
+        import numpy as np
+
+        with self._connect() as conn:
+            generation = conn.execute("SELECT value FROM index_state WHERE key = 'generation'").fetchone()[0]
+            if generation != self._generation:
+                # Rows were deleted (a replaced call or a reindex, in any worker): start over
+                self._matrix, self._meta, self._kinds, self._reps, self._last_id = None, [], None, None, 0
+                self._generation = generation
+            rows = conn.execute(
+                "SELECT id, analysis_id, rep, kind, label, content, vector FROM embeddings WHERE id > ? ORDER BY id",
+                (self._last_id,),
+            ).fetchall()
+        if not rows:
+            return
+        new = np.stack([np.frombuffer(r[6], dtype=np.float32) for r in rows])
+        kinds = np.array([r[3] for r in rows])
+        reps = np.array([r[2] or "" for r in rows])
+        if self._matrix is None:
+            self._matrix, self._kinds, self._reps = new, kinds, reps
+        else:
+            self._matrix = np.vstack([self._matrix, new])
+            self._kinds = np.concatenate([self._kinds, kinds])
+            self._reps = np.concatenate([self._reps, reps])
+        self._meta.extend(r[:6] for r in rows)
+        self._last_id = rows[-1][0]
+
+    def semantic_search(self, query: str, k: int = 10, kind: Optional[str] = None,
+                        rep: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Cosine similarity over the in-memory vector matrix (one matrix-vector product)."""
+        import numpy as np
+
+        if not self.semantic or not query.strip():
+            return []
+        q = self.embedder.embed([query])[0]
+        with self._lock:
+            self._refresh_vectors()
+            if self._matrix is None:
+                return []
+            scores = self._matrix @ q
+            meta = self._meta
+            if kind or rep:
+                mask = np.ones(len(scores), dtype=bool)
+                if kind:
+                    mask &= self._kinds == kind
+                if rep:
+                    mask &= self._reps == rep
+                scores = np.where(mask, scores, -np.inf)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        return [
+            {"analysis_id": meta[i][1], "rep": meta[i][2], "kind": meta[i][3], "label": meta[i][4],
+             "snippet": meta[i][5][:300], "score": round(float(scores[i]), 4)}
+            for i in top if np.isfinite(scores[i])
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            documents = conn.execute("SELECT COUNT(*) FROM call_text").fetchone()[0]
+            calls = conn.execute("SELECT COUNT(DISTINCT analysis_id) FROM call_text").fetchone()[0]
+            vectors = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"calls": calls, "documents": documents, "vectors": vectors, "semantic": self.semantic}
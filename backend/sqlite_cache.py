@@ -0,0 +1,122 @@
+# backend/sqlite_cache.py
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from backend.result_codec import pack, unpack
+
+if TYPE_CHECKING:
+    from backend.cache_snapshot import Invalidation
+
+DATA_DIR = Path(os.getenv("SALESSENSE_DATA_DIR", Path("backend") / "data"))
+
+
+class SQLiteCache:
+    """Drop-in replacement for the in-memory SimpleCache that keeps entries in a
+    SQLite file, so every uvicorn/gunicorn worker shares the same hits."""
+
+    def __init__(self, db_path: Optional[str] = None, max_size: int = 50, ttl_hours: int = 24):
+        self.db_path = str(db_path or DATA_DIR / "cache.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.ttl_hours = ttl_hours
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " result BLOB NOT NULL,"
+                " timestamp REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_timestamp ON cache(timestamp)")
+            # Columns added after the first release of this table
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            for column in ("rep", "prompt_version"):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE cache ADD COLUMN {column} TEXT")
+
+    async def compute_key(self, file_bytes: bytes, context: str) -> str:
+        hasher = hashlib.sha256()
+        hasher.update(file_bytes)
+        hasher.update(context.encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _get_sync(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT result, timestamp FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[1] > self.ttl_hours * 3600:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            return unpack(row[0])
+
+    def _set_sync(self, key: str, result: Dict[str, Any], rep: str = "", prompt_version: str = ""):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, result, timestamp, rep, prompt_version) VALUES (?, ?, ?, ?, ?)",
+                (key, pack(result), time.time(), rep, prompt_version),
+            )
+            # Evict the oldest entries once the shared cache is over its size limit
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY timestamp DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+            total = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        print(f"💾 Result cached in shared store (total entries: {total})")
+
+    def _clear_sync(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def _invalidate_sync(self, invalidation: "Invalidation") -> int:
+        where, params = invalidation.sql()
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM cache WHERE {where}", params).rowcount
+
+    def _stats_sync(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            total, stored = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(result)), 0) FROM cache").fetchone()
+        return {
+            "total_entries": total,
+            "stored_bytes": stored,
+            "max_entries": self.max_size,
+            "ttl_hours": self.ttl_hours,
+            "backend": "sqlite",
+        }
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def set(self, key: str, result: dict, rep: str = "", prompt_version: str = ""):
+        await asyncio.to_thread(self._set_sync, key, result, rep, prompt_version)
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear_sync)
+
+    async def invalidate(self, invalidation: "Invalidation") -> int:
+        """Drop the entries matching `invalidation`, for every worker at once."""
+        return await asyncio.to_thread(self._invalidate_sync, invalidation)
+
+    # Entries are already on disk; these keep the SimpleCache interface
+    async def save_snapshot(self, force: bool = False) -> Optional[int]:
+        return None
+
+    async def load_snapshot(self) -> int:
+        return (await self.get_stats())["total_entries"]
+
+    async def get_stats(self):
+        return await asyncio.to_thread(self._stats_sync)
@@ -0,0 +1,303 @@
+# backend/stand_ins.py
+"""Local stand-ins for AssemblyAI batch transcription and the OpenAI chat model.
+
+Selected with SALESSENSE_TRANSCRIBER=fake and SALESSENSE_LLM=fake, so load tests
+and offline runs exercise the real pipeline (scheduler, quotas, caches, stores)
+without network calls. Latencies follow simple models of the real services and
+are multiplied by SALESSENSE_STAND_IN_LATENCY_SCALE, which lets a load test run
+in compressed time.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.job_store import BYTES_PER_AUDIO_SECOND
+from backend.live_streaming import FAKE_SCRIPT
+from backend.sqlite_cache import DATA_DIR
+
+LATENCY_SCALE = float(os.getenv("SALESSENSE_STAND_IN_LATENCY_SCALE", "1.0"))
+# Batch transcription turnaround per second of audio, plus queueing/upload overhead
+TRANSCRIBE_SECONDS_PER_AUDIO_SECOND = float(os.getenv("SALESSENSE_STAND_IN_TRANSCRIBE_RTF", "0.15"))
+TRANSCRIBE_OVERHEAD_SECONDS = 3.0
+# Chat completion: fixed overhead plus prefill of the uncached input, then per generated token
+LLM_FIRST_TOKEN_SECONDS = 0.3
+LLM_PREFILL_SECONDS_PER_TOKEN = 0.00025
+LLM_SECONDS_PER_OUTPUT_TOKEN = 0.012
+# Provider prompt caching as OpenAI documents it: prompts of at least 1024 tokens
+# reuse the longest recently seen prefix, in 128-token steps, for a few minutes
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_BLOCK_TOKENS = 128
+PREFIX_CACHE_TTL_SECONDS = 300
+PREFIX_CACHE_MAX_BLOCKS = 100000
+CHARS_PER_TOKEN = 4
+# Batch API turnaround; OpenAI promises 24 hours and usually takes minutes to hours
+BATCH_TURNAROUND_SECONDS = float(os.getenv("SALESSENSE_STAND_IN_BATCH_SECONDS", "900"))
+# Spoken words per second of audio (both speakers)
+WORDS_PER_SECOND = 2.5
+# Audio containing these bytes (e.g. appended to an mp3) fails transcription.
+# A marker in the content, because uploads are stored under their sha256, not their name
+FAIL_MARKER = b"SALESSENSE-FAKE-FAIL"
+
+
+def fake_transcript(audio_seconds: float, seed: Any = 0) -> str:
+    """Speaker-labelled transcript about as long as `audio_seconds` of conversation."""
+    rng = random.Random(seed)
+    lines, words = [], 0
+    while words < max(1.0, audio_seconds) * WORDS_PER_SECOND:
+        # Random lines, so different calls don't share long prefixes (the prompt cache would notice)
+        _, text = rng.choice(FAKE_SCRIPT)
+        lines.append(f"Speaker {'AB'[len(lines) % 2]}: {text}")
+        words += len(text.split())
+    return "\n".join(lines)
+
+
+def has_fail_marker(audio_file) -> bool:
+    """Whether an open audio file contains FAIL_MARKER (read in blocks, from the start)."""
+    audio_file.seek(0)
+    tail = b""
+    while block := audio_file.read(1024 * 1024):
+        if FAIL_MARKER in tail + block:
+            return True
+        tail = block[-len(FAIL_MARKER):]
+    return False
+
+
+def fake_transcribe(audio_file) -> str:
+    """Same contract as transcribe_crew_ai; the audio length is estimated from its size."""
+    size = audio_file.seek(0, os.SEEK_END)
+    audio_seconds = size / BYTES_PER_AUDIO_SECOND
+    time.sleep((TRANSCRIBE_OVERHEAD_SECONDS + audio_seconds * TRANSCRIBE_SECONDS_PER_AUDIO_SECOND) * LATENCY_SCALE)
+    if has_fail_marker(audio_file):
+        raise RuntimeError("Fake transcription failed")
+    return fake_transcript(audio_seconds, seed=size)
+
+
+class FakeTranscriptionService:
+    """Submit-and-callback transcription like AssemblyAI's webhooks, in-process.
+
+    submit returns at once; after the modeled turnaround a timer thread POSTs
+    {"transcript_id", "status"} to the webhook URL, through the backend's real
+    webhook endpoint. Audio containing FAIL_MARKER ends in "error".
+    """
+
+    def __init__(self):
+        self._results: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, file_path: str, webhook_url: str, auth_header: tuple = (None, None)) -> str:
+        transcript_id = uuid.uuid4().hex
+        size = os.path.getsize(file_path)
+        audio_seconds = size / BYTES_PER_AUDIO_SECOND
+        with open(file_path, "rb") as audio_file:
+            failed = has_fail_marker(audio_file)
+        with self._lock:
+            self._results[transcript_id] = None
+        delay = (TRANSCRIBE_OVERHEAD_SECONDS + audio_seconds * TRANSCRIBE_SECONDS_PER_AUDIO_SECOND) * LATENCY_SCALE
+        timer = threading.Timer(delay, self._finish, (transcript_id, audio_seconds, size, failed, webhook_url,
+                                                      auth_header))
+        timer.daemon = True
+        timer.start()
+        return transcript_id
+
+    def _finish(self, transcript_id: str, audio_seconds: float, seed: int, failed: bool, webhook_url: str,
+                auth_header: tuple):
+        import httpx
+
+        with self._lock:
+            self._results[transcript_id] = RuntimeError("Fake transcription failed") if failed \
+                else fake_transcript(audio_seconds, seed=seed)
+        name, value = auth_header
+        headers = {name: value} if name else {}
+        try:
+            httpx.post(webhook_url, json={"transcript_id": transcript_id, "status": "error" if failed else "completed"},
+                       headers=headers, timeout=10)
+        except httpx.HTTPError:
+            # Like a lost webhook: the waiting job finds out by checking status
+            pass
+
+    def status(self, transcript_id: str) -> str:
+        with self._lock:
+            if transcript_id not in self._results:
+                raise KeyError(transcript_id)
+            result = self._results[transcript_id]
+        if result is None:
+            return "processing"
+        return "error" if isinstance(result, Exception) else "completed"
+
+    def fetch(self, transcript_id: str) -> str:
+        with self._lock:
+            if self._results[transcript_id] is None:
+                raise RuntimeError(f"Transcript {transcript_id} is processing, not completed")
+            result = self._results.pop(transcript_id)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class PrefixCache:
+    """Which prompt prefixes a model has seen recently, at block granularity."""
+
+    def __init__(self, ttl_seconds: float = PREFIX_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _block_hashes(model: str, prompt: str) -> List[str]:
+        block = PREFIX_CACHE_BLOCK_TOKENS * CHARS_PER_TOKEN
+        hasher = hashlib.sha256(model.encode("utf-8"))
+        hashes = []
+        for start in range(0, len(prompt) - block + 1, block):
+            hasher.update(prompt[start:start + block].encode("utf-8"))
+            hashes.append(hasher.copy().hexdigest())
+        return hashes
+
+    def lookup(self, model: str, prompt: str, now: Optional[float] = None) -> int:
+        """Tokens of `prompt` served from cache; the prompt's own prefixes are cached afterwards."""
+        now = time.monotonic() if now is None else now
+        if len(prompt) < PREFIX_CACHE_MIN_TOKENS * CHARS_PER_TOKEN:
+            return 0
+        hashes = self._block_hashes(model, prompt)
+        with self._lock:
+            if len(self._expires) > PREFIX_CACHE_MAX_BLOCKS:
+                self._expires = {key: expires for key, expires in self._expires.items() if expires >= now}
+            hit = 0
+            for blocks, key in enumerate(hashes, 1):
+                if self._expires.get(key, 0) < now:
+                    break
+                hit = blocks
+            for key in hashes:
+                self._expires[key] = now + self.ttl_seconds
+        cached = hit * PREFIX_CACHE_BLOCK_TOKENS
+        return cached if cached >= PREFIX_CACHE_MIN_TOKENS else 0
+
+
+prefix_cache = PrefixCache()
+
+
+def time_to_first_token(input_tokens: int, cached_tokens: int) -> float:
+    """Modeled seconds before the first output token (unscaled)."""
+    return LLM_FIRST_TOKEN_SECONDS + (input_tokens - cached_tokens) * LLM_PREFILL_SECONDS_PER_TOKEN
+
+
+class FakeChatModel:
+    """Answers like ChatOpenAI for the agents: a summary or preview paragraph, or their JSON."""
+
+    def __init__(self, model_name: str = "gpt-3.5-turbo", max_tokens: int = 800, agent: str = ""):
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.agent = agent
+
+    def _content(self, rng: random.Random) -> str:
+        if self.agent == "summary":
+            return " ".join(text for _, text in rng.sample(FAKE_SCRIPT, 6))
+        if self.agent == "preview":
+            return " ".join(text for _, text in FAKE_SCRIPT[:3])
+        if self.agent == "coaching":
+            return json.dumps({
+                "improvement_areas": [{"skill": "Discovery", "issue_observed": "Few open questions",
+                                       "behavior_change": "Ask about impact before pitching",
+                                       "practice_drill": "Five open questions per call",
+                                       "ready_to_use_prompts": ["What does a late close cost you?"]}],
+                "next_steps": [{"owner": "rep", "action": "Send savings comparison", "due_by": "Friday",
+                                "success_criteria": "CFO reviews it"}],
+                "coaching_tips": [{"skill": "Objection Handling", "tip": "Quantify savings against current spend"}],
+            })
+        rep = rng.randint(40, 70)
+        return json.dumps({
+            "metrics": {"overall_sentiment": rng.choice(["positive", "neutral", "negative"]),
+                        "sentiment_rationale": "Prospect asked for a comparison to share with the CFO",
+                        "rep_talk_ratio_percent": rep, "customer_talk_ratio_percent": 100 - rep,
+                        "questions_asked_by_rep": rng.randint(1, 12), "objections_detected": 1,
+                        "followups_committed": 1},
+            "strengths": ["Tied the product to the invoice backlog"],
+            "areas_to_improve": ["Quantify the cost of late closes"],
+            "customer_objections": [{"objection": "price", "moment_quote": FAKE_SCRIPT[5][1],
+                                     "rep_response_quality": "adequate",
+                                     "suggested_response": "Compare against the competitor's cost"}],
+            "notable_quotes": [{"speaker": "customer", "quote": FAKE_SCRIPT[1][1],
+                                "why_it_matters": "Pain is a week of manual work"}],
+        })
+
+    def respond(self, prompt: str) -> Tuple[str, Dict[str, Any]]:
+        """Answer and usage for a prompt, without the modeled delay."""
+        from backend.multi_agent_system import PACKED_CALL_HEADER
+
+        rng = random.Random(hash(prompt))
+        header = re.escape(PACKED_CALL_HEADER.format(call_id=""))
+        call_ids = re.findall(rf"^{header}(\S+)$", prompt, re.MULTILINE)
+        if call_ids:
+            # A packed request answers every call in one JSON object
+            content = json.dumps({call_id: self._content(rng) if self.agent == "summary"
+                                  else json.loads(self._content(rng)) for call_id in call_ids})
+        else:
+            content = self._content(rng)
+        input_tokens = len(prompt) // CHARS_PER_TOKEN
+        cached_tokens = prefix_cache.lookup(self.model_name, prompt)
+        output_tokens = min(self.max_tokens, max(len(content) // 4, int(self.max_tokens * rng.uniform(0.4, 0.8))))
+        return content, {
+            "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached_tokens},
+        }
+
+    def invoke(self, messages: List[Any]):
+        from langchain_core.messages import AIMessage
+
+        content, usage = self.respond("\n".join(getattr(m, "content", str(m)) for m in messages))
+        first_token = time_to_first_token(usage["input_tokens"], usage["input_token_details"]["cache_read"])
+        time.sleep((first_token + usage["output_tokens"] * LLM_SECONDS_PER_OUTPUT_TOKEN) * LATENCY_SCALE)
+        return AIMessage(
+            content=content,
+            usage_metadata=usage,
+            response_metadata={"time_to_first_token": first_token * LATENCY_SCALE},
+        )
+
+
+class FakeBatchAPI:
+    """OpenAI's Batch API on local files: submit chat requests, poll, collect the answers.
+
+    Batches are files under DATA_DIR/fake_batches, so a backfill interrupted
+    mid-batch finds them again after a restart, like real batch ids. A batch
+    completes BATCH_TURNAROUND_SECONDS (scaled) after submission; the answers
+    come from FakeChatModel, which reads the agent from the prompt_cache_key.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or DATA_DIR / "fake_batches")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _load(self, batch_id: str) -> Dict[str, Any]:
+        return json.loads((self.root / f"{batch_id}.json").read_text())
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        (self.root / f"{batch_id}.json").write_text(json.dumps({"submitted_at": time.time(), "requests": requests}))
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        batch = self._load(batch_id)
+        done = time.time() - batch["submitted_at"] >= BATCH_TURNAROUND_SECONDS * LATENCY_SCALE
+        return "completed" if done else "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        answers = {}
+        for request in self._load(batch_id)["requests"]:
+            body = request["body"]
+            agent = body.get("prompt_cache_key", "").rpartition("-")[2]
+            model = FakeChatModel(body["model"], body["max_tokens"], agent)
+            content, usage = model.respond("\n".join(m["content"] for m in body["messages"]))
+            answers[request["custom_id"]] = {
+                "content": content,
+                "input_tokens": usage["input_tokens"],
+                "output_tokens": usage["output_tokens"],
+                "cached_tokens": usage["input_token_details"]["cache_read"],
+            }
+        return answers
@@ -0,0 +1,24 @@
+import time
+
+from backend.model_router import MIN_SAMPLES, LatencyTracker, ModelRouter
+
+
+def test_routing_returns_to_primary_after_latency_recovers():
+    router = ModelRouter(slo_seconds=30, fast_model="fast")
+    router.latency = LatencyTracker(ttl_seconds=0.2)
+    primary = router.route("summary", 100).model
+
+    for _ in range(MIN_SAMPLES):
+        router.record_latency(primary, 60.0)
+    assert router.route("summary", 100).model == "fast"
+
+    # Only the fast model is observed while the primary is over its SLO; once
+    # the slow samples expire the primary is tried again
+    for _ in range(MIN_SAMPLES):
+        router.record_latency("fast", 2.0)
+    time.sleep(0.3)
+    assert router.route("summary", 100).model == primary
+
+    for _ in range(MIN_SAMPLES):
+        router.record_latency(primary, 5.0)
+    assert router.route("summary", 100).model == primary
@@ -0,0 +1,115 @@
+import math
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import wave
+
+# Stand-ins in webhook mode, with their own data directory; set before the app is imported
+os.environ.update({
+    "SALESSENSE_DATA_DIR": tempfile.mkdtemp(prefix="salessense-webhooks-"),
+    "SALESSENSE_TRANSCRIBER": "fake",
+    "SALESSENSE_LLM": "fake",
+    "SALESSENSE_TRANSCRIPTION_MODE": "webhook",
+    "SALESSENSE_STAND_IN_LATENCY_SCALE": "0.01",
+    "SALESSENSE_WARMUP": "0",
+})
+
+import httpx
+import pytest
+import uvicorn
+
+from backend import main, transcription_webhooks
+from backend.stand_ins import FAIL_MARKER
+
+
+def write_tone(path: str, frequency: float, seconds: float = 2.0, rate: int = 8000) -> str:
+    """A short mono WAV; each frequency is a different recording to the caches."""
+    frames = b"".join(struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * i / rate)))
+                      for i in range(int(seconds * rate)))
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(frames)
+    return path
+
+
+@pytest.fixture(scope="module")
+def server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    original_base_url = transcription_webhooks.WEBHOOK_BASE_URL
+    transcription_webhooks.WEBHOOK_BASE_URL = base_url
+    uvicorn_server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not uvicorn_server.started:
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.05)
+    yield base_url
+    transcription_webhooks.WEBHOOK_BASE_URL = original_base_url
+    uvicorn_server.should_exit = True
+    thread.join(timeout=30)
+
+
+@pytest.fixture
+def callbacks(monkeypatch):
+    """Statuses delivered through POST /webhooks/assemblyai during the test."""
+    received = []
+    wake = main.pending_transcriptions.wake
+
+    def recording_wake(transcript_id, status):
+        received.append(status)
+        wake(transcript_id, status)
+
+    monkeypatch.setattr(main.pending_transcriptions, "wake", recording_wake)
+    return received
+
+
+def analyze(base_url: str, audio_path: str) -> dict:
+    with open(audio_path, "rb") as audio:
+        response = httpx.post(f"{base_url}/analyze_call", timeout=60,
+                              files={"audio_file": ("call.wav", audio, "audio/wav")},
+                              data={"participants": "Jane (Sales Rep), Bob (Prospect)",
+                                    "details": "Demo", "call_types": "Discovery"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def job_status(base_url: str, job_id: str) -> str:
+    return httpx.get(f"{base_url}/jobs/{job_id}").json()["status"]
+
+
+def test_callback_completes_job(server, callbacks, tmp_path):
+    result = analyze(server, write_tone(str(tmp_path / "call.wav"), 440))
+    assert "error" not in result
+    assert result["transcript_source"]["source"] == "assemblyai"
+    assert callbacks == ["completed"]
+    assert job_status(server, result["job_id"]) == "completed"
+
+
+def test_lost_callback_is_recovered_by_polling(server, callbacks, tmp_path, monkeypatch):
+    # Callbacks go to a port nobody listens on; the job has to ask the provider
+    monkeypatch.setattr(transcription_webhooks, "WEBHOOK_BASE_URL", "http://127.0.0.1:9")
+    monkeypatch.setattr(transcription_webhooks, "PROVIDER_CHECK_SECONDS", 0.2)
+    monkeypatch.setattr(transcription_webhooks, "SHARED_CHECK_SECONDS", 0.1)
+    result = analyze(server, write_tone(str(tmp_path / "call.wav"), 523))
+    assert "error" not in result
+    assert callbacks == []
+    assert job_status(server, result["job_id"]) == "completed"
+
+
+def test_error_callback_fails_job(server, callbacks, tmp_path):
+    path = write_tone(str(tmp_path / "call.wav"), 659)
+    with open(path, "ab") as f:
+        f.write(FAIL_MARKER)
+    result = analyze(server, path)
+    assert "Fake transcription failed" in result["error"]
+    assert callbacks == ["error"]
+    assert job_status(server, result["job_id"]) == "failed"
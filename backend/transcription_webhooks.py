@@ -0,0 +1,192 @@
+# backend/transcription_webhooks.py
+import asyncio
+import hmac
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.sqlite_cache import DATA_DIR
+
+log = logging.getLogger("salessense.backend")
+
+# "poll" keeps a thread blocked in the SDK until AssemblyAI finishes; "webhook"
+# submits, frees the thread and resumes the job when AssemblyAI calls back
+TRANSCRIPTION_MODE = os.getenv("SALESSENSE_TRANSCRIPTION_MODE", "poll")
+# Public base URL AssemblyAI can reach this backend at, e.g. https://salessense.example.com
+WEBHOOK_BASE_URL = os.getenv("SALESSENSE_WEBHOOK_BASE_URL", "http://localhost:8000")
+WEBHOOK_PATH = "/webhooks/assemblyai"
+# Shared secret AssemblyAI sends back in WEBHOOK_AUTH_HEADER. When empty, any
+# caller can reach the webhook, so the status it reports is checked with the provider
+WEBHOOK_SECRET = os.getenv("SALESSENSE_WEBHOOK_SECRET", "")
+WEBHOOK_AUTH_HEADER = "X-SalesSense-Webhook-Secret"
+# Give up on a transcription after this long
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("SALESSENSE_WEBHOOK_TIMEOUT_SECONDS", "3600"))
+# Callbacks can land on another worker: check the shared table this often
+SHARED_CHECK_SECONDS = 2.0
+# Ask the provider directly this often, in case a callback was lost
+PROVIDER_CHECK_SECONDS = float(os.getenv("SALESSENSE_WEBHOOK_RECHECK_SECONDS", "120"))
+
+DONE_STATUSES = ("completed", "error")
+
+
+_service = None
+
+
+def get_transcription_service():
+    """Real AssemblyAI, or the in-process fake when SALESSENSE_TRANSCRIBER=fake.
+
+    One per process: the fake holds results until the submitting job fetches them.
+    """
+    global _service
+    if _service is None:
+        from backend.crewai_transcription import TRANSCRIBER
+        if TRANSCRIBER == "fake":
+            from backend.stand_ins import FakeTranscriptionService
+            _service = FakeTranscriptionService()
+        else:
+            from backend.crewai_transcription import AssemblyAITranscriptionService
+            _service = AssemblyAITranscriptionService()
+    return _service
+
+
+class PendingTranscriptions:
+    """Submitted transcriptions and their callbacks, shared by every worker via SQLite.
+
+    The worker that submitted waits on an in-process future. A callback that
+    arrives on the same worker wakes it at once; one that arrives on another
+    worker is picked up from the table within SHARED_CHECK_SECONDS.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or DATA_DIR / "transcriptions.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._waiters: Dict[str, asyncio.Future] = {}
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcriptions ("
+                " transcript_id TEXT PRIMARY KEY,"
+                " job_id TEXT,"
+                " status TEXT NOT NULL,"
+                " worker_pid INTEGER,"
+                " submitted_at REAL NOT NULL,"
+                " completed_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def register(self, transcript_id: str, job_id: str = ""):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO transcriptions (transcript_id, job_id, status, worker_pid, submitted_at)"
+                " VALUES (?, ?, 'submitted', ?, ?)",
+                (transcript_id, job_id, os.getpid(), time.time()),
+            )
+
+    def _status(self, transcript_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT status FROM transcriptions WHERE transcript_id = ?",
+                               (transcript_id,)).fetchone()
+        return row[0] if row else None
+
+    def complete(self, transcript_id: str, status: str):
+        """Record a callback; it may beat register() when the provider is fast."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO transcriptions (transcript_id, status, submitted_at, completed_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(transcript_id) DO UPDATE SET status = excluded.status,"
+                " completed_at = excluded.completed_at",
+                (transcript_id, status, now, now),
+            )
+            # Callbacks for transcripts nobody waits for (lost jobs) don't pile up
+            conn.execute("DELETE FROM transcriptions WHERE submitted_at < ?", (now - 2 * WEBHOOK_TIMEOUT_SECONDS,))
+
+    def wake(self, transcript_id: str, status: str):
+        """Resume a job waiting in this worker (call on the event loop, after complete)."""
+        waiter = self._waiters.get(transcript_id)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(status)
+
+    def forget(self, transcript_id: str):
+        self._waiters.pop(transcript_id, None)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM transcriptions WHERE transcript_id = ?", (transcript_id,))
+
+    async def wait(self, transcript_id: str, service, timeout: float = WEBHOOK_TIMEOUT_SECONDS) -> str:
+        """Wait, without holding a thread, until the transcript is completed or failed."""
+        waiter = self._waiters.setdefault(transcript_id, asyncio.get_running_loop().create_future())
+        deadline = time.monotonic() + timeout
+        next_provider_check = time.monotonic() + PROVIDER_CHECK_SECONDS
+        while True:
+            status = await asyncio.to_thread(self._status, transcript_id)
+            if status in DONE_STATUSES:
+                return status
+            now = time.monotonic()
+            if now >= next_provider_check:
+                next_provider_check = now + PROVIDER_CHECK_SECONDS
+                status = await asyncio.to_thread(service.status, transcript_id)
+                if status in DONE_STATUSES:
+                    log.warning(f"No callback for transcript {transcript_id}, found it {status} by polling")
+                    await asyncio.to_thread(self.complete, transcript_id, status)
+                    return status
+            if now >= deadline:
+                raise TimeoutError(f"Transcript {transcript_id} not finished after {timeout:.0f}s")
+            try:
+                return await asyncio.wait_for(asyncio.shield(waiter), SHARED_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM transcriptions GROUP BY status").fetchall()
+        return {"by_status": dict(rows), "waiting_here": len(self._waiters)}
+
+
+def webhook_url() -> str:
+    return WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH
+
+
+def webhook_auth_header() -> tuple:
+    return (WEBHOOK_AUTH_HEADER, WEBHOOK_SECRET) if WEBHOOK_SECRET else (None, None)
+
+
+def verify_webhook_secret(received: Optional[str]) -> bool:
+    if not WEBHOOK_SECRET:
+        return True
+    return received is not None and hmac.compare_digest(received, WEBHOOK_SECRET)
+
+
+def callback_status(transcript_id: str, reported: str) -> str:
+    """Status to record for a callback: as reported when it carried the secret, else the provider's."""
+    if WEBHOOK_SECRET:
+        return reported
+    return get_transcription_service().status(transcript_id)
+
+
+async def submit_transcription(pending: PendingTranscriptions, file_location: str, job_id: str = "") -> str:
+    """Upload the audio and register for its callback; returns the transcript id to wait on."""
+    service = get_transcription_service()
+    transcript_id = await asyncio.to_thread(service.submit, file_location, webhook_url(), webhook_auth_header())
+    await asyncio.to_thread(pending.register, transcript_id, job_id)
+    log.info(f"📨 Submitted transcript {transcript_id} (job {job_id[:8]}), waiting for callback")
+    return transcript_id
+
+
+async def wait_for_transcription(pending: PendingTranscriptions, transcript_id: str) -> str:
+    """Wait for the webhook without holding a thread, then fetch the text."""
+    service = get_transcription_service()
+    try:
+        status = await pending.wait(transcript_id, service)
+        if status == "error":
+            # fetch raises with the provider's error message
+            await asyncio.to_thread(service.fetch, transcript_id)
+            raise RuntimeError(f"Transcription {transcript_id} failed")
+        return await asyncio.to_thread(service.fetch, transcript_id)
+    finally:
+        await asyncio.to_thread(pending.forget, transcript_id)
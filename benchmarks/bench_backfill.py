@@ -0,0 +1,107 @@
+"""Calls analysed per hour, and tokens per call, for each backfill mode at a fixed token budget.
+
+Runs backend.backfill on the same synthetic calls three times, each in its own
+data directory, against the local stand-ins (SALESSENSE_LLM=fake):
+
+* per call: one chat request per agent and call (--pack-size 1)
+* packed: short calls packed --pack-size to a request, sent through the chat API
+* batch: the same packed requests through the stand-in Batch API
+
+Two rates are reported for the chat runs. "latency-bound" is measured with
+the quota switched off and --concurrency requests in flight. "at budget" is
+what a fixed --tpm (tokens per minute, the budget the limiter enforces) allows
+given the tokens each call used, capped by the latency-bound rate. Billed
+tokens count cached input and Batch API tokens at half price.
+
+The batch run does not draw on the chat budget, as with OpenAI. Its rate comes
+from SALESSENSE_STAND_IN_BATCH_SECONDS, the modeled turnaround (default 900 s),
+and from how many calls are queued, so it grows with the backlog.
+
+Call lengths are log-normal around --median-seconds. Stand-in latencies are
+compressed by --time-scale; calls/hour is converted back to real time.
+
+    python -m benchmarks.bench_backfill
+    python -m benchmarks.bench_backfill --calls 400 --tpm 200000 --pack-size 6
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from backend.stand_ins import fake_transcript
+
+MODES = (
+    ("per call", "packed", 1),
+    ("packed", "packed", None),
+    ("batch", "batch", None),
+)
+
+
+def write_manifest(path: Path, calls: int, median_seconds: float, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(calls):
+            seconds = min(1800.0, max(20.0, rng.lognormvariate(math.log(median_seconds), 0.8)))
+            f.write(json.dumps({
+                "call_id": f"bench-{i}",
+                "transcript": fake_transcript(seconds, seed=i),
+                "participants": f"Rep {i % 7} (Sales Rep), Buyer {i} (Prospect)",
+                "details": f"Historical call {i}",
+                "call_types": rng.choice(["Discovery", "Demo", "Pricing/Negotiation"]),
+                "created_at": 1735689600 + i * 3600,
+            }) + "\n")
+
+
+def run_mode(manifest: Path, data_dir: str, mode: str, pack_size: int, args) -> dict:
+    env = {
+        **os.environ,
+        "SALESSENSE_LLM": "fake",
+        "SALESSENSE_STAND_IN_LATENCY_SCALE": str(args.time_scale),
+        "SALESSENSE_OPENAI_TPM": "0",
+        "SALESSENSE_OPENAI_RPM": "0",
+        "SALESSENSE_DATA_DIR": data_dir,
+        "SALESSENSE_SEMANTIC_INDEX": "0",
+        "SALESSENSE_LOG_LEVEL": "warning",
+    }
+    command = [sys.executable, "-m", "backend.backfill", str(manifest), "--mode", mode,
+               "--pack-size", str(pack_size), "--concurrency", str(args.concurrency),
+               "--poll-seconds", str(30 * args.time_scale), "--json"]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--median-seconds", type=float, default=120.0, help="median call length")
+    parser.add_argument("--pack-size", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tpm", type=float, default=40000, help="OpenAI tokens per minute for the chat runs")
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = Path(tmp) / "calls.jsonl"
+        write_manifest(manifest, args.calls, args.median_seconds, args.seed)
+        print(f"{args.calls} calls (median {args.median_seconds:.0f}s), chat budget {args.tpm:,.0f} TPM\n")
+        print("| mode | calls | requests / call | input tokens / call | output tokens / call |"
+              " billed tokens / call | calls / hour, latency-bound | calls / hour at budget |")
+        print("|---|---:|---:|---:|---:|---:|---:|---:|")
+        for label, mode, pack_size in MODES:
+            s = run_mode(manifest, str(Path(tmp) / label.replace(" ", "_")), mode, pack_size or args.pack_size, args)
+            measured = s["calls_per_hour"] * args.time_scale
+            tokens = s["input_tokens_per_call"] + s["output_tokens_per_call"]
+            at_budget = "own queue" if mode == "batch" else f"{min(measured, args.tpm * 60 / tokens):,.0f}"
+            print(f"| {label} | {s['calls_done']} | {s['requests'] / s['calls_done']:.2f} |"
+                  f" {s['input_tokens_per_call']:,} | {s['output_tokens_per_call']:,} |"
+                  f" {s['billed_tokens_per_call']:,} | {measured:,.0f} | {at_budget} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cold-start import budget for the backend and frontend entry modules.
+
+Runs ``python -X importtime -c "import <module>"`` in a clean interpreter,
+reports the slowest imports and fails (exit code 1) when the total exceeds
+the budget. Meant to catch a heavy SDK sneaking back into module import time.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --module backend.main --budget-ms 800
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# module -> startup budget in milliseconds (cumulative import time)
+DEFAULT_BUDGETS = {
+    "backend.main": float(os.getenv("SALESSENSE_IMPORT_BUDGET_MS", "1000")),
+}
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(module: str, runs: int = 3):
+    """Best-of-N cumulative import time in ms plus the per-module breakdown of that run."""
+    best = None
+    env = {**os.environ, "SALESSENSE_WARMUP": "0", "PYTHONDONTWRITEBYTECODE": "0"}
+    env.pop("OPENAI_API_KEY", None)  # importing must not require credentials
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        rows = []
+        for line in proc.stderr.splitlines():
+            match = LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                rows.append((name, int(self_us), int(cumulative_us), len(indent)))
+        top_level = [r for r in rows if r[3] == 1]
+        total_ms = sum(r[2] for r in top_level) / 1000
+        if best is None or total_ms < best[0]:
+            best = (total_ms, rows)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", help="module to import (repeatable)")
+    parser.add_argument("--budget-ms", type=float, help="budget for every --module")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    budgets = {m: args.budget_ms or DEFAULT_BUDGETS.get(m, 1000.0) for m in args.module} if args.module else DEFAULT_BUDGETS
+
+    failed = False
+    for module, budget in budgets.items():
+        total_ms, rows = measure(module)
+        status = "OK" if total_ms <= budget else "OVER BUDGET"
+        failed |= total_ms > budget
+        print(f"{module}: {total_ms:.0f} ms (budget {budget:.0f} ms) {status}")
+        for name, _, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Input tokens and time to first token with provider prompt caching, per prompt layout.
+
+Replays a day of analyses against the prefix-caching model in backend.stand_ins.
+That model follows OpenAI's documented rules: a prompt needs at least 1024 tokens,
+prefixes are matched in 128-token blocks, and entries live for 5 minutes. Each
+call is analysed once and then re-run after some context edits, with each edit
+re-running only the agents that read the edited field (AGENT_INPUTS). Two
+layouts are compared:
+
+* before: the call data sits in the middle of the instructions, right after the
+  role paragraph, as the prompts used to be written
+* after: the static instructions first (system message), then the transcript,
+  then the context
+
+Prompts are built with the real templates and agent_context. Cached tokens
+count at half price, as on OpenAI. Time to first token comes from the
+stand-in's prefill model.
+
+    python -m benchmarks.bench_prompt_cache
+    python -m benchmarks.bench_prompt_cache --calls 200 --edits 3 --gap 30
+"""
+import argparse
+import random
+import statistics
+
+from backend.multi_agent_system import AGENT_INPUTS, AGENT_ORDER, TRANSCRIPT_CHARS, agent_context, get_prompt
+from backend.stand_ins import CHARS_PER_TOKEN, PrefixCache, fake_transcript, time_to_first_token
+
+MODEL = "gpt-4o-mini"
+# Field edited by each successive re-run of a call
+EDITED_FIELDS = ("details", "call_types", "participants")
+CACHED_TOKEN_PRICE = 0.5
+
+
+def messages_for(agent: str, context: dict, transcript: str, summary: str):
+    return get_prompt(agent).format_messages(
+        context=agent_context(context, agent),
+        transcript=transcript[:TRANSCRIPT_CHARS.get(agent, len(transcript))],
+        summary=summary,
+    )
+
+
+def prompt_text(agent: str, context: dict, transcript: str, summary: str, layout: str) -> str:
+    static, data = (m.content for m in messages_for(agent, context, transcript, summary))
+    if layout == "after":
+        return static + data
+    role, _, rest = static.partition("\n\n")
+    return f"{role}\n\n{data}\n\n{rest}"
+
+
+def agents_to_rerun(field: str):
+    """Agents that read `field`, plus everything downstream of them."""
+    stale = {agent for agent in AGENT_ORDER if field in AGENT_INPUTS[agent]}
+    for agent in AGENT_ORDER:
+        if any(dep in stale for dep in AGENT_INPUTS[agent]):
+            stale.add(agent)
+    return [agent for agent in AGENT_ORDER if agent in stale]
+
+
+def build_events(calls: int, edits: int, gap: float, edit_delay: float, seed: int):
+    rng = random.Random(seed)
+    events = []
+    for i in range(calls):
+        context = {
+            "participants": f"Rep {i} (Sales Rep), Buyer {i} (Prospect)",
+            "details": f"Follow-up on proposal {i}",
+            "call_types": rng.choice(["Discovery", "Demo", "Pricing/Negotiation"]),
+        }
+        transcript = fake_transcript(rng.uniform(120, 900), seed=i)
+        start = i * gap
+        events.append((start, i, "first", list(AGENT_ORDER), dict(context), transcript))
+        for k in range(edits):
+            field = EDITED_FIELDS[k % len(EDITED_FIELDS)]
+            context = {**context, field: f"{context[field]} (edit {k + 1})"}
+            events.append((start + (k + 1) * edit_delay, i, "edit", agents_to_rerun(field), dict(context), transcript))
+    return sorted(events, key=lambda e: e[0])
+
+
+def replay(events, layout: str):
+    cache = PrefixCache()
+    rows = {"first": [], "edit": []}
+    for now, call, kind, agents, context, transcript in events:
+        summary = f"Summary of call {call} for {context['details']}."
+        for offset, agent in enumerate(agents):
+            prompt = prompt_text(agent, context, transcript, summary, layout)
+            input_tokens = len(prompt) // CHARS_PER_TOKEN
+            cached = cache.lookup(MODEL, prompt, now=now + offset)
+            rows[kind].append((input_tokens, cached, time_to_first_token(input_tokens, cached)))
+    return rows
+
+
+def summarize(rows):
+    if not rows:
+        return None
+    input_tokens = sum(r[0] for r in rows)
+    cached = sum(r[1] for r in rows)
+    return {
+        "requests": len(rows),
+        "input_tokens": input_tokens / len(rows),
+        "cached_share": cached / input_tokens,
+        "billed_tokens": (input_tokens - cached + CACHED_TOKEN_PRICE * cached) / len(rows),
+        "ttft_ms": statistics.mean(r[2] for r in rows) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--edits", type=int, default=2, help="context edits re-run per call")
+    parser.add_argument("--gap", type=float, default=20.0, help="seconds between new calls")
+    parser.add_argument("--edit-delay", type=float, default=90.0, help="seconds between edits of one call")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    events = build_events(args.calls, args.edits, args.gap, args.edit_delay, args.seed)
+    print(f"{args.calls} calls, {args.edits} context edits each, model {MODEL}\n")
+    print("| layout | requests | input tokens / request | cached | billed-equivalent tokens / request |"
+          " TTFT ms |")
+    print("|---|---:|---:|---:|---:|---:|")
+    for layout in ("before", "after"):
+        rows = replay(events, layout)
+        for kind, label in (("first", "first run"), ("edit", "re-run after edit"), (None, "all")):
+            stats = summarize(rows[kind] if kind else rows["first"] + rows["edit"])
+            if stats is None:
+                continue
+            print(f"| {layout}, {label} | {stats['requests']} | {stats['input_tokens']:,.0f} |"
+                  f" {stats['cached_share']:.0%} | {stats['billed_tokens']:,.0f} | {stats['ttft_ms']:,.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Size, memory and speed of cached analysis results: JSON/dicts vs the packed codec.
+
+Builds realistic analysis results (objections, quotes, next steps, routing),
+then compares, per entry:
+
+* stored bytes: ``json.dumps`` text (what SQLite held before) vs ``pack``
+* resident memory: the dict SimpleCache used to keep vs the packed bytes
+* encode/decode time: ``json.dumps``/``json.loads`` vs ``pack``/``unpack``
+* the old agent hand-off (``json.dumps`` in the analysis agent and
+  ``safe_json_parse`` in combine) against passing the dict through
+
+    python -m benchmarks.bench_result_codec
+    python -m benchmarks.bench_result_codec --entries 500 --objections 12
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from backend.result_codec import pack, unpack
+
+
+WORDS = ("invoice budget renewal pilot integration finance rollout contract security review timeline "
+         "onboarding discount quarter approval workflow dashboard export reporting champion legal "
+         "procurement competitor migration seats pricing training support deadline").split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    """Varied prose, so compression isn't flattered by identical strings."""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def sample_result(i: int, objections: int = 6, quotes: int = 6, steps: int = 4):
+    rng = random.Random(i)
+    kinds = ["price", "timing", "integration", "security", "other"]
+    return {
+        "summary": " ".join(sentence(rng, 18) for _ in range(9)),
+        "metrics": {
+            "overall_sentiment": "positive",
+            "sentiment_rationale": "Prospect said 'this would save us a week every month'",
+            "rep_talk_ratio_percent": 55,
+            "customer_talk_ratio_percent": 45,
+            "questions_asked_by_rep": 11,
+            "objections_detected": objections,
+            "followups_committed": steps,
+        },
+        "strengths": [sentence(rng, 8) for _ in range(3)],
+        "improvement_areas": [sentence(rng, 8) for _ in range(2)],
+        "customer_objections": [
+            {
+                "objection": kinds[j % len(kinds)],
+                "moment_quote": sentence(rng, 14),
+                "rep_response_quality": rng.choice(["good", "adequate", "weak"]),
+                "suggested_response": sentence(rng, 24),
+            }
+            for j in range(objections)
+        ],
+        "next_steps": [
+            {"owner": rng.choice(["rep", "prospect", "both"]), "action": sentence(rng, 10),
+             "due_by": rng.choice(["Friday", "next week", "end of month"]), "success_criteria": sentence(rng, 8)}
+            for j in range(steps)
+        ],
+        "coaching_tips": [{"skill": rng.choice(["Discovery", "Objection Handling", "Closing"]), "tip": sentence(rng, 20)}
+                          for _ in range(3)],
+        "notable_quotes": [
+            {"speaker": rng.choice(["customer", "rep"]), "quote": sentence(rng, 12),
+             "why_it_matters": sentence(rng, 10)}
+            for j in range(quotes)
+        ],
+        "routing": {
+            agent: {"model": "gpt-3.5-turbo", "tier": "standard", "max_tokens": 800, "timeout": 45,
+                    "latency_seconds": 3.2, "quota_wait_seconds": 0.0, "input_tokens": 1800, "output_tokens": 420}
+            for agent in ("summary", "analysis", "coaching")
+        },
+        "agents": {"recomputed": ["summary", "analysis", "coaching"], "reused": []},
+        "processing_time": "9.4s",
+        "agents_used": "Summary + Analysis + Coaching (dependency-ordered, JSON-safe)",
+        "transcription_method": "AssemblyAI with Speaker Diarization",
+        "transcript_source": {"source": "assemblyai", "audio_sha": "ab" * 32},
+        "cached": False,
+        "analysis_id": f"{i:032x}",
+    }
+
+
+def timed(func, items, repeat: int):
+    """Median microseconds per item over `repeat` passes."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        runs.append((time.perf_counter() - start) / len(items) * 1e6)
+    return statistics.median(runs)
+
+
+def resident_bytes(build):
+    """Bytes still allocated after `build()` returns (what a cache would hold)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--objections", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [sample_result(i, objections=args.objections) for i in range(args.entries)]
+    as_json = [json.dumps(r, ensure_ascii=False) for r in results]
+    packed = [pack(r) for r in results]
+    assert all(unpack(p) == r for p, r in zip(packed, results)), "codec round trip changed a result"
+
+    n = args.entries
+    json_bytes = sum(len(s.encode("utf-8")) for s in as_json) / n
+    packed_bytes = sum(len(p) for p in packed) / n
+    dict_resident = resident_bytes(lambda: [json.loads(s) for s in as_json]) / n
+    packed_resident = resident_bytes(lambda: [bytes(bytearray(p)) for p in packed]) / n
+
+    rows = [
+        ("stored bytes / entry", f"{json_bytes:,.0f}", f"{packed_bytes:,.0f}", json_bytes / packed_bytes),
+        ("resident bytes / entry (memory cache)", f"{dict_resident:,.0f}", f"{packed_resident:,.0f}",
+         dict_resident / packed_resident),
+    ]
+    encode_json = timed(lambda r: json.dumps(r, ensure_ascii=False), results, args.repeat)
+    encode_packed = timed(pack, results, args.repeat)
+    decode_json = timed(json.loads, as_json, args.repeat)
+    decode_packed = timed(unpack, packed, args.repeat)
+    rows.append(("encode µs / entry", f"{encode_json:,.1f}", f"{encode_packed:,.1f}", encode_json / encode_packed))
+    rows.append(("decode µs / entry", f"{decode_json:,.1f}", f"{decode_packed:,.1f}", decode_json / decode_packed))
+
+    # Agent hand-off: the analysis agent used to dump its dict and combine parsed it back
+    from backend.multi_agent_system import safe_json_parse
+    analysis_parts = [{k: r[k] for k in ("metrics", "strengths", "customer_objections", "notable_quotes")}
+                      for r in results]
+    roundtrip_us = timed(lambda d: safe_json_parse(json.dumps(d, ensure_ascii=False), "bench"),
+                         analysis_parts, args.repeat)
+    passthrough_us = timed(lambda d: d, analysis_parts, args.repeat)
+    rows.append(("agent hand-off µs / call", f"{roundtrip_us:,.1f}", f"{passthrough_us:,.2f}",
+                 roundtrip_us / max(passthrough_us, 1e-3)))
+
+    print(f"{n} results, {args.objections} objections each\n")
+    print("| measure | JSON / dict | packed | ratio |")
+    print("|---|---:|---:|---:|")
+    for label, old, new, ratio in rows:
+        print(f"| {label} | {old} | {new} | {ratio:.1f}x |")
+
+
+if __name__ == "__main__":
+    main()
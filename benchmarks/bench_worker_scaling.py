@@ -0,0 +1,129 @@
+"""Throughput scaling of the backend from 1 to N gunicorn workers.
+
+Seeds the shared SQLite cache with one analysis, then hammers /analyze_call
+with that upload so every request is a cache hit: form parsing, hashing the
+upload and the shared cache lookup, no external API calls.
+
+    python -m benchmarks.bench_worker_scaling --max-workers 4 --requests 200
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PARTICIPANTS = "Alex Rep (Sales Rep), Sam Buyer (Prospect)"
+DETAILS = "Benchmark call"
+CALL_TYPES = "Demo"
+
+
+def build_payload(size_mb: float) -> bytes:
+    rng = random.Random(42)
+    return rng.randbytes(int(size_mb * 1024 * 1024))
+
+
+def seed_cache(data_dir: str, payload: bytes):
+    os.environ["SALESSENSE_DATA_DIR"] = data_dir
+    from backend.sqlite_cache import SQLiteCache
+
+    cache = SQLiteCache(os.path.join(data_dir, "cache.sqlite3"))
+    context = f"Participants: {PARTICIPANTS}\nCall details: {DETAILS}\nCall types: {CALL_TYPES}"
+    key = hashlib.sha256(payload + context.encode("utf-8")).hexdigest()
+    asyncio.run(cache.set(key, {
+        "summary": "Seeded benchmark result",
+        "metrics": {"overall_sentiment": "neutral"},
+        "improvement_areas": [],
+        "coaching_tips": [],
+    }))
+
+
+def wait_for_health(url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("backend did not become healthy")
+
+
+def run_load(url: str, payload: bytes, total: int, concurrency: int):
+    def one(_):
+        start = time.perf_counter()
+        resp = requests.post(
+            f"{url}/analyze_call",
+            files={"audio_file": ("bench.mp3", payload, "audio/mpeg")},
+            data={"participants": PARTICIPANTS, "details": DETAILS, "call_types": CALL_TYPES},
+            timeout=120,
+        )
+        resp.raise_for_status()
+        assert resp.json().get("cached"), "expected a cache hit"
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--payload-mb", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    payload = build_payload(args.payload_mb)
+    url = f"http://127.0.0.1:{args.port}"
+    rows = []
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        seed_cache(data_dir, payload)
+        env = {
+            **os.environ,
+            "SALESSENSE_DATA_DIR": data_dir,
+            "SALESSENSE_CACHE_BACKEND": "sqlite",
+            "SALESSENSE_BIND": f"127.0.0.1:{args.port}",
+            "SALESSENSE_LOG_LEVEL": "warning",
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-benchmark"),
+        }
+        for workers in range(1, args.max_workers + 1):
+            env["SALESSENSE_WORKERS"] = str(workers)
+            server = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_for_health(url)
+                run_load(url, payload, min(20, args.requests), args.concurrency)  # warm-up
+                rps, latencies = run_load(url, payload, args.requests, args.concurrency)
+                latencies.sort()
+                rows.append((workers, rps, statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]))
+                print(f"workers={workers}: {rps:.1f} req/s")
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+
+    base = rows[0][1]
+    print()
+    print("| workers | req/s | speedup | p50 ms | p95 ms |")
+    print("|--------:|------:|--------:|-------:|-------:|")
+    for workers, rps, p50, p95 in rows:
+        print(f"| {workers} | {rps:.1f} | {rps / base:.2f}x | {p50 * 1000:.0f} | {p95 * 1000:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Throughput-vs-latency curve and a recommended concurrency for each deployment shape.
+
+Starts the backend under gunicorn for each shape with the local stand-ins
+(SALESSENSE_TRANSCRIBER=fake, SALESSENSE_LLM=fake), then drives a mix of
+/analyze_call, /transcribe/ and /analyze/ from an asyncio httpx client at
+increasing concurrency. Uploads are the sample recordings (sizes and
+durations are reported up front), each with a unique tail so nothing is
+served from the caches.
+
+Stand-in latencies are compressed by --time-scale, and the provider quotas
+are scaled up by the same factor so they bind exactly as they would in real
+time. The latencies in the tables are the compressed ones. The "real p95"
+column divides them back out and is the number compared with --slo-seconds.
+
+A shape is WORKERSxSLOTS: gunicorn workers, and the transcription/agent
+slots of the pipeline scheduler for the whole deployment.
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --shapes 1x4,2x8,4x16 --concurrency 1,2,4,8,16,32 --requests 60
+    python -m benchmarks.load_test --url http://localhost:8000 --time-scale 1   # an already running service
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from backend.audio_fingerprint import probe_duration
+from backend.job_store import BYTES_PER_AUDIO_SECOND
+from backend.stand_ins import fake_transcript
+
+RECORDINGS_DIR = Path("data") / "dialpad_sample_voice_recordings"
+PARTICIPANTS = "Alex Rep (Sales Rep), Sam Buyer (Prospect)"
+DETAILS = "Load test call"
+CALL_TYPES = "Discovery"
+# A level above this error rate is never recommended
+MAX_ERROR_RATE = 0.01
+# Recommend the lowest concurrency that reaches this share of the best throughput within the SLO
+KNEE_SHARE = 0.9
+
+
+def load_recordings(directory: Path):
+    """(bytes, audio seconds) for every sample recording."""
+    recordings = []
+    for path in sorted(directory.iterdir()):
+        if path.suffix.lower() not in (".mp3", ".wav", ".m4a"):
+            continue
+        data = path.read_bytes()
+        recordings.append((data, probe_duration(str(path)) or len(data) / BYTES_PER_AUDIO_SECOND))
+    if not recordings:
+        raise SystemExit(f"No recordings found in {directory}")
+    return recordings
+
+
+def describe(recordings) -> str:
+    sizes = sorted(len(data) / 1e6 for data, _ in recordings)
+    durations = sorted(seconds for _, seconds in recordings)
+
+    def spread(values):
+        return f"min {values[0]:.1f}, p50 {statistics.median(values):.1f}, max {values[-1]:.1f}"
+
+    return f"{len(recordings)} recordings; size MB {spread(sizes)}; duration s {spread(durations)}"
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of {list(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def analyze_call(client: httpx.AsyncClient, rng: random.Random, recordings, priority: str):
+    data, _ = rng.choice(recordings)
+    # Unique tail: same audio for the decoder, a new hash for the caches
+    payload = data + rng.randbytes(32)
+    return await client.post("/analyze_call", files={"audio_file": ("load.mp3", payload, "audio/mpeg")}, data={
+        "participants": PARTICIPANTS, "details": DETAILS, "call_types": CALL_TYPES, "priority": priority,
+    })
+
+
+async def transcribe(client: httpx.AsyncClient, rng: random.Random, recordings, priority: str):
+    data, _ = rng.choice(recordings)
+    return await client.post("/transcribe/", files={"file": ("load.mp3", data + rng.randbytes(32), "audio/mpeg")})
+
+
+async def analyze(client: httpx.AsyncClient, rng: random.Random, recordings, priority: str):
+    _, seconds = rng.choice(recordings)
+    context = f"Participants: {PARTICIPANTS}\nCall details: {DETAILS}\nCall types: {CALL_TYPES}"
+    return await client.post("/analyze/", data={
+        "transcript": fake_transcript(seconds, seed=rng.random()), "context": context, "priority": priority,
+    })
+
+
+SCENARIOS = {"analyze_call": analyze_call, "transcribe": transcribe, "analyze": analyze}
+
+
+async def run_level(url: str, concurrency: int, total: int, mix, recordings, batch_fraction: float, seed: int):
+    """`concurrency` closed-loop clients share `total` requests; returns one row of the curve."""
+    names, weights = list(mix), list(mix.values())
+    samples = []
+    remaining = total
+
+    async def user(index: int):
+        nonlocal remaining
+        rng = random.Random(seed * 1000 + index)
+        while remaining > 0:
+            remaining -= 1
+            scenario = rng.choices(names, weights)[0]
+            priority = "batch" if rng.random() < batch_fraction else "interactive"
+            start = time.perf_counter()
+            try:
+                resp = await SCENARIOS[scenario](client, rng, recordings, priority)
+                ok = resp.status_code == 200 and "error" not in resp.json()
+            except (httpx.HTTPError, ValueError):
+                ok = False
+            samples.append((scenario, time.perf_counter() - start, ok))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=600, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency, ok in samples if ok)
+    errors = sum(1 for _, _, ok in samples if not ok)
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else float("inf")
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_seconds": pct(0.5),
+        "p95_seconds": pct(0.95),
+        "p99_seconds": pct(0.99),
+        "error_rate": errors / max(len(samples), 1),
+        "by_scenario_p95": {
+            name: sorted(l for s, l, ok in samples if ok and s == name)[int(0.95 * (n - 1))]
+            for name in names
+            if (n := sum(1 for s, _, ok in samples if ok and s == name))
+        },
+    }
+
+
+def recommend(rows, slo_seconds: float, time_scale: float):
+    """Lowest concurrency that gets KNEE_SHARE of the best throughput while meeting the SLO.
+
+    Past that point more concurrency only lengthens queues. Returns None if
+    no level meets the SLO.
+    """
+    healthy = [r for r in rows if r["error_rate"] <= MAX_ERROR_RATE and r["p95_seconds"] / time_scale <= slo_seconds]
+    if not healthy:
+        return None
+    best = max(r["throughput_rps"] for r in healthy)
+    return min((r for r in healthy if r["throughput_rps"] >= KNEE_SHARE * best), key=lambda r: r["concurrency"])
+
+
+def wait_for_health(url: str, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("backend did not become healthy")
+
+
+def shape_env(workers: int, slots: int, time_scale: float, data_dir: str, port: int):
+    def scaled(name: str, default: float) -> str:
+        return str(float(os.getenv(name, default)) / time_scale)
+
+    return {
+        **os.environ,
+        "SALESSENSE_WORKERS": str(workers),
+        "SALESSENSE_TRANSCRIBE_SLOTS": str(slots),
+        "SALESSENSE_AGENT_SLOTS": str(slots),
+        "SALESSENSE_TRANSCRIBER": "fake",
+        "SALESSENSE_LLM": "fake",
+        "SALESSENSE_STAND_IN_LATENCY_SCALE": str(time_scale),
+        "SALESSENSE_OPENAI_RPM": scaled("SALESSENSE_OPENAI_RPM", 500),
+        "SALESSENSE_OPENAI_TPM": scaled("SALESSENSE_OPENAI_TPM", 200000),
+        "SALESSENSE_ASSEMBLYAI_RPM": scaled("SALESSENSE_ASSEMBLYAI_RPM", 60),
+        # Every upload is unique; near-duplicate matching would only add ffmpeg time
+        "SALESSENSE_FINGERPRINT": "0",
+        "SALESSENSE_DATA_DIR": data_dir,
+        "SALESSENSE_CACHE_BACKEND": "sqlite",
+        "SALESSENSE_BIND": f"127.0.0.1:{port}",
+        "SALESSENSE_LOG_LEVEL": "warning",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-load-test"),
+    }
+
+
+def sweep(url: str, args, mix, recordings):
+    # Warm-up (graph build, first imports, SQLite files) so it doesn't land in the first level
+    asyncio.run(run_level(url, 2, 4, mix, recordings, args.batch_fraction, seed=0))
+    rows = []
+    for concurrency in args.concurrency:
+        # At least a few requests per client, or the level is mostly ramp-up and ramp-down
+        row = asyncio.run(run_level(url, concurrency, max(args.requests, 3 * concurrency), mix, recordings,
+                                    args.batch_fraction, seed=concurrency))
+        rows.append(row)
+        print(f"  concurrency={concurrency}: {row['throughput_rps']:.2f} req/s,"
+              f" p95 {row['p95_seconds']:.2f}s, errors {row['error_rate']:.0%}")
+    return rows
+
+
+def print_curve(shape: str, rows, args):
+    print(f"\n### {shape}\n")
+    print("| concurrency | req/s | p50 s | p95 s | p99 s | real p95 s | errors | p95 by scenario |")
+    print("|---:|---:|---:|---:|---:|---:|---:|---|")
+    for r in rows:
+        scenarios = ", ".join(f"{name} {p95:.2f}" for name, p95 in r["by_scenario_p95"].items())
+        print(f"| {r['concurrency']} | {r['throughput_rps']:.2f} | {r['p50_seconds']:.2f} | {r['p95_seconds']:.2f}"
+              f" | {r['p99_seconds']:.2f} | {r['p95_seconds'] / args.time_scale:.0f} | {r['error_rate']:.0%}"
+              f" | {scenarios} |")
+    best = recommend(rows, args.slo_seconds, args.time_scale)
+    if best is None:
+        print(f"\nNo level met the {args.slo_seconds:.0f}s p95 SLO; lower the concurrency or add capacity.")
+    else:
+        print(f"\nRecommended concurrency: **{best['concurrency']}** "
+              f"({best['throughput_rps']:.2f} req/s, real p95 {best['p95_seconds'] / args.time_scale:.0f}s)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", default="1x4,2x8", help="comma-separated WORKERSxSLOTS")
+    parser.add_argument("--url", help="test this running service instead of starting shapes")
+    parser.add_argument("--concurrency", default="1,2,4,8,16",
+                        type=lambda s: [int(c) for c in s.split(",")])
+    parser.add_argument("--requests", type=int, default=40, help="requests per concurrency level")
+    parser.add_argument("--mix", default="analyze_call=6,transcribe=2,analyze=2")
+    parser.add_argument("--batch-fraction", type=float, default=0.0, help="share of requests sent as priority=batch")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="stand-in latency multiplier")
+    parser.add_argument("--slo-seconds", type=float, default=180.0, help="real-time p95 target")
+    parser.add_argument("--recordings", type=Path, default=RECORDINGS_DIR)
+    parser.add_argument("--csv", type=Path, help="also write every row here")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    recordings = load_recordings(args.recordings)
+    print(describe(recordings))
+    print(f"mix {mix}, {args.requests} requests per level, time scale {args.time_scale}")
+
+    results = {}
+    if args.url:
+        print(f"\n{args.url}")
+        results[args.url] = sweep(args.url.rstrip("/"), args, mix, recordings)
+    else:
+        url = f"http://127.0.0.1:{args.port}"
+        for shape in args.shapes.split(","):
+            workers, _, slots = shape.partition("x")
+            workers, slots = int(workers), int(slots or 4)
+            print(f"\nshape {workers} workers x {slots} slots")
+            with tempfile.TemporaryDirectory() as data_dir:
+                server = subprocess.Popen(
+                    [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+                    env=shape_env(workers, slots, args.time_scale, data_dir, args.port),
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                try:
+                    wait_for_health(url)
+                    results[f"{workers} workers x {slots} slots"] = sweep(url, args, mix, recordings)
+                finally:
+                    server.terminate()
+                    server.wait(timeout=60)
+
+    summary = {shape: print_curve(shape, rows, args) for shape, rows in results.items()}
+    print("\n| shape | recommended concurrency | req/s | real p95 s |")
+    print("|---|---:|---:|---:|")
+    for shape, best in summary.items():
+        if best is None:
+            print(f"| {shape} | - | - | - |")
+        else:
+            print(f"| {shape} | {best['concurrency']} | {best['throughput_rps']:.2f}"
+                  f" | {best['p95_seconds'] / args.time_scale:.0f} |")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["shape", "concurrency", "requests", "throughput_rps", "p50_seconds", "p95_seconds",
+                             "p99_seconds", "error_rate"])
+            for shape, rows in results.items():
+                for r in rows:
+                    writer.writerow([shape, r["concurrency"], r["requests"], round(r["throughput_rps"], 3),
+                                     round(r["p50_seconds"], 3), round(r["p95_seconds"], 3),
+                                     round(r["p99_seconds"], 3), round(r["error_rate"], 3)])
+
+
+if __name__ == "__main__":
+    main()
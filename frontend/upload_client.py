@@ -0,0 +1,131 @@
+"""Resumable chunked upload client used by the Streamlit upload page."""
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+import requests
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_CONCURRENCY = 4
+CHUNK_RETRIES = 3
+POLL_SECONDS = 1.0
+
+
+def _put_chunk(session: requests.Session, base_url: str, upload_id: str, index: int, data: memoryview):
+    checksum = hashlib.sha256(data).hexdigest()
+    for attempt in range(1, CHUNK_RETRIES + 1):
+        try:
+            resp = session.put(
+                f"{base_url}/uploads/{upload_id}/chunks/{index}",
+                data=bytes(data),
+                headers={"X-Chunk-Sha256": checksum, "Content-Type": "application/octet-stream"},
+                timeout=60,
+            )
+            resp.raise_for_status()
+            return index
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+            if attempt == CHUNK_RETRIES:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def upload_in_chunks(base_url: str, buffer: memoryview, filename: str,
+                     upload_id: Optional[str] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     concurrency: int = DEFAULT_CONCURRENCY,
+                     on_progress: Optional[Callable[[int, int], None]] = None,
+                     on_upload_id: Optional[Callable[[str], None]] = None) -> str:
+    """Upload `buffer` in checksummed chunks, `concurrency` at a time.
+
+    Pass the `upload_id` of an earlier attempt to resume it: only the chunks
+    the backend is still missing are sent. `on_upload_id` gets the id as soon
+    as the session exists, so it survives a failure part-way through.
+    Returns the upload id to complete.
+    """
+    with requests.Session() as session:
+        missing = None
+        if upload_id:
+            resp = session.get(f"{base_url}/uploads/{upload_id}", timeout=10)
+            if resp.status_code == 200 and resp.json().get("size") == len(buffer):
+                status = resp.json()
+                chunk_size, missing = status["chunk_size"], status["missing"]
+        if missing is None:
+            resp = session.post(
+                f"{base_url}/uploads/init",
+                data={"filename": filename, "size": len(buffer), "chunk_size": chunk_size},
+                timeout=10,
+            )
+            resp.raise_for_status()
+            status = resp.json()
+            upload_id, missing = status["upload_id"], list(range(status["total_chunks"]))
+        if on_upload_id:
+            on_upload_id(upload_id)
+
+        total = -(-len(buffer) // chunk_size)
+        done = total - len(missing)
+        if on_progress:
+            on_progress(done, total)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # memoryview slices don't copy the file; each chunk is copied once, when sent
+            futures = [
+                pool.submit(_put_chunk, session, base_url, upload_id, i, buffer[i * chunk_size:(i + 1) * chunk_size])
+                for i in missing
+            ]
+            for future in as_completed(futures):
+                future.result()
+                done += 1
+                if on_progress:
+                    on_progress(done, total)
+    return upload_id
+
+
+def complete_upload(base_url: str, upload_id: str, form: dict, timeout: int = 300,
+                    background: bool = False, preview: bool = False) -> requests.Response:
+    """Assemble the uploaded chunks on the backend and run the analysis.
+
+    With `background`, the backend answers 202 with a job id right away; pass
+    it to `wait_for_job` to follow progress. `preview` (background only) asks
+    for a quick preview result before the final one.
+    """
+    return requests.post(
+        f"{base_url}/uploads/{upload_id}/complete",
+        data={**form, "background": "true" if background else "false", "preview": "true" if preview else "false"},
+        timeout=timeout,
+    )
+
+
+def wait_for_job(base_url: str, job_id: str,
+                 on_progress: Optional[Callable[[dict], None]] = None,
+                 poll_seconds: float = POLL_SECONDS, timeout: float = 1800,
+                 on_preview: Optional[Callable[[dict], None]] = None) -> dict:
+    """Poll /jobs/{job_id}/progress until the job finishes; returns the final job record.
+
+    `on_preview` gets the job's preview result once the backend has one.
+    """
+    deadline = time.monotonic() + timeout
+    seen_version = None
+    with requests.Session() as session:
+        while True:
+            try:
+                resp = session.get(f"{base_url}/jobs/{job_id}/progress", timeout=10)
+                resp.raise_for_status()
+                progress = resp.json()
+            except (requests.ConnectionError, requests.Timeout):
+                # A worker restart shouldn't abort the wait; the job state lives in SQLite
+                progress = None
+            if progress is not None:
+                if on_progress:
+                    on_progress(progress)
+                if progress["status"] not in ("queued", "running"):
+                    resp = session.get(f"{base_url}/jobs/{job_id}", timeout=30)
+                    resp.raise_for_status()
+                    return resp.json()
+                if on_preview and progress.get("result_version") and progress["result_version"] != seen_version:
+                    seen_version = progress["result_version"]
+                    resp = session.get(f"{base_url}/jobs/{job_id}", timeout=30)
+                    if resp.ok and (resp.json().get("result") or {}).get("result_stage") == "preview":
+                        on_preview(resp.json()["result"])
+            if time.monotonic() > deadline:
+                raise requests.Timeout(f"job {job_id} still running after {timeout:.0f}s")
+            time.sleep(poll_seconds)
@@ -0,0 +1,43 @@
+# gunicorn.conf.py - production serving mode for the SalesSense backend
+#
+#   gunicorn -c gunicorn.conf.py backend.main:app
+#
+# Every worker is a uvicorn event loop. The analysis cache and job state live in
+# SQLite (SALESSENSE_DATA_DIR) so a cache hit on one worker is a hit on all.
+import multiprocessing
+import os
+
+# Must be set before the app is imported so backend.main picks the shared cache
+os.environ.setdefault("SALESSENSE_CACHE_BACKEND", "sqlite")
+
+bind = os.getenv("SALESSENSE_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("SALESSENSE_WORKERS", min(multiprocessing.cpu_count(), 4)))
+# Rate-limit budgets in backend.rate_limiter are split evenly across workers
+os.environ["SALESSENSE_WORKERS"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Transcription + 3 LLM calls can take minutes; don't kill a busy worker
+timeout = int(os.getenv("SALESSENSE_WORKER_TIMEOUT", "600"))
+# On SIGTERM workers stop accepting and get this long to drain in-flight analyses
+graceful_timeout = int(os.getenv("SALESSENSE_DRAIN_TIMEOUT", "120"))
+keepalive = 5
+
+# Import the app (and its SDKs) once in the master; workers fork from it
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("SALESSENSE_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    # Compile the LangGraph graph in the master so forked workers inherit it
+    try:
+        from backend.multi_agent_system import warm_up
+        warm_up()
+    except Exception as e:
+        server.log.warning(f"Graph preload skipped: {e}")
+
+
+def worker_int(worker):
+    worker.log.info(f"Worker {worker.pid} interrupted, draining in-flight analyses")
@@ -16,16 +16,16 @@ st.set_page_config(
 # Initialize all session state variables at app startup to prevent data loss
 if "upload_ready" not in st.session_state:
     st.session_state.upload_ready = False
-if "audio_file_data" not in st.session_state:
-    st.session_state.audio_file_data = None
+if "audio_file_name" not in st.session_state:
+    st.session_state.audio_file_name = None
 if "participants_data" not in st.session_state:
     st.session_state.participants_data = ""
 if "details_data" not in st.session_state:
     st.session_state.details_data = ""
 if "call_types_data" not in st.session_state:
     st.session_state.call_types_data = []
-if "analysis_results" not in st.session_state:
-    st.session_state.analysis_results = None
+if "analysis_id" not in st.session_state:
+    st.session_state.analysis_id = None
 
 # --- PAGE SETUP ---
 home_page = st.Page(
@@ -47,6 +47,12 @@ results_page = st.Page(
     icon=":material/insights:",
 )
 
+analytics_page = st.Page(
+    page="views/analytics.py",
+    title="Rep Trends",
+    icon=":material/trending_up:",
+)
+
 about_us_page = st.Page(
     page="views/about_us.py",
     title="About Us",
@@ -56,7 +62,7 @@ about_us_page = st.Page(
 # --- NAVIGATION SETUP ---
 navigation = st.navigation(
     pages={
-        "SalesSense": [home_page, upload_page, results_page],
+        "SalesSense": [home_page, upload_page, results_page, analytics_page],
         "Info": [about_us_page]
     },
 )
@@ -0,0 +1,75 @@
+import streamlit as st
+import pandas as pd
+
+BACKEND_URL = "http://localhost:8000"
+
+st.title("📈 Rep Trends")
+st.caption("Weekly rollups across every analyzed call. Aggregates are precomputed by the backend when each analysis finishes.")
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_reps():
+    import requests
+    resp = requests.get(f"{BACKEND_URL}/analytics/reps", timeout=10)
+    resp.raise_for_status()
+    return resp.json().get("reps", [])
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_rep_weekly(rep: str, weeks: int) -> pd.DataFrame:
+    import requests
+    resp = requests.get(f"{BACKEND_URL}/analytics/rep_weekly", params={"rep": rep, "weeks": weeks}, timeout=10)
+    resp.raise_for_status()
+    frame = pd.DataFrame(resp.json().get("rows", []))
+    if not frame.empty:
+        frame["week"] = pd.to_datetime(frame["week"])
+        frame = frame.sort_values("week")
+    return frame
+
+
+try:
+    reps = load_reps()
+except Exception as ex:
+    st.error(f"❌ Could not load analytics from backend: {ex}")
+    st.stop()
+
+if not reps:
+    st.info("📤 No stored analyses yet. Analyze a few calls and the trends will show up here.")
+    st.stop()
+
+col1, col2 = st.columns([2, 1])
+with col1:
+    rep = st.selectbox("Sales Rep", options=reps)
+with col2:
+    weeks = st.slider("Weeks", min_value=4, max_value=52, value=12, step=4)
+
+frame = load_rep_weekly(rep, weeks)
+if frame.empty:
+    st.warning(f"⚠️ No calls for {rep} in the last {weeks} weeks")
+    st.stop()
+
+latest = frame.iloc[-1]
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Calls (latest week)", int(latest["calls"]))
+with col2:
+    st.metric("Rep Talk Time", f"{latest['avg_rep_talk_ratio_percent']:.0f}%")
+with col3:
+    st.metric("Objections / Call", f"{latest['objection_rate']:.1f}")
+with col4:
+    st.metric("Positive Calls", f"{latest['sentiment_positive'] * 100:.0f}%")
+
+weekly = frame.set_index("week")
+
+st.markdown("---")
+st.markdown("## 🗣️ Talk Ratio")
+st.line_chart(weekly[["avg_rep_talk_ratio_percent", "avg_customer_talk_ratio_percent"]])
+
+st.markdown("## 🚫 Objection Rate")
+st.bar_chart(weekly[["objection_rate"]])
+
+st.markdown("## 😊 Sentiment Distribution")
+st.bar_chart(weekly[["sentiment_positive", "sentiment_neutral", "sentiment_negative"]])
+
+with st.expander("🔍 Weekly data", expanded=False):
+    st.dataframe(frame.drop(columns=["updated_at"]), use_container_width=True, hide_index=True)
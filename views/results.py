@@ -1,34 +1,182 @@
 import streamlit as st
-import json
+
+BACKEND_URL = "http://localhost:8000"
 
 st.title("📊 Sales Call Analysis Results")
 
-if 'analysis_results' in st.session_state and st.session_state.analysis_results:
-    results = st.session_state.analysis_results
 
+# Results never change once stored, so the analysis id is a complete cache key.
+# Only the id lives in session state; reruns reuse the parsed copy cached here.
+@st.cache_data(max_entries=32, show_spinner="Loading analysis...")
+def load_analysis(analysis_id: str) -> dict:
+    import requests
+    resp = requests.get(f"{BACKEND_URL}/analyses/{analysis_id}", timeout=30)
+    resp.raise_for_status()
+    return resp.json()
+
+
+@st.cache_data(max_entries=8, show_spinner="Loading transcript...")
+def load_transcript(analysis_id: str) -> str:
+    import requests
+    resp = requests.get(f"{BACKEND_URL}/analyses/{analysis_id}/transcript", timeout=30)
+    resp.raise_for_status()
+    return resp.json().get("transcript", "")
+
+
+def _as_list(value) -> list:
+    return value if isinstance(value, list) else []
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_view(analysis_id: str) -> dict:
+    """Everything the page renders, already formatted, so a rerun only writes text."""
+    results = load_analysis(analysis_id)
+
+    objections = []
+    for i, obj in enumerate(_as_list(results.get("customer_objections")), 1):
+        if isinstance(obj, dict):
+            objections.append({
+                "title": f"Objection {i}: {obj.get('objection', 'Unknown').title()}",
+                "quote": obj.get('moment_quote', obj.get('moment', 'No quote available')),
+                "response": obj.get('suggested_response', 'No suggestion available'),
+            })
+        else:
+            objections.append({"text": f"• {obj}"})
+
+    next_steps = []
+    for step in _as_list(results.get("next_steps")):
+        if isinstance(step, dict):
+            owner = step.get('owner', '').title()
+            action = step.get('action', step.get('step', 'No action specified'))
+            due_by = step.get('due_by', '')
+            if owner and action and due_by:
+                next_steps.append(f"• **{owner}**: {action} (Due: {due_by})")
+            elif action:
+                next_steps.append(f"• {action}")
+            else:
+                next_steps.append(f"• {step}")
+        else:
+            next_steps.append(f"• {step}")
+
+    tips = []
+    for tip in _as_list(results.get("coaching_tips")):
+        if isinstance(tip, dict):
+            tips.append(f"**{tip.get('skill', 'General')}:** {tip.get('tip', 'No advice available')}")
+        else:
+            tips.append(f"• {tip}")
+
+    quotes = []
+    for quote in _as_list(results.get("notable_quotes")):
+        if isinstance(quote, dict):
+            text = quote.get('quote', quote.get('text', ''))
+            if text:
+                quotes.append({
+                    "text": f"> **{quote.get('speaker', 'Unknown').title()}:** \"{text}\"",
+                    "why": quote.get('why_it_matters', ''),
+                })
+        else:
+            quotes.append({"text": f"> \"{quote}\"", "why": ""})
+
+    return {
+        "summary": results.get("summary", "No summary available."),
+        "cached": results.get("cached", False),
+        "processing_time": results.get("processing_time"),
+        "agents_used": results.get('agents_used', 'multi-agent system'),
+        "agents": results.get("agents") or {},
+        "degraded": results.get("degraded") or {},
+        "metrics": results.get("metrics") or {},
+        "strengths": _as_list(results.get("strengths")),
+        "improvement_areas": _as_list(results.get("improvement_areas")),
+        "objections": objections,
+        "next_steps": next_steps,
+        "coaching_tips": tips,
+        "quotes": quotes,
+    }
+
+
+# Fragments rerun on their own, so opening these doesn't redraw the rest of the page
+@st.fragment
+def render_debug(analysis_id: str):
+    if st.toggle("Show raw result", key="show_raw_result"):
+        st.json(load_analysis(analysis_id))
+
+
+@st.fragment
+def render_transcript(analysis_id: str):
+    if st.toggle("Show transcript", key="show_transcript"):
+        try:
+            st.text(load_transcript(analysis_id))
+        except Exception as ex:
+            st.warning(f"⚠️ Transcript not available: {ex}")
+
+
+# The list changes as recordings land, so it is only cached briefly
+@st.cache_data(ttl=30, show_spinner=False)
+def load_preanalysed(limit: int = 20) -> list:
+    import requests
+    resp = requests.get(f"{BACKEND_URL}/ingest/recordings", params={"limit": limit}, timeout=10)
+    resp.raise_for_status()
+    return resp.json().get("recordings", [])
+
+
+def render_preanalysed():
+    """Recordings from the drop folder that are already analysed and open instantly."""
+    try:
+        recordings = load_preanalysed()
+    except Exception:
+        return
+    if not recordings:
+        return
+    st.markdown("### ⚡ Ready to review")
+    st.caption("Recordings from the drop folder, analysed as they arrived.")
+    for rec in recordings:
+        col1, col2 = st.columns([4, 1])
+        col1.write(f"🎧 {rec['filename']}")
+        if col2.button("Open", key=f"open_{rec['analysis_id']}", use_container_width=True):
+            st.session_state.analysis_id = rec["analysis_id"]
+            st.rerun()
+
+
+analysis_id = st.session_state.get("analysis_id")
+view = None
+if analysis_id:
+    try:
+        view = load_view(analysis_id)
+    except Exception as ex:
+        st.error(f"❌ Could not load analysis {analysis_id} from backend: {ex}")
+
+if view is not None:
     # Debug section (optional)
     with st.expander("🔍 Debug Info", expanded=False):
-        st.json(results)
+        st.caption(f"Analysis ID: `{analysis_id}`")
+        render_debug(analysis_id)
 
     # Executive Summary Section
     st.markdown("## 📋 Executive Summary")
-    summary = results.get("summary", "No summary available.")
-    st.write(summary)
+    st.write(view["summary"])
+
+    if view["degraded"]:
+        st.warning(f"🛟 **Quick analysis** - the AI analysis was unavailable ({view['degraded'].get('reason', 'overload')}),"
+                   f" so {', '.join(view['degraded'].get('agents', []))} came from keyword rules."
+                   " Upload the call again later for the full analysis.")
 
     # Cache Status Display
-    if results.get("cached", False):
+    if view["cached"]:
         st.success("⚡ **Cache Hit!** This analysis was retrieved instantly from cache - no processing required!")
-    else:
+    elif not view["degraded"]:
         st.info("🔄 **Fresh Analysis** - This file was processed and cached for future use")
 
     # Processing Info
-    if "processing_time" in results:
-        cache_indicator = " (cached)" if results.get("cached", False) else ""
-        agents_info = results.get('agents_used', 'multi-agent system')
-        st.caption(f"⏱️ Analysis completed in {results['processing_time']}{cache_indicator} using {agents_info}")
+    if view["processing_time"]:
+        cache_indicator = " (cached)" if view["cached"] else ""
+        st.caption(f"⏱️ Analysis completed in {view['processing_time']}{cache_indicator} using {view['agents_used']}")
+
+    if view["agents"].get("reused") and view["agents"].get("recomputed"):
+        st.caption(f"♻️ Only the inputs you changed were re-analyzed: re-ran {', '.join(view['agents']['recomputed'])},"
+                   f" reused {', '.join(view['agents']['reused'])}")
 
     # --- Metrics Section ---
-    metrics = results.get("metrics", {})
+    metrics = view["metrics"]
     if metrics:
         st.markdown("---")
         st.markdown("## 📈 Call Metrics")
@@ -55,94 +203,62 @@ if 'analysis_results' in st.session_state and st.session_state.analysis_results:
         st.warning("⚠️ Metrics data not available")
 
     # --- Strengths Identified ---
-    strengths = results.get("strengths", [])
     st.markdown("---")
     st.markdown("## ✅ Strengths Identified")
-    if strengths and isinstance(strengths, list) and len(strengths) > 0:
-        for strength in strengths:
-            st.write(f"• {strength}")
+    if view["strengths"]:
+        st.markdown("\n".join(f"- {strength}" for strength in view["strengths"]))
     else:
         st.write("No specific strengths identified.")
 
     # --- Areas for Improvement ---
-    areas = results.get("improvement_areas", [])
     st.markdown("---")
     st.markdown("## 🎯 Areas for Improvement")
-    if areas and isinstance(areas, list) and len(areas) > 0:
-        for area in areas:
-            st.write(f"• {area}")
+    if view["improvement_areas"]:
+        st.markdown("\n".join(f"- {area}" for area in view["improvement_areas"]))
     else:
         st.write("No specific improvement areas identified.")
 
     # --- Customer Objections ---
-    objections = results.get("customer_objections", [])
-    if objections and len(objections) > 0:
+    if view["objections"]:
         st.markdown("---")
         st.markdown("## 🚫 Customer Objections & Responses")
-        for i, obj in enumerate(objections, 1):
-            if isinstance(obj, dict):
-                objection_title = obj.get('objection', 'Unknown').title()
-                with st.expander(f"Objection {i}: {objection_title}"):
-                    quote = obj.get('moment_quote', obj.get('moment', 'No quote available'))
-                    response = obj.get('suggested_response', 'No suggestion available')
-                    st.write(f"**Customer said:** \"{quote}\"")
-                    st.write(f"**Suggested response:** {response}")
+        for obj in view["objections"]:
+            if "title" in obj:
+                with st.expander(obj["title"]):
+                    st.write(f"**Customer said:** \"{obj['quote']}\"")
+                    st.write(f"**Suggested response:** {obj['response']}")
             else:
-                st.write(f"• {obj}")
+                st.write(obj["text"])
 
     # --- Recommended Next Steps ---
-    next_steps = results.get("next_steps", [])
     st.markdown("---")
     st.markdown("## 🎯 Recommended Next Steps")
-    if next_steps and len(next_steps) > 0:
-        for step in next_steps:
-            if isinstance(step, dict):
-                owner = step.get('owner', '').title()
-                action = step.get('action', step.get('step', 'No action specified'))
-                due_by = step.get('due_by', '')
-                
-                if owner and action and due_by:
-                    st.write(f"• **{owner}**: {action} (Due: {due_by})")
-                elif action:
-                    st.write(f"• {action}")
-                else:
-                    st.write(f"• {step}")
-            else:
-                st.write(f"• {step}")
+    if view["next_steps"]:
+        st.markdown("\n\n".join(view["next_steps"]))
     else:
         st.write("No specific next steps identified.")
 
     # --- Coaching Tips ---
-    tips = results.get("coaching_tips", [])
     st.markdown("---")
     st.markdown("## 💡 Coaching Tips")
-    if tips and len(tips) > 0:
-        for tip in tips:
-            if isinstance(tip, dict):
-                skill = tip.get('skill', 'General')
-                advice = tip.get('tip', 'No advice available')
-                st.write(f"**{skill}:** {advice}")
-            else:
-                st.write(f"• {tip}")
+    if view["coaching_tips"]:
+        st.markdown("\n\n".join(view["coaching_tips"]))
     else:
         st.write("No coaching tips available.")
 
     # --- Notable Quotes ---
-    quotes = results.get("notable_quotes", [])
-    if quotes and len(quotes) > 0:
+    if view["quotes"]:
         st.markdown("---")
         st.markdown("## 💬 Notable Quotes")
-        for quote in quotes:
-            if isinstance(quote, dict):
-                speaker = quote.get('speaker', 'Unknown').title()
-                text = quote.get('quote', quote.get('text', ''))
-                why_matters = quote.get('why_it_matters', '')
-                if text:
-                    st.write(f"> **{speaker}:** \"{text}\"")
-                    if why_matters:
-                        st.caption(f"*{why_matters}*")
-            else:
-                st.write(f"> \"{quote}\"")
+        for quote in view["quotes"]:
+            st.write(quote["text"])
+            if quote["why"]:
+                st.caption(f"*{quote['why']}*")
+
+    # --- Transcript (fetched only when opened) ---
+    st.markdown("---")
+    st.markdown("## 📝 Transcript")
+    render_transcript(analysis_id)
 
     # --- Action Buttons ---
     st.markdown("---")
@@ -150,8 +266,7 @@ if 'analysis_results' in st.session_state and st.session_state.analysis_results:
 
     with col1:
         if st.button("🔄 Analyze Another Call", type="secondary", use_container_width=True):
-            if 'analysis_results' in st.session_state:
-                del st.session_state.analysis_results
+            st.session_state.analysis_id = None
             st.switch_page("views/upload.py")
 
     with col2:
@@ -160,7 +275,8 @@ if 'analysis_results' in st.session_state and st.session_state.analysis_results:
 
 else:
     st.info("📤 No analysis results found. Please upload a call and analyze it first.")
-    
+    render_preanalysed()
+
     col1, col2 = st.columns(2)
     with col1:
         if st.button("📤 Go to Upload", type="primary", use_container_width=True):
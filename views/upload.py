@@ -1,5 +1,17 @@
 import streamlit as st
-import requests
+
+BACKEND_URL = "http://localhost:8000"
+
+STAGE_LABELS = {
+    "received": "📥 Preparing audio...",
+    "fingerprinting": "🔍 Checking for duplicate recordings...",
+    "waiting_for_quota": "⏳ Waiting for transcription capacity...",
+    "transcribing": "🎤 Transcribing audio...",
+    "waiting_for_agents": "⏳ Waiting for analysis capacity...",
+    "analyzing": "🤖 Running multi-agent analysis...",
+    "cache_hit": "⚡ Found cached analysis",
+    "done": "✅ Analysis complete!",
+}
 
 st.markdown("### 🎧 Upload Dialpad Call")
 st.caption("Provide the recording and a bit of context so SalesSense can generate accurate, actionable insights.")
@@ -7,8 +19,8 @@ st.caption("Provide the recording and a bit of context so SalesSense can generat
 # Initialize persistent session state variables
 if "upload_ready" not in st.session_state:
     st.session_state.upload_ready = False
-if "audio_file_data" not in st.session_state:
-    st.session_state.audio_file_data = None
+if "audio_file_name" not in st.session_state:
+    st.session_state.audio_file_name = None
 if "participants_data" not in st.session_state:
     st.session_state.participants_data = ""
 if "details_data" not in st.session_state:
@@ -46,8 +58,8 @@ with st.form("upload_form", clear_on_submit=False):
 
     submitted = st.form_submit_button("🚀 Analyze Call", type="primary", use_container_width=True)
 
-if st.session_state.audio_file_data is not None:
-    st.success(f"✅ Previous audio file: {st.session_state.audio_file_data.name}")
+if st.session_state.audio_file_name is not None:
+    st.success(f"✅ Previous audio file: {st.session_state.audio_file_name}")
 
 if submitted:
     errors = []
@@ -64,51 +76,98 @@ if submitted:
         for e in errors:
             st.error(e)
     else:
-        # Save form data to session state for persistence
-        st.session_state.audio_file_data = audio_file
+        # Save form data to session state for persistence (the name only: the
+        # uploader already holds the bytes, a second reference would pin them)
+        st.session_state.audio_file_name = audio_file.name
         st.session_state.participants_data = participants
         st.session_state.details_data = details
         st.session_state.call_types_data = call_types
 
+        # Imported only when a call is submitted, not on every page rerun
+        import requests
+        from frontend.upload_client import upload_in_chunks, complete_upload, wait_for_job
+
         # Show processing message with progress
         progress_bar = st.progress(0)
         status_text = st.empty()
         
         status_text.text("🔄 Uploading audio file...")
-        progress_bar.progress(10)
-        
-        files = {'audio_file': (audio_file.name, audio_file.getvalue(), audio_file.type)}
+
+        def show_upload_progress(done, total):
+            progress_bar.progress(int(30 * done / max(total, 1)))
+            status_text.text(f"🔄 Uploading audio file... ({done}/{total} chunks)")
+
+        stage_warning = st.empty()
+
+        def show_job_progress(progress):
+            # Upload takes the first 30% of the bar, the backend pipeline the rest
+            progress_bar.progress(30 + int(0.7 * (progress.get("percent") or 0)))
+            label = STAGE_LABELS.get(progress["stage"], progress["stage"])
+            eta = progress.get("eta_seconds")
+            status_text.text(f"{label} ({progress['elapsed_seconds']:.0f}s elapsed"
+                             + (f", about {eta:.0f}s left)" if eta else ")"))
+            if progress.get("overdue"):
+                stage_warning.warning(
+                    f"⚠️ {label} has been running for {progress['stage_elapsed_seconds']:.0f}s, "
+                    f"usually about {progress['expected_stage_seconds']:.0f}s. The job may be stuck."
+                )
+            else:
+                stage_warning.empty()
+
+        preview_box = st.empty()
+
+        def show_preview(result):
+            # Replaced by the results page once the full analysis is in
+            metrics = result.get("metrics") or {}
+            with preview_box.container(border=True):
+                st.markdown("**👀 Preview** - the full analysis is still running")
+                st.write(result.get("summary", ""))
+                cols = st.columns(3)
+                cols[0].metric("Rep talk", f"{metrics.get('rep_talk_ratio_percent', 0)}%")
+                cols[1].metric("Questions", metrics.get("questions_asked_by_rep", 0))
+                cols[2].metric("Objections", metrics.get("objections_detected", 0))
+
         data = {
             'participants': participants,
             'details': details,
             'call_types': ",".join(call_types),
         }
 
+        # Remember the upload id per file so a retry after a dropped connection resumes it
+        upload_ids = st.session_state.setdefault("upload_ids", {})
+
         try:
-            status_text.text("🎤 Transcribing audio...")
-            progress_bar.progress(30)
-            
-            resp = requests.post(
-                "http://localhost:8000/analyze_call", 
-                files=files, 
-                data=data, 
-                timeout=300
+            upload_id = upload_in_chunks(
+                BACKEND_URL,
+                audio_file.getbuffer(),
+                audio_file.name,
+                upload_id=upload_ids.get(audio_file.file_id),
+                on_progress=show_upload_progress,
+                on_upload_id=lambda uid: upload_ids.__setitem__(audio_file.file_id, uid),
             )
+
+            resp = complete_upload(BACKEND_URL, upload_id, data, timeout=60, background=True, preview=True)
             
-            progress_bar.progress(70)
-            status_text.text("🤖 Running multi-agent analysis...")
+            if resp.status_code == 202:
+                # The backend reports each real stage transition; the bar follows it live
+                job = wait_for_job(BACKEND_URL, resp.json()["job_id"], on_progress=show_job_progress,
+                                   on_preview=show_preview)
+                stage_warning.empty()
+                preview_box.empty()
             
-            if resp.status_code == 200:
+            if resp.status_code == 202 and job["status"] == "completed" and job.get("result"):
                 progress_bar.progress(100)
                 status_text.text("✅ Analysis complete!")
                 
-                response_data = resp.json()
+                response_data = job["result"]
+                upload_ids.pop(audio_file.file_id, None)
                 
                 # Validate response data structure
                 if not response_data.get("summary"):
                     st.warning("⚠️ Analysis completed but some data may be incomplete")
                 
-                st.session_state.analysis_results = response_data
+                # The results page fetches (and caches) the analysis by id
+                st.session_state.analysis_id = response_data.get("analysis_id") or job["job_id"]
                 st.session_state.upload_ready = True
                 
                 st.success("✅ Call analysis complete! Redirecting to results...")
@@ -119,6 +178,10 @@ if submitted:
                 time.sleep(1)
                 st.switch_page("views/results.py")
                 
+            elif resp.status_code == 202:
+                st.error(f"❌ Analysis {job['status']} during {STAGE_LABELS.get(job['stage'], job['stage'])}")
+                if job.get("error"):
+                    st.error(f"Details: {job['error']}")
             else:
                 st.error(f"❌ Error analyzing call: {resp.status_code}")
                 try:
@@ -130,7 +193,7 @@ if submitted:
         except requests.exceptions.Timeout:
             st.error("❌ Request timed out. The audio file might be too large or the server is busy. Please try again.")
         except requests.exceptions.ConnectionError:
-            st.error("❌ Could not connect to backend API. Please ensure the backend server is running on http://localhost:8000")
+            st.error(f"❌ Could not connect to backend API. Please ensure the backend server is running on {BACKEND_URL}")
         except Exception as ex:
             st.error(f"❌ Unexpected error: {ex}")
         finally: